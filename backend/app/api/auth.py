@@ -1,5 +1,7 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, status
 
+from app.api.deps import get_bearer_token
+from app.core.security import create_access_token, revoke_access_token
 from app.schemas.user import (
     UserRegisterRequest,
     UserLoginRequest,
@@ -11,12 +13,19 @@ from app.services.user_service import user_service
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
 
+def _issue_session(user: UserResponse) -> AuthResponse:
+    """Wrap a user in an auth response carrying a fresh access token."""
+
+    token, expires_at = create_access_token(user.id)
+    return AuthResponse(user=user, access_token=token, expires_at=expires_at)
+
+
 @router.post("/register", response_model=AuthResponse)
 async def register_user(payload: UserRegisterRequest) -> AuthResponse:
     """Register a new user account."""
 
     user = await user_service.register_user(payload)
-    return AuthResponse(user=user)
+    return _issue_session(user)
 
 
 @router.post("/login", response_model=AuthResponse)
@@ -24,4 +33,13 @@ async def login_user(payload: UserLoginRequest) -> AuthResponse:
     """Authenticate an existing user."""
 
     user = await user_service.authenticate_user(payload)
-    return AuthResponse(user=user)
+    return _issue_session(user)
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout_user(token: str = Depends(get_bearer_token)):
+    """Revoke the access token presented with the request."""
+
+    if token:
+        revoke_access_token(token)
+    return None
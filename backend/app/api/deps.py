@@ -1,10 +1,45 @@
+from typing import Optional
+
 from fastapi import Depends, Header, HTTPException, status
 
+from app.core.security import InvalidTokenError, decode_access_token
 from app.services.user_service import user_service
 
 
-async def get_current_user_id(x_user_id: str = Header(default=None)) -> str:
-    """Resolve the current user from the custom X-User-ID header."""
+async def get_bearer_token(
+    authorization: Optional[str] = Header(default=None),
+) -> Optional[str]:
+    """Extract the token from an ``Authorization: Bearer`` header, if present."""
+
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return None
+    return token.strip()
+
+
+async def get_current_user_id(
+    token: Optional[str] = Depends(get_bearer_token),
+    x_user_id: str = Header(default=None),
+) -> str:
+    """
+    Resolve the current user.
+
+    Signed bearer tokens are verified locally without a database round trip.
+    The legacy X-User-ID header is still accepted and checked against the
+    users table.
+    """
+
+    if token:
+        try:
+            return decode_access_token(token).subject
+        except InvalidTokenError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="登录已失效，请重新登录",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
 
     if not x_user_id:
         raise HTTPException(
@@ -1,13 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from typing import Optional
 from app.schemas.expense import (
     ExpenseCreate,
     ExpenseUpdate,
     ExpenseResponse,
     ExpenseSummary,
     ExpenseCategory,
+    ExpensePage,
+    ExpenseBulkResult,
+    ExpenseBatchSelection,
+    ExpenseBatchUpdate,
+    ExpenseBatchResult,
 )
+from app.services.expense_import import (
+    iter_csv_rows,
+    iter_json_rows,
+    iter_ndjson_rows,
+)
+from app.core.etag import conditional_response
 from app.services.expense_service import expense_service
+from app.services.expense_write_behind import BufferFullError
 from app.api.deps import get_current_user_id
 
 router = APIRouter(prefix="/expenses", tags=["Expenses"])
@@ -22,6 +34,11 @@ async def create_expense(
     """
     try:
         return await expense_service.create_expense(user_id, expense)
+    except BufferFullError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(exc),
+        ) from exc
     except ValueError as exc:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -34,20 +51,116 @@ async def create_expense(
         )
 
 
-@router.get("/", response_model=List[ExpenseResponse])
+@router.post("/bulk", response_model=ExpenseBulkResult)
+async def bulk_create_expenses(
+    request: Request,
+    batch_size: Optional[int] = Query(None, ge=1, le=1000),
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    Import many expenses in one request.
+
+    Accepts a JSON array (``application/json``), newline-delimited JSON
+    (``application/x-ndjson``) or CSV with a header row (``text/csv``). NDJSON
+    and CSV bodies are streamed and validated row by row; valid rows are
+    inserted in batches and invalid rows are reported with their row number.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+
+    try:
+        if content_type in ("application/x-ndjson", "application/jsonl"):
+            rows = iter_ndjson_rows(request.stream())
+        elif content_type in ("text/csv", "application/csv"):
+            rows = iter_csv_rows(request.stream())
+        else:
+            rows = iter_json_rows(await request.json())
+
+        return await expense_service.bulk_create_expenses(
+            user_id, rows, batch_size=batch_size
+        )
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc),
+        ) from exc
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error importing expenses: {str(e)}",
+        )
+
+
+@router.post("/batch-update", response_model=ExpenseBatchResult)
+async def batch_update_expenses(
+    request: ExpenseBatchUpdate, user_id: str = Depends(get_current_user_id)
+):
+    """
+    Re-categorize or move a list of expenses, or every expense matching a
+    filter, in one statement.
+    """
+    try:
+        return await expense_service.batch_update_expenses(user_id, request)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc),
+        ) from exc
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error updating expenses: {str(e)}",
+        )
+
+
+@router.post("/batch-delete", response_model=ExpenseBatchResult)
+async def batch_delete_expenses(
+    selection: ExpenseBatchSelection, user_id: str = Depends(get_current_user_id)
+):
+    """
+    Delete a list of expenses, or every expense matching a filter, in one
+    statement.
+    """
+    try:
+        return await expense_service.batch_delete_expenses(user_id, selection)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc),
+        ) from exc
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error deleting expenses: {str(e)}",
+        )
+
+
+@router.get("/", response_model=ExpensePage)
 async def list_expenses(
     itinerary_id: Optional[str] = None,
     category: Optional[ExpenseCategory] = None,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
     user_id: str = Depends(get_current_user_id),
 ):
     """
     List expenses for the current user with optional filters.
+
+    Results are newest first; pass the returned ``next_cursor`` as ``cursor``
+    to fetch the following page.
     """
     try:
-        return await expense_service.list_expenses(
-            user_id, itinerary_id=itinerary_id, category=category, limit=limit
+        return await expense_service.list_expenses_page(
+            user_id,
+            itinerary_id=itinerary_id,
+            category=category,
+            limit=limit,
+            cursor=cursor,
         )
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc),
+        ) from exc
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -57,13 +170,21 @@ async def list_expenses(
 
 @router.get("/summary", response_model=ExpenseSummary)
 async def get_expense_summary(
-    itinerary_id: Optional[str] = None, user_id: str = Depends(get_current_user_id)
+    request: Request,
+    itinerary_id: Optional[str] = None,
+    user_id: str = Depends(get_current_user_id),
 ):
     """
     Get expense summary with totals by category.
+
+    Carries an ``ETag``; send it back in ``If-None-Match`` to get ``304`` when
+    nothing changed.
     """
     try:
-        return await expense_service.get_expense_summary(user_id, itinerary_id)
+        representation = await expense_service.get_expense_summary_representation(
+            user_id, itinerary_id
+        )
+        return conditional_response(request, representation)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
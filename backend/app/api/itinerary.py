@@ -1,29 +1,94 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+import json
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Any, Dict, Optional, Union
 from app.schemas.itinerary import (
     ItineraryRequest,
     ItineraryResponse,
     ItineraryTextRequest,
     ItineraryFromTextResponse,
+    ItineraryPage,
+    ItinerarySummaryPage,
+    ItineraryView,
 )
+from app.schemas.job import GenerationJob, JobKind
 from app.api.deps import get_current_user_id
+from app.core.etag import conditional_response
+from app.services.generation_jobs import QueueFullError, generation_jobs
 from app.services.travel_service import travel_service
 
 router = APIRouter(prefix="/itineraries", tags=["Itineraries"])
 
+JOB_RESPONSES: Dict[Union[int, str], Dict[str, Any]] = {
+    status.HTTP_202_ACCEPTED: {
+        "model": GenerationJob,
+        "description": "Queued as a background job (`job=true`)",
+    }
+}
+
+
+async def _accept_job(
+    user_id: str,
+    kind: JobKind,
+    request: Union[ItineraryRequest, ItineraryTextRequest],
+    refresh: bool,
+    idempotency_key: Optional[str],
+) -> JSONResponse:
+    """Queue a generation and answer 202 with the job and where to poll it."""
+    try:
+        job = await generation_jobs.submit(
+            user_id,
+            kind,
+            {"request": request.model_dump(mode="json"), "use_cache": not refresh},
+            idempotency_key=idempotency_key,
+        )
+    except QueueFullError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(exc),
+            headers={"Retry-After": "5"},
+        ) from exc
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content=job.model_dump(mode="json"),
+        headers={"Location": f"/api/itineraries/jobs/{job.id}"},
+    )
+
 
-@router.post("/", response_model=ItineraryResponse, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/",
+    response_model=ItineraryResponse,
+    status_code=status.HTTP_201_CREATED,
+    responses=JOB_RESPONSES,
+)
 async def create_itinerary(
-    request: ItineraryRequest, user_id: str = Depends(get_current_user_id)
+    request: ItineraryRequest,
+    refresh: bool = Query(False, description="Skip the generated-itinerary cache"),
+    job: bool = Query(False, description="Queue generation and return 202"),
+    idempotency_key: Optional[str] = Header(None),
+    user_id: str = Depends(get_current_user_id),
 ):
     """
     Generate a personalized travel itinerary based on user preferences.
 
     This endpoint uses AI (Qwen or Doubao) to create a detailed day-by-day
-    itinerary including activities, locations, and estimated costs.
+    itinerary including activities, locations, and estimated costs. Equivalent
+    trips are served from a generation cache unless ``refresh=true``.
+
+    With ``job=true`` the request returns ``202`` and a ``GenerationJob``
+    immediately; poll ``GET /itineraries/jobs/{id}`` or subscribe to
+    ``/itineraries/jobs/{id}/events``. Retries carrying the same
+    ``Idempotency-Key`` header get the original job back.
     """
+    if job:
+        return await _accept_job(
+            user_id, JobKind.ITINERARY, request, refresh, idempotency_key
+        )
     try:
-        itinerary = await travel_service.create_itinerary(user_id, request)
+        itinerary = await travel_service.create_itinerary(
+            user_id, request, use_cache=not refresh
+        )
         return itinerary
     except Exception as e:
         raise HTTPException(
@@ -32,17 +97,66 @@ async def create_itinerary(
         )
 
 
+@router.post("/stream")
+async def stream_itinerary(
+    request: ItineraryRequest,
+    refresh: bool = Query(False, description="Skip the generated-itinerary cache"),
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    Generate an itinerary as a Server-Sent Events stream.
+
+    Emits a ``day`` event (one ``DayItinerary``) as soon as each day has been
+    generated, then a ``complete`` event with the saved ``ItineraryResponse``.
+    Failures are reported as an ``error`` event.
+    """
+
+    async def events():
+        try:
+            async for event, payload in travel_service.stream_itinerary(
+                user_id, request, use_cache=not refresh
+            ):
+                yield f"event: {event}\ndata: {payload.model_dump_json()}\n\n"
+        except Exception as e:
+            detail = json.dumps(
+                {"detail": f"Error generating itinerary: {str(e)}"},
+                ensure_ascii=False,
+            )
+            yield f"event: error\ndata: {detail}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post(
     "/from-text",
     response_model=ItineraryFromTextResponse,
     status_code=status.HTTP_201_CREATED,
+    responses=JOB_RESPONSES,
 )
 async def create_itinerary_from_text(
-    request: ItineraryTextRequest, user_id: str = Depends(get_current_user_id)
+    request: ItineraryTextRequest,
+    refresh: bool = Query(False, description="Skip the generated-itinerary cache"),
+    job: bool = Query(False, description="Queue generation and return 202"),
+    idempotency_key: Optional[str] = Header(None),
+    user_id: str = Depends(get_current_user_id),
 ):
-    """Generate itinerary directly from a natural language description."""
+    """
+    Generate itinerary directly from a natural language description.
+
+    Supports ``job=true`` and ``Idempotency-Key`` like ``POST /itineraries/``.
+    """
+    if job:
+        return await _accept_job(
+            user_id, JobKind.ITINERARY_FROM_TEXT, request, refresh, idempotency_key
+        )
     try:
-        result = await travel_service.create_itinerary_from_text(user_id, request)
+        result = await travel_service.create_itinerary_from_text(
+            user_id, request, use_cache=not refresh
+        )
         return result
     except Exception as e:
         raise HTTPException(
@@ -51,16 +165,70 @@ async def create_itinerary_from_text(
         )
 
 
-@router.get("/", response_model=List[ItineraryResponse])
+@router.get("/jobs/{job_id}", response_model=GenerationJob)
+async def get_generation_job(job_id: str, user_id: str = Depends(get_current_user_id)):
+    """Poll a generation job; ``result`` is set once ``status`` is ``succeeded``."""
+    job = generation_jobs.get(job_id, user_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Job not found"
+        )
+    return job
+
+
+@router.get("/jobs/{job_id}/events")
+async def subscribe_generation_job(
+    job_id: str, user_id: str = Depends(get_current_user_id)
+):
+    """
+    Follow a generation job as a Server-Sent Events stream.
+
+    Emits a ``status`` event with the ``GenerationJob`` now and on every
+    change, and closes after the ``succeeded`` or ``failed`` state.
+    """
+    updates = generation_jobs.subscribe(job_id, user_id)
+    if updates is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Job not found"
+        )
+
+    async def events():
+        async for state in updates:
+            yield f"event: status\ndata: {state.model_dump_json()}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/", response_model=Union[ItineraryPage, ItinerarySummaryPage])
 async def list_itineraries(
-    limit: int = 20, user_id: str = Depends(get_current_user_id)
+    request: Request,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    view: ItineraryView = ItineraryView.FULL,
+    user_id: str = Depends(get_current_user_id),
 ):
     """
     List all itineraries for the current user.
+
+    Results are newest first; pass the returned ``next_cursor`` as ``cursor``
+    to fetch the following page. ``view=summary`` omits ``daily_itinerary``;
+    fetch the full document from ``GET /itineraries/{id}``. Responses carry an
+    ``ETag`` and honour ``If-None-Match``.
     """
     try:
-        itineraries = await travel_service.list_itineraries(user_id, limit)
-        return itineraries
+        representation = await travel_service.list_itineraries_representation(
+            user_id, limit, cursor, view=view
+        )
+        return conditional_response(request, representation)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc),
+        ) from exc
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -69,16 +237,23 @@ async def list_itineraries(
 
 
 @router.get("/{itinerary_id}", response_model=ItineraryResponse)
-async def get_itinerary(itinerary_id: str, user_id: str = Depends(get_current_user_id)):
+async def get_itinerary(
+    itinerary_id: str, request: Request, user_id: str = Depends(get_current_user_id)
+):
     """
     Get a specific itinerary by ID.
+
+    Carries an ``ETag``; send it back in ``If-None-Match`` to get ``304`` when
+    the itinerary has not changed.
     """
-    itinerary = await travel_service.get_itinerary(itinerary_id, user_id)
-    if not itinerary:
+    representation = await travel_service.get_itinerary_representation(
+        itinerary_id, user_id
+    )
+    if not representation:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Itinerary not found"
         )
-    return itinerary
+    return conditional_response(request, representation)
 
 
 @router.delete("/{itinerary_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Optional
+from app.schemas.sync import SyncChanges
+from app.services.sync_service import sync_service
+from app.api.deps import get_current_user_id
+
+router = APIRouter(prefix="/sync", tags=["Sync"])
+
+
+@router.get("/changes", response_model=SyncChanges)
+async def get_changes(
+    since: Optional[str] = Query(None, description="Token from the previous sync"),
+    limit: int = Query(500, ge=1, le=1000),
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    Get expenses and itineraries changed since the last sync.
+
+    Omit ``since`` for the initial sync. Deleted records come back as
+    tombstones; keep calling with ``next_token`` while ``has_more`` is true.
+    """
+    try:
+        return await sync_service.get_changes(user_id, since=since, limit=limit)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc),
+        ) from exc
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error fetching changes: {str(e)}",
+        )
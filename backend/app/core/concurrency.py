@@ -0,0 +1,25 @@
+"""Helpers for composing independent async calls."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, List
+
+
+async def run_concurrently(*awaitables: Awaitable[Any]) -> List[Any]:
+    """
+    Await independent calls concurrently and return their results in order.
+
+    If any call fails, the others are cancelled and awaited, and the first
+    error is re-raised as-is so callers keep their usual ``except`` clauses.
+    Cancelling the caller cancels every call.
+    """
+    tasks = [asyncio.ensure_future(awaitable) for awaitable in awaitables]
+    try:
+        return list(await asyncio.gather(*tasks))
+    except BaseException:
+        # gather leaves the remaining calls running after an error.
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
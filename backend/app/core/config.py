@@ -15,10 +15,45 @@ class Settings(BaseSettings):
     PORT: int = 8000
 
     # Supabase
-    SUPABASE_URL: str
-    SUPABASE_KEY: str
+    SUPABASE_URL: Optional[str] = None
+    SUPABASE_KEY: Optional[str] = None
     SUPABASE_SERVICE_ROLE_KEY: Optional[str] = None
 
+    # Database access
+    DATABASE_BACKEND: str = "supabase"  # supabase or sqlite
+    SQLITE_PATH: str = ":memory:"
+    DB_TIMEOUT: float = 10.0
+    DB_MAX_CONNECTIONS: int = 20
+    DB_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    DB_KEEPALIVE_EXPIRY: float = 30.0
+    DB_MAX_CONCURRENCY: int = 16
+    DB_HTTP2: bool = False
+
+    # Itinerary cache
+    ITINERARY_CACHE_MAX_ENTRIES: int = 512
+    ITINERARY_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    ITINERARY_CACHE_TTL_SECONDS: float = 600.0
+
+    # Bulk expense import
+    EXPENSE_BULK_BATCH_SIZE: int = 500
+    EXPENSE_BULK_MAX_ROWS: int = 10000
+
+    # Expense rollups
+    EXPENSE_ROLLUP_MAX_ENTRIES: int = 4096
+    EXPENSE_ROLLUP_RECONCILE_SECONDS: float = 300.0  # 0 disables reconciliation
+
+    # Expense write-behind buffering
+    EXPENSE_WRITE_BEHIND_ENABLED: bool = False
+    EXPENSE_WAL_PATH: str = "data/expense-wal.ndjson"
+    EXPENSE_WRITE_BEHIND_FLUSH_SIZE: int = 100
+    EXPENSE_WRITE_BEHIND_FLUSH_SECONDS: float = 1.0
+    EXPENSE_WRITE_BEHIND_MAX_PENDING: int = 10000
+
+    # Delta sync: changes newer than this are sent but the token stays before
+    # them, so a write transaction still committing with a lower seq is not
+    # skipped. Must exceed the longest write transaction plus clock skew.
+    SYNC_VISIBILITY_MARGIN_SECONDS: float = 5.0
+
     # iFlytek API
     IFLYTEK_APP_ID: Optional[str] = None
     IFLYTEK_API_KEY: Optional[str] = None
@@ -33,6 +68,48 @@ class Settings(BaseSettings):
     DOUBAO_API_KEY: Optional[str] = None
     DOUBAO_MODEL: str = "doubao-pro"
     LLM_PROVIDER: str = "qwen"  # qwen or doubao
+    LLM_TIMEOUT: float = 40.0
+    LLM_MAX_CONNECTIONS: int = 20
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    LLM_KEEPALIVE_EXPIRY: float = 60.0
+    LLM_HTTP2: bool = False  # requires httpx[http2]
+    # Calls go to the healthiest provider with an API key, LLM_PROVIDER first
+    # while there is no data; optionally hedged to the next one after p95.
+    LLM_HEDGE_ENABLED: bool = False
+    LLM_HEDGE_MIN_DELAY: float = 1.0
+    LLM_HEALTH_WINDOW: int = 50
+    LLM_HEALTH_MAX_AGE_SECONDS: float = 300.0
+    # Per provider API key limits (0 = unlimited). Calls beyond them queue,
+    # interactive before background jobs, for up to LLM_QUEUE_TIMEOUT
+    # seconds; 429s, 5xx and timeouts are retried honoring Retry-After.
+    LLM_QWEN_QPS: float = 0
+    LLM_QWEN_TPM: int = 0
+    LLM_DOUBAO_QPS: float = 0
+    LLM_DOUBAO_TPM: int = 0
+    LLM_QUEUE_TIMEOUT: float = 30.0
+    LLM_MAX_RETRIES: int = 2
+    LLM_RETRY_BASE_DELAY: float = 1.0
+    # Completion tokens charged against TPM up front, corrected from usage.
+    LLM_COMPLETION_TOKENS_ESTIMATE: int = 2000
+    # Trips at least this many days long are planned as a skeleton plus
+    # concurrent per-day calls; 0 keeps single-prompt generation.
+    LLM_PARALLEL_DAYS_THRESHOLD: int = 0
+    LLM_DAY_CONCURRENCY: int = 4
+    LLM_DAY_MAX_ATTEMPTS: int = 2
+
+    # Generated itinerary cache
+    GENERATION_CACHE_BACKEND: str = "memory"  # memory, disk or none
+    GENERATION_CACHE_DIR: str = "data/generation-cache"
+    GENERATION_CACHE_MAX_ENTRIES: int = 1024
+    GENERATION_CACHE_TTL_SECONDS: float = 24 * 60 * 60
+    GENERATION_CACHE_BUDGET_STEP: float = 500.0
+
+    # Background generation jobs
+    GENERATION_JOB_WORKERS: int = 2
+    GENERATION_JOB_MAX_QUEUED: int = 100
+    GENERATION_JOB_STORE: str = "memory"  # memory or disk
+    GENERATION_JOB_DIR: str = "data/generation-jobs"
+    GENERATION_JOB_TTL_SECONDS: float = 24 * 60 * 60
 
     # CORS
     CORS_ORIGINS: str = "http://localhost:5173,http://localhost:3000"
@@ -41,6 +118,10 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    TOKEN_REVOCATION_ENABLED: bool = True
+    USER_CACHE_MAX_SIZE: int = 1024
+    USER_CACHE_TTL_SECONDS: float = 60.0
+    USER_CACHE_NEGATIVE_TTL_SECONDS: float = 5.0
 
     # Logging
     LOG_LEVEL: str = "INFO"
@@ -1,5 +1,8 @@
+from typing import Optional
+
 from supabase import create_client, Client
 from app.core.config import settings
+from app.repositories.base import Repository
 
 
 class SupabaseClient:
@@ -24,3 +27,53 @@ class SupabaseClient:
 def get_supabase_client() -> Client:
     """Get Supabase client for dependency injection."""
     return SupabaseClient().client
+
+
+_repository: Optional[Repository] = None
+
+
+def create_repository() -> Repository:
+    """Build the repository selected by ``settings.DATABASE_BACKEND``."""
+    backend = settings.DATABASE_BACKEND.lower()
+
+    if backend == "sqlite":
+        from app.repositories.sqlite_repository import SQLiteRepository
+
+        return SQLiteRepository(settings.SQLITE_PATH)
+
+    if backend == "supabase":
+        from app.repositories.supabase_repository import SupabaseRepository
+
+        supabase_key = settings.SUPABASE_SERVICE_ROLE_KEY or settings.SUPABASE_KEY
+        if not settings.SUPABASE_URL or not supabase_key:
+            raise RuntimeError(
+                "SUPABASE_URL and SUPABASE_KEY are required for the supabase backend"
+            )
+        return SupabaseRepository(
+            settings.SUPABASE_URL,
+            supabase_key,
+            timeout=settings.DB_TIMEOUT,
+            max_connections=settings.DB_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.DB_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.DB_KEEPALIVE_EXPIRY,
+            max_concurrency=settings.DB_MAX_CONCURRENCY,
+            http2=settings.DB_HTTP2,
+        )
+
+    raise ValueError(f"Unsupported DATABASE_BACKEND: {settings.DATABASE_BACKEND}")
+
+
+def get_repository() -> Repository:
+    """Get the shared async repository used by the service layer."""
+    global _repository
+    if _repository is None:
+        _repository = create_repository()
+    return _repository
+
+
+async def close_repository() -> None:
+    """Close the shared repository's pooled connections."""
+    global _repository
+    if _repository is not None:
+        await _repository.aclose()
+        _repository = None
@@ -0,0 +1,46 @@
+"""Strong ETags and conditional GET responses for cached JSON payloads."""
+
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import Request, Response, status
+from pydantic import BaseModel
+
+
+@dataclass(frozen=True)
+class Representation:
+    """A serialized JSON body and its strong ETag, built once and reused."""
+
+    body: bytes
+    etag: str
+
+    @classmethod
+    def of_model(cls, model: BaseModel) -> "Representation":
+        body = model.model_dump_json().encode()
+        return cls(
+            body=body, etag=f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        )
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an ``If-None-Match`` header matches ``etag`` (weak comparison)."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def conditional_response(request: Request, representation: Representation) -> Response:
+    """Answer 304 when the client already holds ``representation``, else send it."""
+    headers = {"ETag": representation.etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), representation.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(
+        content=representation.body, media_type="application/json", headers=headers
+    )
@@ -0,0 +1,117 @@
+"""Application-lifetime HTTP clients with keep-alive pools and reuse counters."""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+import httpx
+
+
+@dataclass
+class ConnectionStats:
+    """Counts how often requests found a pooled connection versus opening one."""
+
+    requests: int = 0
+    connections_opened: int = 0
+    tls_handshakes: int = 0
+    reused: int = 0
+    errors: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = asdict(self)
+        stats["reuse_rate"] = (self.reused / self.requests) if self.requests else 0.0
+        return stats
+
+
+class _TracingTransport(httpx.AsyncHTTPTransport):
+    """Transport that records, per request, whether a new connection was opened."""
+
+    def __init__(self, stats: ConnectionStats, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        opened = False
+        outer_trace = request.extensions.get("trace")
+
+        async def trace(event: str, info: Dict[str, Any]) -> None:
+            nonlocal opened
+            if event == "connection.connect_tcp.complete":
+                opened = True
+                self._stats.connections_opened += 1
+            elif event == "connection.start_tls.complete":
+                self._stats.tls_handshakes += 1
+            if outer_trace is not None:
+                await outer_trace(event, info)
+
+        request.extensions["trace"] = trace
+        self._stats.requests += 1
+        try:
+            response = await super().handle_async_request(request)
+        except Exception:
+            self._stats.errors += 1
+            raise
+        if not opened:
+            self._stats.reused += 1
+        return response
+
+
+class HTTPClientPool:
+    """
+    One shared ``httpx.AsyncClient`` per upstream service.
+
+    Clients are created on first use (or eagerly via :meth:`start`) and kept
+    for the life of the process, so repeated calls to the same provider reuse
+    warm keep-alive connections instead of paying DNS, TCP and TLS setup on
+    every request. HTTP/2 requires the ``h2`` package (``httpx[http2]``).
+    """
+
+    def __init__(
+        self,
+        *,
+        timeout: float = 40.0,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 60.0,
+        http2: bool = False,
+    ) -> None:
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._stats: Dict[str, ConnectionStats] = {}
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        """Return the shared client for ``name``, creating it if needed."""
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            stats = self._stats.setdefault(name, ConnectionStats())
+            client = httpx.AsyncClient(
+                timeout=self.timeout,
+                transport=_TracingTransport(
+                    stats, limits=self.limits, http2=self.http2
+                ),
+            )
+            self._clients[name] = client
+        return client
+
+    def start(self, *names: str) -> None:
+        """Create the clients for ``names`` up front."""
+        for name in names:
+            self.get(name)
+
+    async def aclose(self, name: Optional[str] = None) -> None:
+        """Close one client, or every client when ``name`` is omitted."""
+        names = [name] if name is not None else list(self._clients)
+        for key in names:
+            client = self._clients.pop(key, None)
+            if client is not None:
+                await client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: stats.to_dict() for name, stats in self._stats.items()}
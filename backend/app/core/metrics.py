@@ -0,0 +1,17 @@
+"""Registry of runtime counters exposed by the ``/metrics`` endpoint."""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict
+
+_sources: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register_metrics_source(name: str, collector: Callable[[], Dict[str, Any]]) -> None:
+    """Register a callable returning a JSON-serializable snapshot under ``name``."""
+    _sources[name] = collector
+
+
+def collect_metrics() -> Dict[str, Dict[str, Any]]:
+    """Snapshot every registered metrics source."""
+    return {name: collector() for name, collector in _sources.items()}
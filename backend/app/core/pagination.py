@@ -0,0 +1,54 @@
+"""Opaque keyset cursors for (created_at, id) ordered listings."""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+
+def format_timestamp(value: datetime) -> str:
+    """
+    ISO timestamp with microseconds always written out.
+
+    SQLite compares ``created_at`` as text, so every stored value and every
+    cursor must use the same fixed-width form; ``isoformat()`` alone drops
+    the fraction when it is zero, and ``str()`` uses a space separator.
+    """
+    return value.isoformat(timespec="microseconds")
+
+
+def encode_cursor(created_at: Any, record_id: Any) -> str:
+    """Encode the position of the last row on a page."""
+    if isinstance(created_at, datetime):
+        created_at = format_timestamp(created_at)
+    # Stored strings are kept verbatim so the keyset compares like the rows.
+    payload = json.dumps([str(created_at), str(record_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Decode a cursor produced by :func:`encode_cursor`; raise ValueError if invalid."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, record_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError, TypeError) as exc:
+        raise ValueError("Invalid pagination cursor") from exc
+    if not isinstance(created_at, str) or not isinstance(record_id, str):
+        raise ValueError("Invalid pagination cursor")
+    return created_at, record_id
+
+
+def next_cursor_for(rows: list, limit: int) -> Optional[str]:
+    """
+    Build the cursor for the page after ``rows``.
+
+    Callers fetch ``limit + 1`` rows; the extra row only signals that another
+    page exists and is trimmed off by the caller.
+    """
+    if len(rows) <= limit or limit <= 0:
+        return None
+    last: Dict[str, Any] = rows[limit - 1]
+    return encode_cursor(last.get("created_at"), last.get("id"))
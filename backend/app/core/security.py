@@ -0,0 +1,114 @@
+"""Signed access tokens for stateless request authentication."""
+
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from jose import JWTError, jwt
+
+from app.core.config import settings
+
+
+@dataclass
+class TokenPayload:
+    """Claims extracted from a verified access token."""
+
+    subject: str
+    token_id: str
+    expires_at: datetime
+
+
+class InvalidTokenError(Exception):
+    """Raised when an access token is malformed, expired or revoked."""
+
+
+class TokenRevocationList:
+    """In-process set of revoked token ids, pruned once they expire."""
+
+    def __init__(self) -> None:
+        self._revoked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def revoke(self, token_id: str, expires_at: datetime) -> None:
+        with self._lock:
+            self._revoked[token_id] = expires_at.timestamp()
+            self._prune(time.time())
+
+    def is_revoked(self, token_id: str) -> bool:
+        if not self._revoked:
+            return False
+        with self._lock:
+            expiry = self._revoked.get(token_id)
+            if expiry is None:
+                return False
+            if expiry <= time.time():
+                self._revoked.pop(token_id, None)
+                return False
+            return True
+
+    def _prune(self, now: float) -> None:
+        expired = [key for key, expiry in self._revoked.items() if expiry <= now]
+        for key in expired:
+            del self._revoked[key]
+
+
+token_revocation_list = TokenRevocationList()
+
+
+def create_access_token(
+    subject: str, expires_delta: Optional[timedelta] = None
+) -> tuple[str, datetime]:
+    """Issue a signed access token for ``subject`` and return it with its expiry."""
+    expires_at = datetime.now(timezone.utc) + (
+        expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    claims = {
+        "sub": subject,
+        "jti": uuid.uuid4().hex,
+        "exp": int(expires_at.timestamp()),
+    }
+    token = jwt.encode(claims, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    return token, expires_at
+
+
+def decode_access_token(token: str) -> TokenPayload:
+    """
+    Verify an access token locally and return its claims.
+
+    The signature and expiry are checked without touching the database; the
+    revocation list is consulted only when ``TOKEN_REVOCATION_ENABLED`` is on.
+    """
+    try:
+        claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError as exc:
+        raise InvalidTokenError(str(exc)) from exc
+
+    subject = claims.get("sub")
+    token_id = claims.get("jti")
+    expires = claims.get("exp")
+    if not subject or not token_id or expires is None:
+        raise InvalidTokenError("Token is missing required claims")
+
+    if settings.TOKEN_REVOCATION_ENABLED and token_revocation_list.is_revoked(token_id):
+        raise InvalidTokenError("Token has been revoked")
+
+    return TokenPayload(
+        subject=str(subject),
+        token_id=str(token_id),
+        expires_at=datetime.fromtimestamp(int(expires), tz=timezone.utc),
+    )
+
+
+def revoke_access_token(token: str) -> bool:
+    """Add a still-valid token to the revocation list."""
+    try:
+        payload = decode_access_token(token)
+    except InvalidTokenError:
+        return False
+    token_revocation_list.revoke(payload.token_id, payload.expires_at)
+    return True
@@ -0,0 +1,93 @@
+"""Coalesce concurrent identical async calls into one shared execution."""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Called in the shared call's context before it starts.
+StartHook = Callable[[], None]
+# Called in a joining caller's context with the shared call's context.
+JoinHook = Callable[[contextvars.Context], None]
+
+
+class _Flight:
+    __slots__ = ("task", "context", "waiters")
+
+    def __init__(self, task: asyncio.Task, context: contextvars.Context) -> None:
+        self.task = task
+        self.context = context
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Run at most one call per key at a time and share its outcome.
+
+    The first caller for a key starts ``factory()`` as a task; callers that
+    arrive while it is running await the same task and receive the same
+    result or exception. Waiters are reference counted: a caller that is
+    cancelled (e.g. its client disconnected) only drops its reference, and
+    the shared task is cancelled once no caller is waiting for it.
+
+    Each call gets a copy of the first caller's context, in which ``start``
+    is called before the task is created from it. ``join`` is called for
+    every later caller with that context, so it can carry state of the new
+    caller over into the running call (e.g. raise its scheduling priority).
+    The task and the tasks it spawns copy the context, so that state has to
+    be a mutable object set up by ``start``; setting a context variable in
+    ``join`` does not reach them.
+    """
+
+    def __init__(
+        self, start: Optional[StartHook] = None, join: Optional[JoinHook] = None
+    ) -> None:
+        self._start = start
+        self._join = join
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.calls = 0
+        self.shared = 0
+        self.cancelled = 0
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        flight = self._flights.get(key)
+        if flight is None or flight.task.done():
+            context = contextvars.copy_context()
+            if self._start is not None:
+                context.run(self._start)
+            # The task copies the context it is created in (create_task's
+            # context argument needs Python 3.11).
+            task = context.run(asyncio.get_running_loop().create_task, factory())
+            flight = _Flight(task, context)
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            self.calls += 1
+        else:
+            self.shared += 1
+            if self._join is not None:
+                self._join(flight.context)
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+                self._forget(key, flight)
+                self.cancelled += 1
+
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._flights),
+            "calls": self.calls,
+            "shared": self.shared,
+            "cancelled": self.cancelled,
+        }
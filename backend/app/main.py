@@ -2,8 +2,13 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
+from app.core.database import close_repository
 from app.core.logging import get_logger, setup_logging
-from app.api import auth, itinerary, expense, navigation, voice
+from app.core.metrics import collect_metrics
+from app.api import auth, itinerary, expense, navigation, voice, sync
+from app.services.expense_service import expense_service
+from app.services.generation_jobs import generation_jobs
+from app.services.llm_service import llm_service
 
 
 # Initialize logging before creating the application instance.
@@ -35,17 +40,27 @@ app.include_router(itinerary.router, prefix="/api")
 app.include_router(expense.router, prefix="/api")
 app.include_router(navigation.router, prefix="/api")
 app.include_router(voice.router, prefix="/api")
+app.include_router(sync.router, prefix="/api")
 
 
 @app.on_event("startup")
 async def on_startup() -> None:
-    """Log successful startup."""
+    """Start background jobs and log successful startup."""
+    llm_service.start()
+    await expense_service.start_write_behind()
+    expense_service.start_rollup_reconciler()
+    await generation_jobs.start()
     logger.info("%s v%s is starting up", settings.APP_NAME, settings.APP_VERSION)
 
 
 @app.on_event("shutdown")
 async def on_shutdown() -> None:
-    """Log graceful shutdown."""
+    """Stop background jobs, release pooled connections and log shutdown."""
+    await generation_jobs.stop()
+    await expense_service.stop_rollup_reconciler()
+    await expense_service.stop_write_behind()
+    await llm_service.aclose()
+    await close_repository()
     logger.info("%s is shutting down", settings.APP_NAME)
 
 
@@ -69,6 +84,12 @@ async def health_check():
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """Runtime counters for caches and connection pools."""
+    return collect_metrics()
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,5 @@
+"""Async data-access layer shared by the service modules."""
+
+from app.repositories.base import QueryResult, Repository, TableQuery
+
+__all__ = ["QueryResult", "Repository", "TableQuery"]
@@ -0,0 +1,128 @@
+"""Backend-agnostic query builder and repository contract."""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+
+@dataclass
+class QueryResult:
+    """Rows returned by a repository call."""
+
+    data: List[Dict[str, Any]] = field(default_factory=list)
+    count: Optional[int] = None
+
+
+class TableQuery:
+    """
+    Fluent description of a single table operation.
+
+    The builder mirrors the subset of the PostgREST API used by the services
+    (``select/insert/update/delete`` with ``eq/order/limit``) but only records
+    the operation; ``await query.execute()`` hands it to the owning repository.
+    """
+
+    def __init__(self, repository: "Repository", table: str) -> None:
+        self._repository = repository
+        self.table = table
+        self.action = "select"
+        self.columns = "*"
+        self.payload: Optional[Union[Dict[str, Any], List[Dict[str, Any]]]] = None
+        self.upsert = False
+        self.filters: List[Tuple[str, str, Any]] = []
+        self.orders: List[Tuple[str, bool]] = []
+        self.limit_count: Optional[int] = None
+        self.keyset: Optional[Tuple[Tuple[str, str], Tuple[Any, Any], bool]] = None
+
+    def select(self, columns: str = "*") -> "TableQuery":
+        self.action = "select"
+        self.columns = columns
+        return self
+
+    def insert(
+        self,
+        payload: Union[Dict[str, Any], List[Dict[str, Any]]],
+        upsert: bool = False,
+    ) -> "TableQuery":
+        """Insert rows; with ``upsert=True`` rows whose key exists are replaced."""
+        self.action = "insert"
+        self.payload = payload
+        self.upsert = upsert
+        return self
+
+    def update(self, payload: Dict[str, Any]) -> "TableQuery":
+        self.action = "update"
+        self.payload = payload
+        return self
+
+    def delete(self) -> "TableQuery":
+        self.action = "delete"
+        return self
+
+    def returning(self, columns: str) -> "TableQuery":
+        """Columns returned by an insert, update or delete (all by default)."""
+        self.columns = columns
+        return self
+
+    def eq(self, column: str, value: Any) -> "TableQuery":
+        self.filters.append((column, "eq", value))
+        return self
+
+    def gt(self, column: str, value: Any) -> "TableQuery":
+        self.filters.append((column, "gt", value))
+        return self
+
+    def in_(self, column: str, values: List[Any]) -> "TableQuery":
+        self.filters.append((column, "in", list(values)))
+        return self
+
+    def after(
+        self, columns: Tuple[str, str], values: Tuple[Any, Any], desc: bool = True
+    ) -> "TableQuery":
+        """
+        Keep rows strictly past ``values`` in ``(columns[0], columns[1])`` order.
+
+        With ``desc=True`` this is ``a < x OR (a = x AND b < y)``, i.e. the
+        rows that follow a keyset cursor in a newest-first listing.
+        """
+        self.keyset = (columns, values, desc)
+        return self
+
+    def order(self, column: str, desc: bool = False) -> "TableQuery":
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, count: int) -> "TableQuery":
+        self.limit_count = count
+        return self
+
+    @property
+    def selected_columns(self) -> List[str]:
+        """Column names requested by ``select``/``returning``; empty means all."""
+        if self.columns.strip() == "*":
+            return []
+        return [column.strip() for column in self.columns.split(",") if column.strip()]
+
+    async def execute(self) -> QueryResult:
+        return await self._repository.execute(self)
+
+
+class Repository(ABC):
+    """Storage backend used by the service layer."""
+
+    def table(self, name: str) -> TableQuery:
+        """Start building a query against ``name``."""
+        return TableQuery(self, name)
+
+    @abstractmethod
+    async def execute(self, query: TableQuery) -> QueryResult:
+        """Run a query built with :meth:`table`."""
+
+    @abstractmethod
+    async def rpc(self, function: str, params: Dict[str, Any]) -> QueryResult:
+        """Call a named database function (e.g. a server-side aggregate)."""
+
+    async def aclose(self) -> None:
+        """Release pooled resources held by the backend."""
@@ -0,0 +1,298 @@
+"""In-process SQLite repository mirroring the Supabase tables."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Sequence, Tuple
+
+from app.core.pagination import format_timestamp
+from app.repositories.base import QueryResult, Repository, TableQuery
+
+# Column definitions follow the Supabase schema documented in README.md.
+TABLE_SCHEMAS: Dict[str, Dict[str, str]] = {
+    "itineraries": {
+        "id": "TEXT PRIMARY KEY",
+        "user_id": "TEXT NOT NULL",
+        "destination": "TEXT NOT NULL",
+        "start_date": "TEXT NOT NULL",
+        "end_date": "TEXT NOT NULL",
+        "budget": "REAL NOT NULL",
+        "daily_itinerary": "TEXT NOT NULL",
+        "total_estimated_cost": "REAL NOT NULL",
+        "recommendations": "TEXT",
+        "created_at": "TEXT",
+        "updated_at": "TEXT",
+    },
+    "expenses": {
+        "id": "TEXT PRIMARY KEY",
+        "user_id": "TEXT NOT NULL",
+        "itinerary_id": "TEXT",
+        "category": "TEXT NOT NULL",
+        "amount": "REAL NOT NULL",
+        "description": "TEXT NOT NULL",
+        "date": "TEXT NOT NULL",
+        "location": "TEXT",
+        "created_at": "TEXT",
+        "updated_at": "TEXT",
+    },
+    "users": {
+        "user_id": "TEXT NOT NULL",
+        "password": "TEXT",
+    },
+    "sync_changes": {
+        "seq": "INTEGER PRIMARY KEY AUTOINCREMENT",
+        "user_id": "TEXT NOT NULL",
+        "entity": "TEXT NOT NULL",
+        "entity_id": "TEXT NOT NULL",
+        "op": "TEXT NOT NULL",
+        "changed_at": "TEXT",
+    },
+}
+
+INDEXES: Sequence[str] = (
+    "CREATE INDEX IF NOT EXISTS idx_itineraries_user ON itineraries (user_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_expenses_user ON expenses (user_id, itinerary_id)",
+    "CREATE INDEX IF NOT EXISTS idx_users_user_id ON users (user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_sync_changes_user ON sync_changes (user_id, seq)",
+)
+
+# (table, entity) pairs whose writes are recorded in sync_changes, like the
+# log_sync_change trigger in README.md.
+SYNCED_TABLES: Sequence[Tuple[str, str]] = (
+    ("expenses", "expense"),
+    ("itineraries", "itinerary"),
+)
+
+JSON_COLUMNS = {"daily_itinerary"}
+
+FILTER_OPERATORS = {
+    "eq": "=",
+    "neq": "!=",
+    "lt": "<",
+    "lte": "<=",
+    "gt": ">",
+    "gte": ">=",
+}
+
+
+class SQLiteRepository(Repository):
+    """
+    Repository backed by a local SQLite database.
+
+    It understands the same query patterns the services send to Supabase, so
+    the API can run and be load-tested on a single box. ``path=":memory:"``
+    keeps everything in process. A single worker thread owns the connection,
+    which serializes access without blocking the event loop.
+    """
+
+    def __init__(self, path: str = ":memory:") -> None:
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="sqlite-repository"
+        )
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._create_schema()
+
+    def _create_schema(self) -> None:
+        with self._connection:
+            for table, columns in TABLE_SCHEMAS.items():
+                definition = ", ".join(
+                    f"{name} {column_type}" for name, column_type in columns.items()
+                )
+                self._connection.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} ({definition})"
+                )
+            for statement in INDEXES:
+                self._connection.execute(statement)
+            for table, entity in SYNCED_TABLES:
+                for event, row, op in (
+                    ("INSERT", "NEW", "upsert"),
+                    ("UPDATE", "NEW", "upsert"),
+                    ("DELETE", "OLD", "delete"),
+                ):
+                    self._connection.execute(
+                        f"CREATE TRIGGER IF NOT EXISTS {table}_sync_{event.lower()} "
+                        f"AFTER {event} ON {table} BEGIN "
+                        "INSERT INTO sync_changes "
+                        "(user_id, entity, entity_id, op, changed_at) "
+                        f"VALUES ({row}.user_id, '{entity}', {row}.id, '{op}', "
+                        "strftime('%Y-%m-%dT%H:%M:%f', 'now')); END"
+                    )
+
+    def _columns(self, table: str) -> Dict[str, str]:
+        try:
+            return TABLE_SCHEMAS[table]
+        except KeyError as exc:
+            raise ValueError(f"Unknown table: {table}") from exc
+
+    def _check_column(self, table: str, column: str) -> str:
+        if column not in self._columns(table):
+            raise ValueError(f"Unknown column {column!r} for table {table!r}")
+        return column
+
+    def _encode(self, column: str, value: Any) -> Any:
+        if column in JSON_COLUMNS and value is not None:
+            return json.dumps(value, ensure_ascii=False)
+        if hasattr(value, "value"):
+            return value.value
+        return value
+
+    def _decode_row(self, row: sqlite3.Row) -> Dict[str, Any]:
+        record = dict(row)
+        for column in JSON_COLUMNS.intersection(record):
+            if record[column] is not None:
+                record[column] = json.loads(record[column])
+        return record
+
+    def _where_clause(self, query: TableQuery) -> Tuple[str, List[Any]]:
+        clauses = []
+        params: List[Any] = []
+        for column, operator, value in query.filters:
+            self._check_column(query.table, column)
+            if operator == "in":
+                if not value:
+                    clauses.append("0")
+                    continue
+                clauses.append(f"{column} IN ({', '.join('?' for _ in value)})")
+                params.extend(self._encode(column, item) for item in value)
+                continue
+            if operator not in FILTER_OPERATORS:
+                raise ValueError(f"Unsupported filter operator: {operator}")
+            clauses.append(f"{column} {FILTER_OPERATORS[operator]} ?")
+            params.append(self._encode(column, value))
+        if query.keyset is not None:
+            (first, second), (first_value, second_value), desc = query.keyset
+            self._check_column(query.table, first)
+            self._check_column(query.table, second)
+            operator = "<" if desc else ">"
+            clauses.append(
+                f"({first} {operator} ? OR ({first} = ? AND {second} {operator} ?))"
+            )
+            params.extend([first_value, first_value, second_value])
+        if not clauses:
+            return "", params
+        return " WHERE " + " AND ".join(clauses), params
+
+    def _returning_clause(self, query: TableQuery) -> str:
+        columns = [
+            self._check_column(query.table, column) for column in query.selected_columns
+        ]
+        return ", ".join(columns) if columns else "*"
+
+    def _prepare_row(self, table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        columns = self._columns(table)
+        prepared = {
+            self._check_column(table, column): self._encode(column, value)
+            for column, value in row.items()
+        }
+        if "id" in columns and not prepared.get("id"):
+            prepared["id"] = str(uuid.uuid4())
+        if "created_at" in columns and not prepared.get("created_at"):
+            prepared["created_at"] = format_timestamp(datetime.now())
+        return prepared
+
+    def _run(self, query: TableQuery) -> QueryResult:
+        table = query.table
+        self._columns(table)
+        where, params = self._where_clause(query)
+
+        if query.action == "select":
+            sql = f"SELECT {self._returning_clause(query)} FROM {table}{where}"
+            if query.orders:
+                sql += " ORDER BY " + ", ".join(
+                    f"{self._check_column(table, column)} {'DESC' if desc else 'ASC'}"
+                    for column, desc in query.orders
+                )
+            if query.limit_count is not None:
+                sql += " LIMIT ?"
+                params.append(query.limit_count)
+            rows = self._connection.execute(sql, params).fetchall()
+            return QueryResult(data=[self._decode_row(row) for row in rows])
+
+        if query.action == "insert":
+            payload = query.payload
+            records = payload if isinstance(payload, list) else [payload]
+            verb = "INSERT OR REPLACE" if query.upsert else "INSERT"
+            returning = self._returning_clause(query)
+            data: List[Dict[str, Any]] = []
+            with self._connection:
+                for record in records:
+                    prepared = self._prepare_row(table, record)
+                    columns = ", ".join(prepared)
+                    placeholders = ", ".join("?" for _ in prepared)
+                    cursor = self._connection.execute(
+                        f"{verb} INTO {table} ({columns}) VALUES ({placeholders}) "
+                        f"RETURNING {returning}",
+                        list(prepared.values()),
+                    )
+                    data.extend(self._decode_row(row) for row in cursor.fetchall())
+            return QueryResult(data=data)
+
+        if query.action == "update":
+            assignments = {
+                self._check_column(table, column): self._encode(column, value)
+                for column, value in (query.payload or {}).items()
+            }
+            if not assignments:
+                return QueryResult()
+            set_clause = ", ".join(f"{column} = ?" for column in assignments)
+            with self._connection:
+                cursor = self._connection.execute(
+                    f"UPDATE {table} SET {set_clause}{where} "
+                    f"RETURNING {self._returning_clause(query)}",
+                    list(assignments.values()) + params,
+                )
+                rows = cursor.fetchall()
+            return QueryResult(data=[self._decode_row(row) for row in rows])
+
+        if query.action == "delete":
+            with self._connection:
+                cursor = self._connection.execute(
+                    f"DELETE FROM {table}{where} "
+                    f"RETURNING {self._returning_clause(query)}",
+                    params,
+                )
+                rows = cursor.fetchall()
+            return QueryResult(data=[self._decode_row(row) for row in rows])
+
+        raise ValueError(f"Unsupported query action: {query.action}")
+
+    def _expense_summary(self, params: Dict[str, Any]) -> QueryResult:
+        """Per-category totals, mirroring the ``expense_summary`` SQL function."""
+        rows = self._connection.execute(
+            "SELECT category, SUM(amount) AS total, COUNT(*) AS count "
+            "FROM expenses WHERE user_id = ? AND (? IS NULL OR itinerary_id = ?) "
+            "GROUP BY category",
+            (
+                params.get("p_user_id"),
+                params.get("p_itinerary_id"),
+                params.get("p_itinerary_id"),
+            ),
+        ).fetchall()
+        return QueryResult(data=[dict(row) for row in rows])
+
+    def _run_rpc(self, function: str, params: Dict[str, Any]) -> QueryResult:
+        procedures = {"expense_summary": self._expense_summary}
+        if function not in procedures:
+            raise ValueError(f"Unknown function: {function}")
+        return procedures[function](params)
+
+    async def execute(self, query: TableQuery) -> QueryResult:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._run, query)
+
+    async def rpc(self, function: str, params: Dict[str, Any]) -> QueryResult:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, self._run_rpc, function, params
+        )
+
+    async def aclose(self) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._connection.close)
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,147 @@
+"""Async Supabase (PostgREST) repository with a pooled HTTP transport."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, Union
+
+import httpx
+from postgrest import AsyncPostgrestClient
+from postgrest.utils import sanitize_param
+
+from app.repositories.base import QueryResult, Repository, TableQuery
+
+
+class _PooledPostgrestClient(AsyncPostgrestClient):
+    """PostgREST client whose session uses explicit pool limits."""
+
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        headers: Dict[str, str],
+        timeout: float,
+        limits: httpx.Limits,
+        http2: bool,
+    ) -> None:
+        self._limits = limits
+        self._http2 = http2
+        super().__init__(base_url, headers=headers, timeout=timeout)
+
+    def create_session(
+        self,
+        base_url: str,
+        headers: Dict[str, str],
+        timeout: Union[int, float, httpx.Timeout],
+    ) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            limits=self._limits,
+            http2=self._http2,
+        )
+
+
+class SupabaseRepository(Repository):
+    """
+    Repository backed by Supabase's REST endpoint.
+
+    Queries are sent with a native async PostgREST client so a slow round
+    trip only suspends the awaiting request instead of the event loop. All
+    requests share one keep-alive connection pool, and a semaphore caps how
+    many queries may be in flight at once.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        key: str,
+        *,
+        timeout: float = 10.0,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        max_concurrency: int = 16,
+        http2: bool = False,
+    ) -> None:
+        self._client = _PooledPostgrestClient(
+            f"{url.rstrip('/')}/rest/v1",
+            headers={
+                "Accept": "application/json",
+                "Content-Type": "application/json",
+                "apikey": key,
+                "Authorization": f"Bearer {key}",
+            },
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            http2=http2,
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def _build_request(self, query: TableQuery):
+        builder = self._client.table(query.table)
+
+        if query.action == "select":
+            request = builder.select(query.columns)
+        elif query.action == "insert":
+            request = builder.insert(query.payload, upsert=query.upsert)
+        elif query.action == "update":
+            request = builder.update(query.payload)
+        elif query.action == "delete":
+            request = builder.delete()
+        else:
+            raise ValueError(f"Unsupported query action: {query.action}")
+
+        for column, operator, value in query.filters:
+            method = "in_" if operator == "in" else operator
+            request = getattr(request, method)(column, value)
+
+        if query.keyset is not None:
+            (first, second), (first_value, second_value), desc = query.keyset
+            operator = "lt" if desc else "gt"
+            first_value = sanitize_param(first_value)
+            second_value = sanitize_param(second_value)
+            request.params = request.params.add(
+                "or",
+                f"({first}.{operator}.{first_value},"
+                f"and({first}.eq.{first_value},{second}.{operator}.{second_value}))",
+            )
+
+        if query.orders:
+            # PostgREST expects every sort key in a single ``order`` parameter.
+            request.params = request.params.set(
+                "order",
+                ",".join(
+                    f"{column}.{'desc' if desc else 'asc'}"
+                    for column, desc in query.orders
+                ),
+            )
+
+        if query.action != "select" and query.selected_columns:
+            # Narrows the representation PostgREST returns for the write.
+            request.params = request.params.set("select", query.columns)
+
+        if query.limit_count is not None:
+            request = request.limit(query.limit_count)
+
+        return request
+
+    async def execute(self, query: TableQuery) -> QueryResult:
+        request = self._build_request(query)
+        async with self._semaphore:
+            response = await request.execute()
+        return QueryResult(data=response.data or [], count=response.count)
+
+    async def rpc(self, function: str, params: Dict[str, Any]) -> QueryResult:
+        request = self._client.rpc(function, params)
+        async with self._semaphore:
+            response = await request.execute()
+        return QueryResult(data=response.data or [], count=response.count)
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from enum import Enum
 
@@ -76,6 +76,70 @@ class ExpenseResponse(BaseModel):
     )
 
 
+class ExpensePage(BaseModel):
+    """A page of expenses plus the cursor for the next page."""
+
+    items: List[ExpenseResponse]
+    next_cursor: Optional[str] = Field(
+        None, description="Opaque cursor for the next page; null on the last page"
+    )
+
+
+class ExpenseImportError(BaseModel):
+    """A row that could not be imported."""
+
+    row: int = Field(..., description="1-based row number in the request body")
+    error: str
+
+
+class ExpenseBulkResult(BaseModel):
+    """Outcome of a bulk expense import."""
+
+    inserted: int = 0
+    failed: int = 0
+    errors: List[ExpenseImportError] = Field(default_factory=list)
+
+
+class ExpenseBatchSelection(BaseModel):
+    """Expenses targeted by a batch operation: explicit ids and/or a filter."""
+
+    ids: Optional[List[str]] = Field(
+        None, min_length=1, max_length=500, description="Expense IDs to target"
+    )
+    itinerary_id: Optional[str] = Field(None, description="Only this itinerary")
+    category: Optional[ExpenseCategory] = Field(None, description="Only this category")
+    model_config = ConfigDict(extra="ignore")
+
+
+class ExpenseBatchChanges(BaseModel):
+    """Fields a batch update may change."""
+
+    category: Optional[ExpenseCategory] = None
+    itinerary_id: Optional[str] = None
+    model_config = ConfigDict(extra="ignore")
+
+
+class ExpenseBatchUpdate(ExpenseBatchSelection):
+    """Request model for re-categorizing or moving many expenses."""
+
+    changes: ExpenseBatchChanges
+    model_config = ConfigDict(
+        extra="ignore",
+        json_schema_extra={
+            "example": {
+                "ids": ["exp123", "exp456"],
+                "changes": {"category": "transportation"},
+            }
+        },
+    )
+
+
+class ExpenseBatchResult(BaseModel):
+    """Number of expenses affected by a batch operation."""
+
+    affected: int
+
+
 class ExpenseSummary(BaseModel):
     """Summary of expenses."""
 
@@ -84,6 +84,7 @@ class ItineraryResponse(BaseModel):
     total_estimated_cost: float = Field(..., description="Total estimated cost")
     recommendations: Optional[str] = Field(None, description="General recommendations")
     created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
 
     class Config:
         json_schema_extra = {
@@ -116,6 +117,43 @@ class ItineraryResponse(BaseModel):
         }
 
 
+class ItineraryView(str, Enum):
+    """Projection used when listing itineraries."""
+
+    FULL = "full"
+    SUMMARY = "summary"
+
+
+class ItinerarySummary(BaseModel):
+    """Slim itinerary projection for list views (no daily_itinerary)."""
+
+    id: Optional[str] = Field(None, description="Itinerary ID")
+    destination: str
+    start_date: DateType
+    end_date: DateType
+    budget: float
+    total_estimated_cost: float
+    created_at: Optional[datetime] = None
+
+
+class ItineraryPage(BaseModel):
+    """A page of itineraries plus the cursor for the next page."""
+
+    items: List[ItineraryResponse]
+    next_cursor: Optional[str] = Field(
+        None, description="Opaque cursor for the next page; null on the last page"
+    )
+
+
+class ItinerarySummaryPage(BaseModel):
+    """A page of itinerary summaries plus the cursor for the next page."""
+
+    items: List[ItinerarySummary]
+    next_cursor: Optional[str] = Field(
+        None, description="Opaque cursor for the next page; null on the last page"
+    )
+
+
 class ItineraryTextRequest(BaseModel):
     """Request model for natural language itinerary creation."""
 
@@ -0,0 +1,42 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, Optional
+from datetime import datetime
+from enum import Enum
+
+
+class JobKind(str, Enum):
+    """Generation endpoints that can run as background jobs."""
+
+    ITINERARY = "itinerary"
+    ITINERARY_FROM_TEXT = "itinerary_from_text"
+
+
+class JobStatus(str, Enum):
+    """Lifecycle of a generation job."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    @property
+    def finished(self) -> bool:
+        return self in (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+
+class GenerationJob(BaseModel):
+    """State of a queued itinerary generation."""
+
+    id: str
+    kind: JobKind
+    status: JobStatus
+    created_at: datetime
+    updated_at: datetime
+    result: Optional[Dict[str, Any]] = Field(
+        None,
+        description=(
+            "ItineraryResponse (or ItineraryFromTextResponse for from-text jobs) "
+            "once the job has succeeded"
+        ),
+    )
+    error: Optional[str] = None
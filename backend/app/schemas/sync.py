@@ -0,0 +1,34 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+from enum import Enum
+
+from app.schemas.expense import ExpenseResponse
+from app.schemas.itinerary import ItineraryResponse
+
+
+class SyncEntity(str, Enum):
+    """Kinds of records tracked by the change log."""
+
+    EXPENSE = "expense"
+    ITINERARY = "itinerary"
+
+
+class SyncTombstone(BaseModel):
+    """A record deleted since the sync token."""
+
+    entity: SyncEntity
+    id: str
+    deleted_at: Optional[datetime] = None
+
+
+class SyncChanges(BaseModel):
+    """Records changed since a sync token, plus the token to resume from."""
+
+    expenses: List[ExpenseResponse] = Field(default_factory=list)
+    itineraries: List[ItineraryResponse] = Field(default_factory=list)
+    deleted: List[SyncTombstone] = Field(default_factory=list)
+    next_token: str = Field(..., description="Pass as `since` on the next sync")
+    has_more: bool = Field(
+        False, description="More changes are waiting; sync again with next_token"
+    )
@@ -45,6 +45,9 @@ class AuthResponse(BaseModel):
     """Response payload for successful authentication events."""
 
     user: UserResponse
+    access_token: Optional[str] = Field(None, description="Signed bearer token")
+    token_type: str = "bearer"
+    expires_at: Optional[datetime] = Field(None, description="Token expiry time")
 
 
 class VoiceInput(BaseModel):
@@ -0,0 +1,220 @@
+"""Skeleton-then-days itinerary generation with bounded parallelism."""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.core.logging import get_logger
+from app.schemas.itinerary import DayItinerary, ItineraryRequest, ItineraryResponse
+from app.services.llm_json import extract_json_object
+
+logger = get_logger(__name__)
+
+Complete = Callable[[str], Awaitable[Optional[str]]]
+NormalizeDay = Callable[[Dict[str, Any], int, ItineraryRequest], DayItinerary]
+FallbackDay = Callable[[ItineraryRequest, int], DayItinerary]
+
+
+@dataclass
+class DayOutline:
+    """One line of the trip skeleton: what a day is about and where."""
+
+    day: int
+    date: date
+    theme: str
+    area: Optional[str] = None
+
+
+def _trip_header(request: ItineraryRequest) -> str:
+    num_days = (request.end_date - request.start_date).days + 1
+    preferences = ", ".join(request.preferences) or "general sightseeing"
+    return (
+        f"目的地：{request.destination}\n"
+        f"日期：{request.start_date.isoformat()} 至 {request.end_date.isoformat()}，"
+        f"共{num_days}天\n"
+        f"预算：{request.budget}\n"
+        f"偏好：{preferences}\n"
+        f"备注：{request.additional_notes or '无'}\n"
+    )
+
+
+def skeleton_prompt(request: ItineraryRequest) -> str:
+    """Prompt for a compact outline: one short theme and area per day."""
+    return (
+        "请为以下旅行先规划一个简要的行程骨架，每天只给出主题和主要区域，不要列出具体活动。\n"
+        f"{_trip_header(request)}\n"
+        "仅回复有效的JSON，格式如下：\n"
+        '{"days": [{"day": 1, "theme": "故宫与中轴线", "area": "东城区"}], '
+        '"recommendations": "一些旅行建议"}\n'
+        "禁用markdown。"
+    )
+
+
+def day_prompt(
+    request: ItineraryRequest, outline: DayOutline, skeleton: List[DayOutline]
+) -> str:
+    """Prompt for one day's activities, with the whole skeleton as context."""
+    plan = "\n".join(
+        f"第{item.day}天：{item.theme}" + (f"（{item.area}）" if item.area else "")
+        for item in skeleton
+    )
+    daily_budget = request.budget / max(len(skeleton), 1)
+    return (
+        f"{_trip_header(request)}\n"
+        f"整体行程骨架：\n{plan}\n\n"
+        f"请只规划第{outline.day}天（{outline.date.isoformat()}）：{outline.theme}。"
+        f"当天预算约{daily_budget:.0f}，不要与其他天的景点重复。\n"
+        "仅回复有效的JSON，所有字段都必须包含：\n"
+        f'{{"day": {outline.day}, "activities": [{{"time": "09:00", '
+        '"activity": "参观天安门广场", "location": "天安门广场", '
+        '"location_address": "北京市东城区东长安街", "is_sightseeing": true, '
+        '"estimated_cost": 0.0, "notes": "免费参观，建议早上去人少"}]}\n'
+        "禁用markdown。"
+    )
+
+
+def parse_skeleton(
+    raw: Optional[str], request: ItineraryRequest
+) -> Tuple[List[DayOutline], Optional[str]]:
+    """
+    Read the model's outline, filling any missing day with a generic theme.
+
+    A skeleton that cannot be parsed is not fatal: every day is then
+    planned from the request alone.
+    """
+    num_days = (request.end_date - request.start_date).days + 1
+    data = extract_json_object(raw) or {}
+    by_day: Dict[int, Dict[str, Any]] = {}
+    entries = data.get("days")
+    if isinstance(entries, list):
+        for index, entry in enumerate(entries):
+            if not isinstance(entry, dict):
+                continue
+            try:
+                number = int(entry.get("day") or index + 1)
+            except (TypeError, ValueError):
+                number = index + 1
+            by_day.setdefault(number, entry)
+
+    outline = []
+    for index in range(num_days):
+        entry = by_day.get(index + 1, {})
+        theme = str(entry.get("theme") or "").strip()
+        area = str(entry.get("area") or "").strip()
+        outline.append(
+            DayOutline(
+                day=index + 1,
+                date=request.start_date + timedelta(days=index),
+                theme=theme or f"探索{request.destination}",
+                area=area or None,
+            )
+        )
+
+    recommendations = data.get("recommendations")
+    return outline, recommendations if isinstance(recommendations, str) else None
+
+
+class ParallelDayGenerator:
+    """
+    Generate an itinerary as one skeleton call plus one call per day.
+
+    Day calls run concurrently, at most ``concurrency`` at a time, so a long
+    trip costs roughly one skeleton round trip plus a few short completions
+    instead of one completion that grows with the number of days. Days whose
+    output is missing or invalid are retried on their own, up to
+    ``max_attempts`` in total; a day that still fails is filled from
+    ``fallback_day`` rather than discarding the whole trip.
+    """
+
+    def __init__(
+        self,
+        complete: Complete,
+        normalize_day: NormalizeDay,
+        fallback_day: FallbackDay,
+        *,
+        concurrency: int = 4,
+        max_attempts: int = 2,
+    ) -> None:
+        self.complete = complete
+        self.normalize_day = normalize_day
+        self.fallback_day = fallback_day
+        self.concurrency = max(concurrency, 1)
+        self.max_attempts = max(max_attempts, 1)
+        self.itineraries = 0
+        self.day_calls = 0
+        self.day_retries = 0
+        self.days_filled = 0
+
+    async def generate(self, request: ItineraryRequest) -> Optional[ItineraryResponse]:
+        """Return the merged itinerary, or None when no day could be generated."""
+        skeleton, recommendations = parse_skeleton(
+            await self.complete(skeleton_prompt(request)), request
+        )
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def plan(outline: DayOutline) -> Optional[DayItinerary]:
+            async with semaphore:
+                self.day_calls += 1
+                raw = await self.complete(day_prompt(request, outline, skeleton))
+            return self._parse_day(raw, outline, request)
+
+        days: Dict[int, DayItinerary] = {}
+        pending = skeleton
+        for attempt in range(self.max_attempts):
+            if attempt:
+                self.day_retries += len(pending)
+            results = await asyncio.gather(*(plan(outline) for outline in pending))
+            for outline, day in zip(pending, results):
+                if day is not None:
+                    days[outline.day] = day
+            pending = [outline for outline in pending if outline.day not in days]
+            if not pending:
+                break
+
+        if not days:
+            return None
+
+        for outline in pending:
+            logger.warning("Day %s failed after retries; using template", outline.day)
+            days[outline.day] = self.fallback_day(request, outline.day - 1)
+            self.days_filled += 1
+
+        ordered = [days[outline.day] for outline in skeleton]
+        self.itineraries += 1
+        return ItineraryResponse(
+            destination=request.destination,
+            start_date=request.start_date,
+            end_date=request.end_date,
+            budget=request.budget,
+            daily_itinerary=ordered,
+            total_estimated_cost=sum(day.total_estimated_cost for day in ordered),
+            recommendations=recommendations,
+        )
+
+    def _parse_day(
+        self, raw: Optional[str], outline: DayOutline, request: ItineraryRequest
+    ) -> Optional[DayItinerary]:
+        data = extract_json_object(raw)
+        if data is None:
+            return None
+        data["day"] = outline.day
+        data["date"] = outline.date.isoformat()
+        try:
+            day = self.normalize_day(data, outline.day - 1, request)
+        except ValidationError as exc:
+            logger.warning("Invalid output for day %s: %s", outline.day, exc)
+            return None
+        return day if day.activities else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "itineraries": self.itineraries,
+            "day_calls": self.day_calls,
+            "day_retries": self.day_retries,
+            "days_filled": self.days_filled,
+        }
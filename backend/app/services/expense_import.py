@@ -0,0 +1,94 @@
+"""Incremental parsers for bulk expense import bodies."""
+
+from __future__ import annotations
+
+import codecs
+import csv
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Tuple, Union
+
+# Each parsed row is (1-based row number, fields or a parse error message).
+ParsedRow = Tuple[int, Union[Dict[str, Any], str]]
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """Decode a UTF-8 byte stream into lines without buffering the whole body."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    first = True
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        if first and text:
+            text = text.lstrip("\ufeff")
+            first = False
+        pending += text
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def iter_ndjson_rows(chunks: AsyncIterable[bytes]) -> AsyncIterator[ParsedRow]:
+    """Yield one row per non-empty NDJSON line."""
+    row_number = 0
+    async for line in iter_lines(chunks):
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            value = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield row_number, f"Invalid JSON: {exc.msg}"
+            continue
+        if not isinstance(value, dict):
+            yield row_number, "Each line must be a JSON object"
+            continue
+        yield row_number, value
+
+
+async def iter_csv_rows(chunks: AsyncIterable[bytes]) -> AsyncIterator[ParsedRow]:
+    """
+    Yield one row per CSV record, using the first record as the header.
+
+    Quoted fields may span lines; a record is parsed once its quotes balance.
+    Empty cells are dropped so model defaults (e.g. ``date``) apply.
+    """
+    header: List[str] = []
+    record = ""
+    row_number = 0
+    async for line in iter_lines(chunks):
+        record = f"{record}\n{line}" if record else line
+        if record.count('"') % 2:
+            continue
+        text, record = record, ""
+        if not text.strip():
+            continue
+
+        fields = next(csv.reader([text]))
+        if not header:
+            header = [name.strip() for name in fields]
+            continue
+
+        row_number += 1
+        if len(fields) > len(header):
+            yield row_number, "Row has more columns than the header"
+            continue
+        yield row_number, {
+            name: value.strip() for name, value in zip(header, fields) if value.strip()
+        }
+
+    if record:
+        yield row_number + 1, "Unterminated quoted field"
+
+
+async def iter_json_rows(payload: Any) -> AsyncIterator[ParsedRow]:
+    """Yield rows from an already-decoded JSON array."""
+    if not isinstance(payload, list):
+        raise ValueError("Request body must be a JSON array of expenses")
+    for index, value in enumerate(payload, start=1):
+        if isinstance(value, dict):
+            yield index, value
+        else:
+            yield index, "Each item must be a JSON object"
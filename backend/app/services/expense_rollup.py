@@ -0,0 +1,206 @@
+"""Write-through per-itinerary expense rollups."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from app.core.etag import Representation
+from app.core.logging import get_logger
+from app.schemas.expense import ExpenseCategory, ExpenseSummary
+
+logger = get_logger(__name__)
+
+# (user_id, itinerary_id); itinerary_id None is the user's all-trips rollup.
+RollupKey = Tuple[str, Optional[str]]
+
+
+@dataclass
+class ExpenseRollup:
+    """Running per-category totals and counts for one rollup key."""
+
+    totals: Dict[str, float] = field(default_factory=dict)
+    counts: Dict[str, int] = field(default_factory=dict)
+    # Serialized summary; dropped whenever a delta is applied.
+    _representation: Optional[Representation] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]]) -> "ExpenseRollup":
+        rollup = cls()
+        for row in rows:
+            category = str(row["category"])
+            rollup.totals[category] = float(row.get("total") or 0)
+            rollup.counts[category] = int(row.get("count") or 0)
+        return rollup
+
+    def apply(self, category: str, amount: float, count: int) -> None:
+        self._representation = None
+        self.totals[category] = self.totals.get(category, 0.0) + amount
+        self.counts[category] = self.counts.get(category, 0) + count
+        if self.counts[category] <= 0:
+            self.totals.pop(category, None)
+            self.counts.pop(category, None)
+
+    def to_summary(self) -> ExpenseSummary:
+        return ExpenseSummary(
+            total_expenses=sum(self.totals.values()),
+            by_category={
+                ExpenseCategory(category): total
+                for category, total in self.totals.items()
+            },
+            count=sum(self.counts.values()),
+        )
+
+    def representation(self) -> Representation:
+        """The serialized summary with its ETag, rebuilt only after a change."""
+        if self._representation is None:
+            self._representation = Representation.of_model(self.to_summary())
+        return self._representation
+
+
+class ExpenseRollupStore:
+    """
+    Bounded in-process store of expense rollups keyed by (user_id, itinerary_id).
+
+    Rollups are loaded from the database aggregate on first read and then kept
+    current by applying deltas from expense writes, so budget reads are O(1).
+    Only keys already in the store receive deltas; anything else is rebuilt
+    from raw rows on its next read. Writes from other processes are not seen,
+    which is what the periodic :meth:`reconcile` pass corrects.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._rollups: "OrderedDict[RollupKey, ExpenseRollup]" = OrderedDict()
+        # Keys whose rollup is being loaded; flipped to True when a write lands
+        # mid-load so the (possibly stale) snapshot is not stored.
+        self._loading: Dict[RollupKey, bool] = {}
+        self.hits = 0
+        self.misses = 0
+        self.reconciled = 0
+        self.drift_corrections = 0
+
+    def get(self, key: RollupKey) -> Optional[ExpenseRollup]:
+        rollup = self._rollups.get(key)
+        if rollup is None:
+            self.misses += 1
+            return None
+        self._rollups.move_to_end(key)
+        self.hits += 1
+        return rollup
+
+    def begin_load(self, key: RollupKey) -> None:
+        """Mark ``key`` as being rebuilt from the database."""
+        self._loading[key] = False
+
+    def cancel_load(self, key: RollupKey) -> None:
+        """Forget an in-flight load that failed or is no longer needed."""
+        self._loading.pop(key, None)
+
+    def finish_load(self, key: RollupKey, rollup: ExpenseRollup) -> bool:
+        """Store a freshly loaded rollup unless a write raced with the load."""
+        stale = self._loading.pop(key, True)
+        if stale:
+            return False
+        self.put(key, rollup)
+        return True
+
+    def put(self, key: RollupKey, rollup: ExpenseRollup) -> None:
+        if self.max_entries <= 0:
+            return
+        self._rollups[key] = rollup
+        self._rollups.move_to_end(key)
+        while len(self._rollups) > self.max_entries:
+            self._rollups.popitem(last=False)
+
+    def apply(
+        self,
+        user_id: str,
+        itinerary_id: Optional[str],
+        category: str,
+        amount: float,
+        count: int,
+    ) -> None:
+        """Apply a delta to the trip rollup and the user's all-trips rollup."""
+        for key in {(user_id, itinerary_id), (user_id, None)}:
+            if key in self._loading:
+                self._loading[key] = True
+            rollup = self._rollups.get(key)
+            if rollup is not None:
+                rollup.apply(category, amount, count)
+
+    def apply_row(self, row: Dict[str, Any], sign: int) -> None:
+        """Add (``sign=1``) or remove (``sign=-1``) a raw expense row."""
+        self.apply(
+            str(row["user_id"]),
+            row.get("itinerary_id"),
+            str(row["category"]),
+            sign * float(row.get("amount") or 0),
+            sign,
+        )
+
+    def invalidate_user(self, user_id: str) -> None:
+        """Drop the user's rollups, including any load still in flight."""
+        for key in self._loading:
+            if key[0] == user_id:
+                self._loading[key] = True
+        for key in [key for key in self._rollups if key[0] == user_id]:
+            del self._rollups[key]
+
+    async def reconcile(
+        self,
+        loader: Callable[[str, Optional[str]], Awaitable[ExpenseRollup]],
+    ) -> int:
+        """Rebuild every tracked rollup from raw rows; return how many drifted."""
+        drifted = 0
+        for key in list(self._rollups):
+            self.begin_load(key)
+            try:
+                fresh = await loader(*key)
+            except Exception as exc:
+                self.cancel_load(key)
+                logger.warning("Failed to reconcile expense rollup %s: %s", key, exc)
+                continue
+            current = self._rollups.get(key)
+            if current is None:
+                self.cancel_load(key)
+                continue
+            if current.counts != fresh.counts or any(
+                abs(current.totals.get(category, 0.0) - total) > 1e-6
+                for category, total in fresh.totals.items()
+            ):
+                if self.finish_load(key, fresh):
+                    drifted += 1
+            else:
+                self.cancel_load(key)
+        self.reconciled += 1
+        self.drift_corrections += drifted
+        if drifted:
+            logger.info("Corrected %d drifted expense rollups", drifted)
+        return drifted
+
+    async def run_reconciler(
+        self,
+        loader: Callable[[str, Optional[str]], Awaitable[ExpenseRollup]],
+        interval: float,
+    ) -> None:
+        """Reconcile tracked rollups every ``interval`` seconds until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            await self.reconcile(loader)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._rollups),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "reconcile_runs": self.reconciled,
+            "drift_corrections": self.drift_corrections,
+        }
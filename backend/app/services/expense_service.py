@@ -1,21 +1,56 @@
-from typing import List, Optional
+import asyncio
+from typing import AsyncIterable, Dict, List, Optional
 from datetime import datetime
+from pydantic import ValidationError
 from app.schemas.expense import (
     ExpenseCreate,
     ExpenseUpdate,
     ExpenseResponse,
     ExpenseSummary,
     ExpenseCategory,
+    ExpensePage,
+    ExpenseBulkResult,
+    ExpenseImportError,
+    ExpenseBatchSelection,
+    ExpenseBatchUpdate,
+    ExpenseBatchResult,
 )
-from app.core.database import get_supabase_client
+from app.core.config import settings
+from app.core.database import get_repository
+from app.core.etag import Representation
+from app.core.metrics import register_metrics_source
+from app.core.pagination import decode_cursor, format_timestamp, next_cursor_for
+from app.repositories.base import Repository, TableQuery
+from app.services.expense_import import ParsedRow
+from app.services.expense_rollup import ExpenseRollup, ExpenseRollupStore
+from app.services.expense_write_behind import ExpenseWriteBehindBuffer
+
+# Changing any of these fields moves an expense between rollup buckets.
+ROLLUP_FIELDS = {"amount", "category", "itinerary_id"}
+
+# Rows fetched per page when summing expenses without the database function.
+SUMMARY_PAGE_SIZE = 1000
 
 
 class ExpenseService:
     """Service for managing travel expenses."""
 
     def __init__(self):
-        self.supabase = get_supabase_client()
         self.table_name = "expenses"
+        self.rollups = ExpenseRollupStore(settings.EXPENSE_ROLLUP_MAX_ENTRIES)
+        self._reconciler: Optional[asyncio.Task] = None
+        self.write_buffer = ExpenseWriteBehindBuffer(
+            settings.EXPENSE_WAL_PATH,
+            self._write_expense_batch,
+            flush_size=settings.EXPENSE_WRITE_BEHIND_FLUSH_SIZE,
+            flush_interval=settings.EXPENSE_WRITE_BEHIND_FLUSH_SECONDS,
+            max_pending=settings.EXPENSE_WRITE_BEHIND_MAX_PENDING,
+        )
+
+    @property
+    def db(self) -> Repository:
+        """Repository selected by the application settings."""
+        return get_repository()
 
     async def create_expense(
         self, user_id: str, expense: ExpenseCreate
@@ -23,13 +58,48 @@ class ExpenseService:
         """
         Create a new expense record.
 
+        With write-behind enabled the expense is acknowledged once it is
+        appended to the local write-ahead log and reaches the database with
+        the next batch flush. Otherwise it is inserted directly.
+
         Args:
             user_id: ID of the user creating the expense
             expense: Expense data
 
         Returns:
             Created expense record
+
+        Raises:
+            BufferFullError: If the write-behind buffer cannot accept the row
         """
+        expense_data = self._build_expense_record(user_id, expense)
+        if settings.EXPENSE_WRITE_BEHIND_ENABLED:
+            return ExpenseResponse(**await self.write_buffer.append(expense_data))
+
+        result = await self.db.table(self.table_name).insert(expense_data).execute()
+        self.rollups.apply_row(result.data[0], 1)
+        return ExpenseResponse(**result.data[0])
+
+    async def _write_expense_batch(self, records: List[Dict]) -> List[Dict]:
+        """Upsert a batch of buffered expenses and fold them into rollups."""
+        result = await (
+            self.db.table(self.table_name).insert(records, upsert=True).execute()
+        )
+        for row in result.data:
+            if self.write_buffer.possibly_written(row["id"]):
+                # Already counted if an earlier write landed; reload instead.
+                self.rollups.invalidate_user(row["user_id"])
+            else:
+                self.rollups.apply_row(row, 1)
+        return result.data
+
+    async def _flush_if_buffered(self, expense_id: str) -> None:
+        """Flush the write-behind buffer if it still holds ``expense_id``."""
+        if expense_id in self.write_buffer:
+            await self.write_buffer.flush()
+
+    def _build_expense_record(self, user_id: str, expense: ExpenseCreate) -> Dict:
+        """Validate and convert an ExpenseCreate into a table row."""
         itinerary_id = (
             expense.itinerary_id.strip()
             if isinstance(expense.itinerary_id, str)
@@ -38,34 +108,120 @@ class ExpenseService:
         if not itinerary_id:
             raise ValueError("Itinerary ID is required to record an expense")
 
-        expense_data = {
+        now = format_timestamp(datetime.now())
+        return {
             "user_id": user_id,
             "itinerary_id": itinerary_id,
             "category": expense.category.value,
             "amount": expense.amount,
             "description": expense.description,
             "date": expense.date.isoformat(),
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat(),
+            "created_at": now,
+            "updated_at": now,
         }
 
-        try:
-            result = self.supabase.table(self.table_name).insert(expense_data).execute()
-            return ExpenseResponse(**result.data[0])
-        except Exception as e:
-            # Fallback: return the data as if it was saved
-            # In production, proper error handling is needed
-            return ExpenseResponse(
-                id=f"exp_{datetime.now().timestamp()}", user_id=user_id, **expense_data
+    async def bulk_create_expenses(
+        self,
+        user_id: str,
+        rows: AsyncIterable[ParsedRow],
+        batch_size: Optional[int] = None,
+        max_rows: Optional[int] = None,
+    ) -> ExpenseBulkResult:
+        """
+        Import many expenses, inserting valid rows in batches.
+
+        Rows are validated as they arrive; each full batch is written with a
+        single insert call. Invalid rows, and every row of a batch the
+        database rejects, are reported individually instead of aborting the
+        import. Rows past ``max_rows`` are not imported; they are counted as
+        failed and reported with a single error.
+
+        Args:
+            user_id: ID of the user importing the expenses
+            rows: (row number, fields or parse error) pairs
+            batch_size: Rows per insert call (defaults to settings)
+            max_rows: Maximum rows accepted per request (defaults to settings)
+
+        Returns:
+            Inserted/failed counts and per-row errors
+        """
+        batch_size = batch_size or settings.EXPENSE_BULK_BATCH_SIZE
+        max_rows = max_rows or settings.EXPENSE_BULK_MAX_ROWS
+        result = ExpenseBulkResult()
+        batch: List[Dict] = []
+        batch_rows: List[int] = []
+
+        async def flush() -> None:
+            if not batch:
+                return
+            try:
+                inserted = await (
+                    self.db.table(self.table_name).insert(list(batch)).execute()
+                )
+            except Exception as e:
+                result.failed += len(batch_rows)
+                result.errors.extend(
+                    ExpenseImportError(row=row, error=f"Insert failed: {e}")
+                    for row in batch_rows
+                )
+            else:
+                for record in inserted.data:
+                    self.rollups.apply_row(record, 1)
+                result.inserted += len(inserted.data)
+            batch.clear()
+            batch_rows.clear()
+
+        skipped = 0
+        async for row_number, fields in rows:
+            if row_number > max_rows:
+                # Read the rest of the upload so every skipped row is counted.
+                skipped += 1
+                continue
+
+            if isinstance(fields, str):
+                result.failed += 1
+                result.errors.append(ExpenseImportError(row=row_number, error=fields))
+                continue
+
+            try:
+                record = self._build_expense_record(user_id, ExpenseCreate(**fields))
+            except (ValidationError, ValueError) as exc:
+                message = (
+                    "; ".join(
+                        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+                        for error in exc.errors()
+                    )
+                    if isinstance(exc, ValidationError)
+                    else str(exc)
+                )
+                result.failed += 1
+                result.errors.append(ExpenseImportError(row=row_number, error=message))
+                continue
+
+            batch.append(record)
+            batch_rows.append(row_number)
+            if len(batch) >= batch_size:
+                await flush()
+
+        await flush()
+        if skipped:
+            result.failed += skipped
+            result.errors.append(
+                ExpenseImportError(
+                    row=max_rows + 1,
+                    error=f"Row limit of {max_rows} exceeded; {skipped} rows skipped",
+                )
             )
+        return result
 
     async def get_expense(
         self, expense_id: str, user_id: str
     ) -> Optional[ExpenseResponse]:
         """Get a specific expense by ID."""
+        await self._flush_if_buffered(expense_id)
         try:
-            result = (
-                self.supabase.table(self.table_name)
+            result = await (
+                self.db.table(self.table_name)
                 .select("*")
                 .eq("id", expense_id)
                 .eq("user_id", user_id)
@@ -98,10 +254,43 @@ class ExpenseService:
         Returns:
             List of expenses
         """
+        page = await self.list_expenses_page(
+            user_id, itinerary_id=itinerary_id, category=category, limit=limit
+        )
+        return page.items
+
+    async def list_expenses_page(
+        self,
+        user_id: str,
+        itinerary_id: Optional[str] = None,
+        category: Optional[ExpenseCategory] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> ExpensePage:
+        """
+        List one page of expenses, newest first, using keyset pagination.
+
+        Rows are ordered by (created_at, id) and the cursor records the last
+        row of the previous page, so every page costs the same however deep
+        the client scrolls.
+
+        Args:
+            user_id: User ID to filter expenses
+            itinerary_id: Optional itinerary ID filter
+            category: Optional category filter
+            limit: Maximum number of records to return
+            cursor: Cursor returned with the previous page
+
+        Returns:
+            Page of expenses with the next cursor
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        position = decode_cursor(cursor) if cursor else None
+
         try:
-            query = (
-                self.supabase.table(self.table_name).select("*").eq("user_id", user_id)
-            )
+            query = self.db.table(self.table_name).select("*").eq("user_id", user_id)
 
             if itinerary_id:
                 query = query.eq("itinerary_id", itinerary_id)
@@ -109,17 +298,29 @@ class ExpenseService:
             if category:
                 query = query.eq("category", category.value)
 
-            result = query.limit(limit).execute()
+            if position:
+                query = query.after(("created_at", "id"), position)
 
-            return [ExpenseResponse(**item) for item in result.data]
+            result = await (
+                query.order("created_at", desc=True)
+                .order("id", desc=True)
+                .limit(limit + 1)
+                .execute()
+            )
+
+            return ExpensePage(
+                items=[ExpenseResponse(**item) for item in result.data[:limit]],
+                next_cursor=next_cursor_for(result.data, limit),
+            )
         except Exception as e:
             print(f"Error listing expenses: {e}")
-            return []
+            return ExpensePage(items=[])
 
     async def update_expense(
         self, expense_id: str, user_id: str, expense_update: ExpenseUpdate
     ) -> Optional[ExpenseResponse]:
         """Update an existing expense."""
+        await self._flush_if_buffered(expense_id)
         update_data = expense_update.model_dump(exclude_unset=True)
 
         if update_data:
@@ -146,8 +347,8 @@ class ExpenseService:
                 update_data["date"] = update_data["date"].isoformat()
 
             try:
-                result = (
-                    self.supabase.table(self.table_name)
+                result = await (
+                    self.db.table(self.table_name)
                     .update(update_data)
                     .eq("id", expense_id)
                     .eq("user_id", user_id)
@@ -155,6 +356,11 @@ class ExpenseService:
                 )
 
                 if result.data:
+                    if ROLLUP_FIELDS.intersection(update_data):
+                        # The update does not return the row's old values,
+                        # so a delta cannot be applied atomically; rebuild
+                        # this user's rollups on their next read instead.
+                        self.rollups.invalidate_user(user_id)
                     return ExpenseResponse(**result.data[0])
             except Exception as e:
                 print(f"Error updating expense: {e}")
@@ -163,26 +369,110 @@ class ExpenseService:
 
     async def delete_expense(self, expense_id: str, user_id: str) -> bool:
         """Delete an expense."""
+        await self._flush_if_buffered(expense_id)
         try:
-            result = (
-                self.supabase.table(self.table_name)
+            result = await (
+                self.db.table(self.table_name)
                 .delete()
                 .eq("id", expense_id)
                 .eq("user_id", user_id)
                 .execute()
             )
 
+            for row in result.data:
+                self.rollups.apply_row(row, -1)
             return True
         except Exception as e:
             print(f"Error deleting expense: {e}")
             return False
 
+    def _apply_selection(
+        self, query: TableQuery, user_id: str, selection: ExpenseBatchSelection
+    ) -> TableQuery:
+        """Scope a batch statement to the user and the selected expenses."""
+        if not (selection.ids or selection.itinerary_id or selection.category):
+            raise ValueError(
+                "Provide expense ids or at least one filter (itinerary_id, category)"
+            )
+
+        query = query.eq("user_id", user_id)
+        if selection.ids:
+            query = query.in_("id", selection.ids)
+        if selection.itinerary_id:
+            query = query.eq("itinerary_id", selection.itinerary_id.strip())
+        if selection.category:
+            query = query.eq("category", selection.category.value)
+        return query
+
+    async def batch_update_expenses(
+        self, user_id: str, request: ExpenseBatchUpdate
+    ) -> ExpenseBatchResult:
+        """
+        Re-categorize or move many expenses with a single update statement.
+
+        Args:
+            user_id: Owner of the expenses; the statement never touches others
+            request: Target ids/filter and the fields to change
+
+        Returns:
+            Number of expenses updated
+        """
+        changes = request.changes.model_dump(exclude_none=True)
+        if "category" in changes:
+            changes["category"] = changes["category"].value
+        if "itinerary_id" in changes:
+            changes["itinerary_id"] = changes["itinerary_id"].strip()
+            if not changes["itinerary_id"]:
+                raise ValueError("Itinerary ID cannot be empty")
+        if not changes:
+            raise ValueError("No changes provided")
+        changes["updated_at"] = datetime.now().isoformat()
+
+        query = self._apply_selection(
+            self.db.table(self.table_name).update(changes).returning("id"),
+            user_id,
+            request,
+        )
+        result = await query.execute()
+
+        if result.data:
+            # Moved rows change buckets; rebuild this user's rollups lazily.
+            self.rollups.invalidate_user(user_id)
+        return ExpenseBatchResult(affected=len(result.data))
+
+    async def batch_delete_expenses(
+        self, user_id: str, selection: ExpenseBatchSelection
+    ) -> ExpenseBatchResult:
+        """
+        Delete many expenses with a single delete statement.
+
+        Args:
+            user_id: Owner of the expenses; the statement never touches others
+            selection: Target ids and/or filter
+
+        Returns:
+            Number of expenses deleted
+        """
+        query = self._apply_selection(
+            self.db.table(self.table_name).delete(), user_id, selection
+        )
+        result = await query.execute()
+
+        for row in result.data:
+            self.rollups.apply_row(row, -1)
+        return ExpenseBatchResult(affected=len(result.data))
+
     async def get_expense_summary(
         self, user_id: str, itinerary_id: Optional[str] = None
     ) -> ExpenseSummary:
         """
         Get expense summary with totals by category.
 
+        Served from the in-process rollup when one is tracked; otherwise the
+        totals are grouped by the database (``expense_summary`` function, or
+        summed from the rows if that fails) and the result seeds the rollup
+        for later reads.
+
         Args:
             user_id: User ID
             itinerary_id: Optional itinerary ID filter
@@ -190,20 +480,110 @@ class ExpenseService:
         Returns:
             Expense summary with totals
         """
-        expenses = await self.list_expenses(user_id, itinerary_id=itinerary_id)
-
-        total_expenses = sum(exp.amount for exp in expenses)
-        by_category = {}
+        rollup = await self._get_rollup(user_id, itinerary_id)
+        return rollup.to_summary()
 
-        for expense in expenses:
-            category = expense.category
-            if category not in by_category:
-                by_category[category] = 0.0
-            by_category[category] += expense.amount
+    async def get_expense_summary_representation(
+        self, user_id: str, itinerary_id: Optional[str] = None
+    ) -> Representation:
+        """Serialized expense summary and its ETag, reused until expenses change."""
+        rollup = await self._get_rollup(user_id, itinerary_id)
+        return rollup.representation()
+
+    async def _get_rollup(
+        self, user_id: str, itinerary_id: Optional[str]
+    ) -> ExpenseRollup:
+        key = (user_id, itinerary_id or None)
+        rollup = self.rollups.get(key)
+        if rollup is None:
+            self.rollups.begin_load(key)
+            try:
+                rollup = await self._load_rollup(*key)
+            except Exception:
+                self.rollups.cancel_load(key)
+                raise
+            self.rollups.finish_load(key, rollup)
+        return rollup
+
+    async def _load_rollup(
+        self, user_id: str, itinerary_id: Optional[str]
+    ) -> ExpenseRollup:
+        """
+        Aggregate raw expense rows into a rollup via the database.
 
-        return ExpenseSummary(
-            total_expenses=total_expenses, by_category=by_category, count=len(expenses)
+        If the ``expense_summary`` function fails (e.g. it has not been
+        created yet), the rows are paged through and summed here instead.
+        """
+        try:
+            result = await self.db.rpc(
+                "expense_summary",
+                {"p_user_id": user_id, "p_itinerary_id": itinerary_id},
+            )
+        except Exception as e:
+            print(f"Error summarizing expenses, summing rows instead: {e}")
+            return await self._sum_rollup_rows(user_id, itinerary_id)
+        return ExpenseRollup.from_rows(result.data)
+
+    async def _sum_rollup_rows(
+        self, user_id: str, itinerary_id: Optional[str]
+    ) -> ExpenseRollup:
+        """Build a rollup by keyset-paging over the user's expense rows."""
+        rollup = ExpenseRollup()
+        last_id = None
+        while True:
+            query = (
+                self.db.table(self.table_name)
+                .select("id, category, amount")
+                .eq("user_id", user_id)
+            )
+            if itinerary_id:
+                query = query.eq("itinerary_id", itinerary_id)
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            result = await query.order("id").limit(SUMMARY_PAGE_SIZE).execute()
+            for row in result.data:
+                rollup.apply(row["category"], float(row["amount"]), 1)
+            if len(result.data) < SUMMARY_PAGE_SIZE:
+                return rollup
+            last_id = result.data[-1]["id"]
+
+    async def reconcile_rollups(self) -> int:
+        """Rebuild tracked rollups from raw rows; returns how many had drifted."""
+        return await self.rollups.reconcile(self._load_rollup)
+
+    async def start_write_behind(self) -> None:
+        """Replay buffered expenses from the log and start batch flushing."""
+        if not settings.EXPENSE_WRITE_BEHIND_ENABLED:
+            return
+        await self.write_buffer.start()
+
+    async def stop_write_behind(self) -> None:
+        """Flush buffered expenses and stop the flush loop."""
+        if not settings.EXPENSE_WRITE_BEHIND_ENABLED:
+            return
+        await self.write_buffer.stop()
+
+    def start_rollup_reconciler(self) -> None:
+        """Schedule periodic rollup reconciliation on the running loop."""
+        interval = settings.EXPENSE_ROLLUP_RECONCILE_SECONDS
+        if interval <= 0 or self._reconciler is not None:
+            return
+        self._reconciler = asyncio.create_task(
+            self.rollups.run_reconciler(self._load_rollup, interval)
         )
 
+    async def stop_rollup_reconciler(self) -> None:
+        """Cancel the background reconciliation task."""
+        if self._reconciler is None:
+            return
+        self._reconciler.cancel()
+        try:
+            await self._reconciler
+        except asyncio.CancelledError:
+            pass
+        self._reconciler = None
+
 
 expense_service = ExpenseService()
+register_metrics_source("expense_rollups", expense_service.rollups.stats)
+register_metrics_source("expense_write_behind", expense_service.write_buffer.stats)
@@ -0,0 +1,381 @@
+"""Write-behind buffering of expense inserts backed by a local write-ahead log."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict, deque
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+import httpx
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Writes a batch of rows to the database and returns the stored rows. Batches
+# may be replayed after a crash, so the writer must be idempotent on ``id``.
+BatchWriter = Callable[[List[Dict[str, Any]]], Awaitable[List[Dict[str, Any]]]]
+
+
+# Postgres SQLSTATE classes for connection loss, serialization failures and
+# deadlocks, exhausted resources and server shutdown.
+_TRANSIENT_SQLSTATE_CLASSES = frozenset({"08", "40", "53", "57", "58"})
+
+
+class BufferFullError(RuntimeError):
+    """Raised when the buffer is at capacity and the database cannot drain it."""
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """
+    Whether a failed write is worth retrying unchanged.
+
+    Network and timeout errors, a locked SQLite database and Postgres errors
+    in a transient SQLSTATE class (or PostgREST's ``PGRST00x`` connection
+    errors) are; anything else means the rows themselves were rejected.
+    """
+    if isinstance(exc, (OSError, asyncio.TimeoutError, httpx.TransportError)):
+        return True
+    if isinstance(exc, sqlite3.OperationalError):
+        return "locked" in str(exc) or "busy" in str(exc)
+    code = getattr(exc, "code", None)
+    if isinstance(code, str):
+        return code[:2] in _TRANSIENT_SQLSTATE_CLASSES or code.startswith("PGRST00")
+    return False
+
+
+class ExpenseWriteBehindBuffer:
+    """
+    Acknowledge expense inserts after a durable local append, flush in batches.
+
+    Each record is given its final ``id`` and appended to an NDJSON write-ahead
+    log (fsynced) before the caller is answered. Pending records are written
+    to the database in batches when ``flush_size`` records are waiting or
+    every ``flush_interval`` seconds, and a commit marker is logged for every
+    batch that lands. On startup :meth:`replay` reloads logged records without
+    a commit marker, so an acknowledged expense survives a crash. At most
+    ``max_pending`` records are held; beyond that appends wait for a flush and
+    fail with :class:`BufferFullError` if the database still refuses them.
+
+    Only transient failures (see ``is_transient``) leave a batch pending for
+    the next flush. When the database rejects a batch outright it is retried
+    row by row, and rows that are still rejected are dead-lettered: appended
+    to ``dead_letter_path`` (``<wal_path>.dead`` by default) and dropped from
+    the queue so one bad row cannot hold back the rest. Only the latest
+    ``max_dead_letters`` are kept in :attr:`dead_letters`.
+
+    A record that was replayed, or whose write failed transiently, may
+    already be stored; :meth:`possibly_written` tells the writer so it does
+    not count it twice.
+    """
+
+    def __init__(
+        self,
+        wal_path: str,
+        writer: BatchWriter,
+        flush_size: int = 100,
+        flush_interval: float = 1.0,
+        max_pending: int = 10000,
+        is_transient: Callable[[BaseException], bool] = is_transient_error,
+        dead_letter_path: Optional[str] = None,
+        max_dead_letters: int = 100,
+    ):
+        self.wal_path = wal_path
+        self.dead_letter_path = dead_letter_path or f"{wal_path}.dead"
+        self.flush_size = max(1, flush_size)
+        self.flush_interval = flush_interval
+        self.max_pending = max(self.flush_size, max_pending)
+        self._writer = writer
+        self._is_transient = is_transient
+        self._pending: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._inflight: set = set()
+        self._unsure: Set[str] = set()
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._file_lock = threading.Lock()
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.flushed = 0
+        self.failures = 0
+        self.replayed = 0
+        self.dead_lettered = 0
+        self.dead_letters: Deque[Dict[str, Any]] = deque(maxlen=max_dead_letters)
+
+    def __contains__(self, record_id: str) -> bool:
+        return record_id in self._pending
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def possibly_written(self, record_id: str) -> bool:
+        """Whether an earlier write of the record may have been stored."""
+        return record_id in self._unsure
+
+    async def append(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Durably log a record for a later batched insert and return it."""
+        if len(self._pending) >= self.max_pending:
+            await self.flush()
+            if len(self._pending) >= self.max_pending:
+                raise BufferFullError("Expense buffer is full; try again later")
+
+        record = {**record, "id": record.get("id") or str(uuid.uuid4())}
+        async with self._log_lock():
+            await asyncio.to_thread(
+                self._write_lines, [{"op": "insert", "record": record}]
+            )
+            self._pending[record["id"]] = record
+
+        if len(self._pending) >= self.flush_size:
+            if self._wake is not None:
+                self._wake.set()
+            else:
+                await self.flush()
+        return record
+
+    async def flush(self) -> int:
+        """Write every pending record to the database; returns rows flushed."""
+        flushed = 0
+        changed = False
+        while True:
+            batch = [
+                record
+                for record_id, record in self._pending.items()
+                if record_id not in self._inflight
+            ][: self.flush_size]
+            if not batch:
+                break
+
+            ids = [record["id"] for record in batch]
+            self._inflight.update(ids)
+            try:
+                committed, dead, error = await self._write_batch(batch)
+            finally:
+                self._inflight.difference_update(ids)
+
+            dead_ids = [entry["record"]["id"] for entry in dead]
+            for record_id in committed + dead_ids:
+                self._pending.pop(record_id, None)
+                self._unsure.discard(record_id)
+            entries = [{"op": "commit", "ids": committed}] if committed else []
+            entries += [
+                {"op": "dead_letter", "id": record_id} for record_id in dead_ids
+            ]
+            if entries:
+                async with self._log_lock():
+                    await asyncio.to_thread(self._settle, entries, dead)
+                changed = True
+            self.dead_letters.extend(dead)
+            self.dead_lettered += len(dead)
+            self.flushed += len(committed)
+            flushed += len(committed)
+            if error is not None:
+                break
+
+        if changed:
+            await self._compact()
+        return flushed
+
+    async def _write_batch(
+        self, batch: List[Dict[str, Any]]
+    ) -> Tuple[List[str], List[Dict[str, Any]], Optional[Exception]]:
+        """
+        Write ``batch``; returns the committed ids, the dead-letter entries and
+        the transient error that stopped the write, if any.
+        """
+        try:
+            await self._writer(batch)
+            return [record["id"] for record in batch], [], None
+        except Exception as e:
+            self.failures += 1
+            if self._is_transient(e):
+                logger.warning("Expense flush of %d rows failed: %s", len(batch), e)
+                # A lost connection or timeout may hide a write that landed.
+                self._unsure.update(record["id"] for record in batch)
+                return [], [], e
+            logger.warning(
+                "Expense batch of %d rows rejected, retrying row by row: %s",
+                len(batch),
+                e,
+            )
+
+        committed: List[str] = []
+        dead: List[Dict[str, Any]] = []
+        for record in batch:
+            try:
+                await self._writer([record])
+            except Exception as e:
+                if self._is_transient(e):
+                    self.failures += 1
+                    logger.warning("Expense flush failed: %s", e)
+                    self._unsure.add(record["id"])
+                    return committed, dead, e
+                logger.error("Dead-lettering expense %s: %s", record["id"], e)
+                dead.append({"op": "dead_letter", "record": record, "error": str(e)})
+            else:
+                committed.append(record["id"])
+        return committed, dead, None
+
+    async def replay(self) -> int:
+        """Reload records logged but never committed; returns how many."""
+        records, dead = await asyncio.to_thread(self._read_uncommitted)
+        if dead:
+            # Logs written before dead letters had their own file.
+            await asyncio.to_thread(self._write_lines, dead, self.dead_letter_path)
+        for record in records:
+            # The crash may have come after the batch landed but before its
+            # commit marker was logged.
+            self._pending.setdefault(record["id"], record)
+            self._unsure.add(record["id"])
+        self.replayed += len(records)
+        await self._compact()
+        if records:
+            logger.info(
+                "Replayed %d buffered expenses from %s", len(records), self.wal_path
+            )
+        return len(records)
+
+    async def start(self) -> None:
+        """Replay the log and start the periodic flush loop."""
+        if self._task is not None:
+            return
+        await self.replay()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush loop after a final flush."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wake = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._pending),
+            "max_pending": self.max_pending,
+            "flushed": self.flushed,
+            "failures": self.failures,
+            "replayed": self.replayed,
+            "dead_lettered": self.dead_lettered,
+        }
+
+    def _write_lines(
+        self, entries: Iterable[Dict[str, Any]], path: Optional[str] = None
+    ) -> None:
+        path = path or self.wal_path
+        payload = "".join(json.dumps(entry, default=str) + "\n" for entry in entries)
+        with self._file_lock:
+            self._ensure_directory(path)
+            with open(path, "a", encoding="utf-8") as log:
+                log.write(payload)
+                log.flush()
+                os.fsync(log.fileno())
+
+    def _settle(
+        self, entries: List[Dict[str, Any]], dead: List[Dict[str, Any]]
+    ) -> None:
+        # Dead letters are stored before the log stops replaying their records.
+        if dead:
+            self._write_lines(dead, self.dead_letter_path)
+        self._write_lines(entries)
+
+    def _read_uncommitted(
+        self,
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Uncommitted records, in log order, and the dead-letter entries of
+        logs that still held them inline.
+        """
+        records: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        dead: List[Dict[str, Any]] = []
+        with self._file_lock:
+            if not os.path.exists(self.wal_path):
+                return [], []
+            with open(self.wal_path, encoding="utf-8") as wal:
+                for line in wal:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn final line was never acknowledged.
+                        continue
+                    if entry.get("op") == "insert":
+                        records[entry["record"]["id"]] = entry["record"]
+                    elif entry.get("op") == "commit":
+                        for record_id in entry.get("ids", []):
+                            records.pop(record_id, None)
+                    elif entry.get("op") == "dead_letter":
+                        if "record" in entry:
+                            records.pop(entry["record"]["id"], None)
+                            dead.append(entry)
+                        else:
+                            records.pop(entry["id"], None)
+        return list(records.values()), dead
+
+    async def _compact(self) -> None:
+        """
+        Rewrite the log to hold only pending records.
+
+        The rewrite runs in a worker thread while holding the log lock, so no
+        append or commit marker lands between reading ``_pending`` and
+        replacing the file, and the event loop keeps serving requests.
+        """
+        async with self._log_lock():
+            entries = [
+                {"op": "insert", "record": record} for record in self._pending.values()
+            ]
+            await asyncio.to_thread(self._rewrite, entries)
+
+    def _rewrite(self, entries: List[Dict[str, Any]]) -> None:
+        with self._file_lock:
+            self._ensure_directory(self.wal_path)
+            temp_path = f"{self.wal_path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as wal:
+                wal.write("".join(json.dumps(e, default=str) + "\n" for e in entries))
+                wal.flush()
+                os.fsync(wal.fileno())
+            os.replace(temp_path, self.wal_path)
+
+    def _log_lock(self) -> asyncio.Lock:
+        """Lock serializing log writes on the running loop."""
+        # The buffer outlives event loops (tests, reloads); a lock is only
+        # usable on the loop it was first awaited on.
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock, self._lock_loop = asyncio.Lock(), loop
+        return self._lock
+
+    @staticmethod
+    def _ensure_directory(path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
@@ -0,0 +1,246 @@
+"""Cache of generated itineraries keyed by a normalized request fingerprint."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from datetime import date
+from typing import Any, Dict, Optional, Protocol
+
+from app.core.cache import MISSING, TTLCache
+from app.core.logging import get_logger
+from app.schemas.itinerary import ItineraryRequest, ItineraryResponse
+
+logger = get_logger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _normalize_text(value: Optional[str]) -> str:
+    return _WHITESPACE.sub(" ", value or "").strip().casefold()
+
+
+def request_fingerprint(
+    request: ItineraryRequest,
+    *,
+    budget_step: float,
+    prompt: Optional[str] = None,
+) -> str:
+    """
+    Canonical key for itinerary requests that should share one generation.
+
+    Calendar dates are reduced to the trip length, the budget is rounded to
+    the nearest ``budget_step`` and free text is case- and
+    whitespace-normalized, so "Beijing, 3 days, cultural" on any week with a
+    similar budget maps to the same key. A custom ``prompt`` is part of the
+    key because it replaces the request as the model's input.
+
+    The provider and model are not: with failover any provider may serve a
+    request, so the cache holds the itinerary for the request, whichever
+    model wrote it. Entries from before a model change are served until
+    they expire.
+    """
+    step = budget_step if budget_step > 0 else 1.0
+    canonical = {
+        "destination": _normalize_text(request.destination),
+        "days": (request.end_date - request.start_date).days + 1,
+        "budget": round(request.budget / step) * step,
+        "preferences": sorted({str(p.value) for p in request.preferences}),
+        "notes": _normalize_text(request.additional_notes),
+        "prompt": (
+            hashlib.sha256(prompt.encode()).hexdigest() if prompt is not None else None
+        ),
+    }
+    encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def rebase_itinerary(
+    cached: Dict[str, Any], request: ItineraryRequest
+) -> ItineraryResponse:
+    """Move a cached itinerary onto the request's dates and budget."""
+    shift = request.start_date - date.fromisoformat(cached["start_date"])
+
+    def shifted(value: str) -> str:
+        return (date.fromisoformat(value) + shift).isoformat()
+
+    data = dict(cached)
+    data["start_date"] = request.start_date.isoformat()
+    data["end_date"] = shifted(cached["end_date"])
+    data["budget"] = request.budget
+    data["daily_itinerary"] = [
+        {**day, "date": shifted(day["date"])} for day in cached["daily_itinerary"]
+    ]
+    return ItineraryResponse.model_validate(data)
+
+
+class GenerationStore(Protocol):
+    """Backend holding JSON-serializable generations by fingerprint."""
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]: ...
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None: ...
+
+    def stats(self) -> Dict[str, Any]: ...
+
+
+class MemoryGenerationStore:
+    """Process-local LRU store with TTL expiry."""
+
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self._cache = TTLCache(maxsize=max_entries, ttl=ttl)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self._cache.get(key)
+        return None if value is MISSING else value
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        self._cache.set(key, value)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "memory", **self._cache.stats()}
+
+
+class DiskGenerationStore:
+    """
+    One JSON file per fingerprint under ``directory``.
+
+    Survives restarts and can be shared by workers on one host. Reads touch
+    the file, so when more than ``max_entries`` files exist the least
+    recently used ones are removed.
+    """
+
+    def __init__(self, directory: str, max_entries: int, ttl: float) -> None:
+        self.directory = directory
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = await asyncio.to_thread(self._read, key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self._write, key, value)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "disk",
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _read(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as handle:
+                entry = json.load(handle)
+        except (OSError, ValueError):
+            return None
+        if entry.get("expires_at", 0) <= time.time():
+            self._unlink(path)
+            return None
+        os.utime(path)
+        return entry.get("value")
+
+    def _write(self, key: str, value: Dict[str, Any]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as handle:
+            json.dump(
+                {"expires_at": time.time() + self.ttl, "value": value},
+                handle,
+                ensure_ascii=False,
+            )
+        os.replace(temp_path, path)
+        self._evict()
+
+    def _evict(self) -> None:
+        entries = [
+            entry
+            for entry in os.scandir(self.directory)
+            if entry.is_file() and entry.name.endswith(".json")
+        ]
+        excess = len(entries) - self.max_entries
+        if excess <= 0:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:excess]:
+            self._unlink(entry.path)
+            self.evictions += 1
+
+    @staticmethod
+    def _unlink(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class GenerationCache:
+    """Look up and record generated itineraries by request fingerprint."""
+
+    def __init__(self, store: Optional[GenerationStore], budget_step: float) -> None:
+        self.store = store
+        self.budget_step = budget_step
+
+    @property
+    def enabled(self) -> bool:
+        return self.store is not None
+
+    async def get(
+        self, key: str, request: ItineraryRequest
+    ) -> Optional[ItineraryResponse]:
+        """Return the cached itinerary for ``key`` moved onto ``request``'s dates."""
+        if self.store is None:
+            return None
+        try:
+            cached = await self.store.get(key)
+            return rebase_itinerary(cached, request) if cached else None
+        except Exception as exc:
+            logger.warning("Generation cache read failed: %s", exc)
+            return None
+
+    async def set(self, key: str, itinerary: ItineraryResponse) -> None:
+        if self.store is None:
+            return
+        value = itinerary.model_dump(
+            mode="json", exclude={"id", "created_at", "updated_at"}
+        )
+        try:
+            await self.store.set(key, value)
+        except Exception as exc:
+            logger.warning("Generation cache write failed: %s", exc)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.store.stats() if self.store is not None else {"backend": "none"}
+
+
+def create_generation_store(
+    backend: str, directory: str, max_entries: int, ttl: float
+) -> Optional[GenerationStore]:
+    """Build the store named by ``GENERATION_CACHE_BACKEND``."""
+    if backend == "memory":
+        return MemoryGenerationStore(max_entries, ttl)
+    if backend == "disk":
+        return DiskGenerationStore(directory, max_entries, ttl)
+    if backend == "none":
+        return None
+    raise ValueError(f"Unsupported GENERATION_CACHE_BACKEND: {backend}")
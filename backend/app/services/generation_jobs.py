@@ -0,0 +1,391 @@
+"""Background itinerary generation jobs served by a bounded worker pool."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import register_metrics_source
+from app.schemas.itinerary import ItineraryRequest, ItineraryTextRequest
+from app.schemas.job import GenerationJob, JobKind, JobStatus
+from app.services.llm_scheduler import Priority, llm_priority
+from app.services.travel_service import travel_service
+
+logger = get_logger(__name__)
+
+# Runs one job: receives the owner's user id and the job payload, returns the
+# model stored as the job result.
+JobHandler = Callable[[str, Dict[str, Any]], Awaitable[BaseModel]]
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the job queue is at capacity."""
+
+
+class DiskJobStore:
+    """
+    One JSON file per job under ``directory``.
+
+    Lets queued and running jobs survive a restart: :meth:`load` returns
+    every stored job and the queue re-runs the unfinished ones.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+
+    async def load(self) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self._load)
+
+    async def save(self, job: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self._save, job)
+
+    async def delete(self, job_id: str) -> None:
+        await asyncio.to_thread(self._delete, job_id)
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def _load(self) -> List[Dict[str, Any]]:
+        if not os.path.isdir(self.directory):
+            return []
+        jobs = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                with open(entry.path, encoding="utf-8") as handle:
+                    jobs.append(json.load(handle))
+            except (OSError, ValueError) as exc:
+                logger.warning("Skipping unreadable job file %s: %s", entry.path, exc)
+        return jobs
+
+    def _save(self, job: Dict[str, Any]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(job["id"])
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as handle:
+            json.dump(job, handle, ensure_ascii=False, default=str)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temp_path, path)
+
+    def _delete(self, job_id: str) -> None:
+        try:
+            os.remove(self._path(job_id))
+        except OSError:
+            pass
+
+
+class GenerationJobQueue:
+    """
+    In-process queue of generation jobs drained by ``workers`` tasks.
+
+    :meth:`submit` records the job and returns immediately; at most
+    ``max_queued`` jobs may wait, beyond that submissions fail with
+    :class:`QueueFullError` so callers can back off instead of piling up
+    LLM calls. Status changes are pushed to :meth:`subscribe` iterators.
+    With a ``store`` every state change is persisted and :meth:`start`
+    re-queues jobs that were queued or running when the process stopped.
+    Finished jobs are kept for ``ttl`` seconds.
+    """
+
+    def __init__(
+        self,
+        handlers: Dict[JobKind, JobHandler],
+        store: Optional[DiskJobStore] = None,
+        workers: int = 2,
+        max_queued: int = 100,
+        ttl: float = 24 * 60 * 60,
+    ) -> None:
+        self.handlers = handlers
+        self.store = store
+        self.workers = max(1, workers)
+        self.max_queued = max(1, max_queued)
+        self.ttl = ttl
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._idempotency: Dict[Tuple[str, str], str] = {}
+        self._watchers: Dict[str, Set[asyncio.Queue]] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.rejected = 0
+        self.recovered = 0
+
+    async def start(self) -> None:
+        """Reload persisted jobs and start the workers."""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        if self.store is not None:
+            jobs = await self.store.load()
+            jobs.sort(key=lambda job: job["created_at"])
+            for job in jobs:
+                self._remember(job)
+                if not JobStatus(job["status"]).finished:
+                    job["status"] = JobStatus.QUEUED.value
+                    self._queue.put_nowait(job["id"])
+                    self.recovered += 1
+            if self.recovered:
+                logger.info("Re-queued %d unfinished generation jobs", self.recovered)
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Stop the workers; unfinished jobs stay persisted for the next start."""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        self._queue = None
+
+    async def submit(
+        self,
+        user_id: str,
+        kind: JobKind,
+        payload: Dict[str, Any],
+        idempotency_key: Optional[str] = None,
+    ) -> GenerationJob:
+        """
+        Queue a job and return it without waiting for the result.
+
+        Repeating a submission with the same ``idempotency_key`` returns the
+        original job instead of generating again.
+        """
+        if self._queue is None:
+            raise RuntimeError("Generation job queue is not running")
+
+        if idempotency_key:
+            existing = self._jobs.get(
+                self._idempotency.get((user_id, idempotency_key), "")
+            )
+            if existing is not None:
+                return self._public(existing)
+
+        if self._queue.qsize() >= self.max_queued:
+            self.rejected += 1
+            raise QueueFullError("Generation queue is full; try again later")
+
+        now = _now()
+        job = {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "kind": kind.value,
+            "status": JobStatus.QUEUED.value,
+            "payload": payload,
+            "idempotency_key": idempotency_key,
+            "created_at": now,
+            "updated_at": now,
+            "result": None,
+            "error": None,
+        }
+        self._remember(job)
+        if self.store is not None:
+            await self.store.save(job)
+        self._queue.put_nowait(job["id"])
+        self.submitted += 1
+        return self._public(job)
+
+    def get(self, job_id: str, user_id: str) -> Optional[GenerationJob]:
+        """Return the caller's job, or None if it does not exist or expired."""
+        job = self._jobs.get(job_id)
+        if job is None or job["user_id"] != user_id:
+            return None
+        return self._public(job)
+
+    def subscribe(
+        self, job_id: str, user_id: str
+    ) -> Optional[AsyncIterator[GenerationJob]]:
+        """
+        Iterate over the job's states, starting with the current one.
+
+        The iterator ends once the job has finished. Returns None for an
+        unknown job.
+        """
+        job = self._jobs.get(job_id)
+        if job is None or job["user_id"] != user_id:
+            return None
+
+        async def events() -> AsyncIterator[GenerationJob]:
+            updates: asyncio.Queue = asyncio.Queue()
+            self._watchers.setdefault(job_id, set()).add(updates)
+            try:
+                state = self._public(job)
+                yield state
+                while not state.status.finished:
+                    state = await updates.get()
+                    yield state
+            finally:
+                watchers = self._watchers.get(job_id)
+                if watchers is not None:
+                    watchers.discard(updates)
+                    if not watchers:
+                        del self._watchers[job_id]
+
+        return events()
+
+    def stats(self) -> Dict[str, Any]:
+        statuses = [job["status"] for job in self._jobs.values()]
+        return {
+            "workers": len(self._tasks),
+            "queued": statuses.count(JobStatus.QUEUED.value),
+            "running": statuses.count(JobStatus.RUNNING.value),
+            "max_queued": self.max_queued,
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "recovered": self.recovered,
+        }
+
+    async def _work(self) -> None:
+        # Interactive requests take provider capacity ahead of queued jobs.
+        llm_priority.set(Priority.BACKGROUND)
+        while True:
+            job_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+            if job is None or JobStatus(job["status"]).finished:
+                continue
+            try:
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                # Handler errors are recorded by _run, so the job's state could
+                # not be stored; fail it here rather than lose the worker.
+                logger.exception("Could not record generation job %s", job_id)
+                self.failed += 1
+                job.update(
+                    status=JobStatus.FAILED.value,
+                    result=None,
+                    error=f"Could not record job state: {exc}",
+                    updated_at=_now(),
+                )
+                self._publish(job)
+            try:
+                await self._prune()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Could not prune finished generation jobs")
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        await self._update(job, status=JobStatus.RUNNING.value)
+        try:
+            handler = self.handlers[JobKind(job["kind"])]
+            result = await handler(job["user_id"], job["payload"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("Generation job %s failed: %s", job["id"], exc)
+            await self._update(job, status=JobStatus.FAILED.value, error=str(exc))
+            self.failed += 1
+        else:
+            await self._update(
+                job,
+                status=JobStatus.SUCCEEDED.value,
+                result=result.model_dump(mode="json"),
+            )
+            self.succeeded += 1
+
+    async def _update(self, job: Dict[str, Any], **changes: Any) -> None:
+        job.update(changes, updated_at=_now())
+        if self.store is not None:
+            await self.store.save(job)
+        self._publish(job)
+
+    def _publish(self, job: Dict[str, Any]) -> None:
+        state = self._public(job)
+        for updates in self._watchers.get(job["id"], ()):
+            updates.put_nowait(state)
+
+    def _remember(self, job: Dict[str, Any]) -> None:
+        self._jobs[job["id"]] = job
+        if job.get("idempotency_key"):
+            self._idempotency[(job["user_id"], job["idempotency_key"])] = job["id"]
+
+    async def _prune(self) -> None:
+        cutoff = time.time() - self.ttl
+        expired = [
+            job
+            for job in self._jobs.values()
+            if JobStatus(job["status"]).finished
+            and datetime.fromisoformat(job["updated_at"]).timestamp() < cutoff
+        ]
+        for job in expired:
+            del self._jobs[job["id"]]
+            if job.get("idempotency_key"):
+                self._idempotency.pop((job["user_id"], job["idempotency_key"]), None)
+            if self.store is not None:
+                await self.store.delete(job["id"])
+
+    @staticmethod
+    def _public(job: Dict[str, Any]) -> GenerationJob:
+        return GenerationJob.model_validate(
+            {key: job[key] for key in GenerationJob.model_fields if key in job}
+        )
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+async def _run_itinerary(user_id: str, payload: Dict[str, Any]) -> BaseModel:
+    return await travel_service.create_itinerary(
+        user_id,
+        ItineraryRequest.model_validate(payload["request"]),
+        use_cache=payload.get("use_cache", True),
+    )
+
+
+async def _run_itinerary_from_text(user_id: str, payload: Dict[str, Any]) -> BaseModel:
+    return await travel_service.create_itinerary_from_text(
+        user_id,
+        ItineraryTextRequest.model_validate(payload["request"]),
+        use_cache=payload.get("use_cache", True),
+    )
+
+
+def create_job_store(backend: str, directory: str) -> Optional[DiskJobStore]:
+    """Build the store named by ``GENERATION_JOB_STORE``."""
+    if backend == "memory":
+        return None
+    if backend == "disk":
+        return DiskJobStore(directory)
+    raise ValueError(f"Unsupported GENERATION_JOB_STORE: {backend}")
+
+
+generation_jobs = GenerationJobQueue(
+    {
+        JobKind.ITINERARY: _run_itinerary,
+        JobKind.ITINERARY_FROM_TEXT: _run_itinerary_from_text,
+    },
+    store=create_job_store(settings.GENERATION_JOB_STORE, settings.GENERATION_JOB_DIR),
+    workers=settings.GENERATION_JOB_WORKERS,
+    max_queued=settings.GENERATION_JOB_MAX_QUEUED,
+    ttl=settings.GENERATION_JOB_TTL_SECONDS,
+)
+register_metrics_source("generation_jobs", generation_jobs.stats)
@@ -0,0 +1,218 @@
+"""Tolerant, incremental extraction of a JSON object from LLM output."""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+_DECODER = json.JSONDecoder()
+
+# Outside strings: an object key with its colon, a complete string literal,
+# one structural character, or a run of scalar characters (numbers,
+# true/false/null, stray prose), each consumed in one regex step together
+# with the whitespace before it. A lone quote opens a string cut off
+# mid-chunk.
+_TOKEN = re.compile(
+    r"\s*(?:"
+    r'(?P<key>"[^"\\]*(?:\\.[^"\\]*)*"\s*:)'
+    r'|(?P<string>"[^"\\]*(?:\\.[^"\\]*)*")'
+    r"|(?P<open>[{\[])"
+    r"|(?P<close>[}\]])"
+    r"|(?P<comma>,)"
+    r"|(?P<colon>:)"
+    r'|(?P<quote>")'
+    r'|(?P<scalar>[^\s{}\[\]",:]+))',
+    re.S,
+)
+# Inside an unterminated string: an escape pair or the closing quote.
+_STRING_STOP = re.compile(r'\\.|"', re.S)
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+# Opening braces tried before giving up on a response.
+_MAX_STARTS = 3
+
+
+class JSONObjectExtractor:
+    """
+    Recover the first JSON object in model output, fed in any number of chunks.
+
+    Characters before the first ``{`` (prose, a ```` ```json ```` fence) and
+    anything after the object closes are ignored. While scanning, the
+    extractor notes commas directly followed by ``}`` or ``]`` and drops
+    them, and remembers the last point where the document could be cut and
+    closed. :meth:`result` therefore also returns the salvageable part of a
+    truncated response: complete values are kept, the unfinished tail
+    (including nested objects with no complete member yet) is discarded and
+    the open containers are closed. Each character is examined once, so
+    :meth:`feed` can be called as stream chunks arrive.
+    """
+
+    def __init__(self) -> None:
+        self.text = ""
+        self._pos = 0
+        self._start: Optional[int] = None
+        self._end: Optional[int] = None
+        self._stack: List[str] = []
+        self._in_string = False
+        self._string_is_value = False
+        self._expect_value = False
+        self._pending_comma: Optional[int] = None
+        self._cuts: List[int] = []
+        self._safe_pos = 0
+        self._safe_depth = 0
+
+    @property
+    def complete(self) -> bool:
+        """Whether the object's closing brace has been seen."""
+        return self._end is not None
+
+    def feed(self, chunk: str) -> bool:
+        """Consume ``chunk``; returns :attr:`complete`."""
+        self.text += chunk
+        if self._end is None:
+            self._scan()
+        return self._end is not None
+
+    def result(self) -> Optional[Dict[str, Any]]:
+        """The object parsed so far (repaired if truncated), or None."""
+        if self._start is None:
+            return None
+        if self._end is not None:
+            body = self._slice(self._end)
+        else:
+            closers = "".join(
+                _CLOSERS[opener] for opener in reversed(self._stack[: self._safe_depth])
+            )
+            body = self._slice(self._safe_pos) + closers
+        try:
+            value = json.loads(body)
+        except json.JSONDecodeError:
+            return None
+        return value if isinstance(value, dict) else None
+
+    def _slice(self, stop: int) -> str:
+        parts = []
+        position = self._start
+        for cut in self._cuts:
+            if cut >= stop:
+                break
+            parts.append(self.text[position:cut])
+            position = cut + 1
+        parts.append(self.text[position:stop])
+        return "".join(parts)
+
+    def _scan(self) -> None:
+        text = self.text
+        pos = self._pos
+        stack = self._stack
+
+        if self._start is None:
+            found = text.find("{", pos)
+            if found < 0:
+                self._pos = len(text)
+                return
+            self._start = pos = found
+
+        length = len(text)
+        while pos < length and self._end is None:
+            if self._in_string:
+                match = _STRING_STOP.search(text, pos)
+                if match is None:
+                    # A lone trailing backslash escapes the next chunk's char.
+                    pos = length - 1 if text.endswith("\\") else length
+                    break
+                pos = match.end()
+                if match.group() == '"':
+                    self._in_string = False
+                    if self._string_is_value:
+                        self._safe_pos, self._safe_depth = pos, len(stack)
+                continue
+            pos = self._scan_tokens(text, pos)
+
+        self._pos = pos
+
+    def _scan_tokens(self, text: str, pos: int) -> int:
+        """Consume tokens outside strings; returns where scanning stopped."""
+        stack = self._stack
+        for match in _TOKEN.finditer(text, pos):
+            kind = match.lastgroup
+            end = match.end()
+            if kind == "key":
+                self._expect_value = True
+                self._pending_comma = None
+            elif kind == "string" or kind == "quote":
+                is_value = self._expect_value or stack[-1:] == ["["]
+                self._expect_value = False
+                self._pending_comma = None
+                if kind == "quote":
+                    self._in_string = True
+                    self._string_is_value = is_value
+                    return end
+                if is_value:
+                    self._safe_pos, self._safe_depth = end, len(stack)
+            elif kind == "open":
+                stack.append(match.group("open"))
+                self._expect_value = False
+                self._pending_comma = None
+                if len(stack) == 1:
+                    self._safe_pos, self._safe_depth = end, 1
+            elif kind == "close":
+                if self._pending_comma is not None:
+                    self._cuts.append(self._pending_comma)
+                    self._pending_comma = None
+                if stack:
+                    stack.pop()
+                self._expect_value = False
+                self._safe_pos, self._safe_depth = end, len(stack)
+                if not stack:
+                    self._end = end
+                    return end
+            elif kind == "comma":
+                self._safe_pos, self._safe_depth = end - 1, len(stack)
+                self._pending_comma = end - 1
+                self._expect_value = False
+            elif kind == "colon":
+                self._expect_value = True
+            else:
+                self._pending_comma = None
+                self._expect_value = False
+        return len(text)
+
+
+def extract_json_object(text: Any) -> Optional[Dict[str, Any]]:
+    """
+    Return the first JSON object in ``text``, tolerating common LLM defects.
+
+    Well-formed output (optionally wrapped in prose or a code fence) is
+    decoded directly from its first ``{`` by the C decoder, which stops at
+    the end of the object. Only when that fails (trailing commas, a cut-off
+    tail) does :class:`JSONObjectExtractor` repair the document, scanning
+    it a second time in Python; that costs a few milliseconds on long
+    responses, against template output without it. A balanced
+    brace pair in the prose before the object ("{budget 7000}") is skipped
+    as a whole, trying at most ``_MAX_STARTS`` candidates; braces inside a
+    failed candidate are never tried, so a broken response is not mistaken
+    for one of its nested objects.
+    """
+    if not isinstance(text, str):
+        return None
+    start = text.find("{")
+    for _ in range(_MAX_STARTS):
+        if start < 0:
+            return None
+        try:
+            value, _ = _DECODER.raw_decode(text, start)
+        except json.JSONDecodeError:
+            extractor = JSONObjectExtractor()
+            extractor.feed(text[start:])
+            value = extractor.result()
+            if value is None:
+                if not extractor.complete:
+                    # Every later brace is nested in the unclosed candidate.
+                    return None
+                start = text.find("{", start + extractor._end)
+                continue
+        return value
+    return None
@@ -0,0 +1,235 @@
+"""Coerce and validate LLM itinerary output in a single pydantic pass."""
+
+from __future__ import annotations
+
+import json
+import re
+from datetime import date, timedelta
+from typing import Annotated, Any, Callable, Dict, List, Optional, Union
+
+from pydantic import (
+    AfterValidator,
+    BeforeValidator,
+    Field,
+    TypeAdapter,
+    ValidationInfo,
+    field_validator,
+)
+
+from app.schemas.itinerary import (
+    ActivityItem,
+    DayItinerary,
+    ItineraryRequest,
+    ItineraryResponse,
+)
+
+_AMOUNT = re.compile(r"-?\d+(?:\.\d+)?")
+# Currency signs and thousands separators dropped before reading an amount.
+_AMOUNT_NOISE = str.maketrans("", "", "￥¥,")
+_TRUE_WORDS = frozenset({"true", "yes", "y", "1", "是", "ok"})
+_FALSE_WORDS = frozenset({"false", "no", "n", "0", "否"})
+
+
+def coerce_currency(value: Any) -> Optional[float]:
+    """Read an amount such as ``60``, ``"￥1,200"`` or ``"40元"``."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        match = _AMOUNT.search(value.translate(_AMOUNT_NOISE))
+        if match:
+            return float(match.group())
+    return None
+
+
+def coerce_text(value: Any) -> Optional[str]:
+    """Strip text, join lists and serialize objects; empty becomes None."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value.strip() or None
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, list):
+        return " ".join(str(item).strip() for item in value if item).strip() or None
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value).strip() or None
+
+
+def coerce_bool(value: Any) -> Optional[bool]:
+    """Read ``true``/``"yes"``/``"是"`` style flags; None when unrecognized."""
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return bool(value)
+    if isinstance(value, str):
+        lowered = value.strip().lower()
+        if lowered in _TRUE_WORDS:
+            return True
+        if lowered in _FALSE_WORDS:
+            return False
+    return None
+
+
+def _required_text(value: Any) -> str:
+    coerced = coerce_text(value)
+    if coerced is None:
+        raise ValueError("expected text")
+    return coerced
+
+
+def _amount_or_zero(value: Any) -> float:
+    return coerce_currency(value) or 0.0
+
+
+def _activities(value: Any) -> List[Dict[str, Any]]:
+    if isinstance(value, dict):
+        return [value]
+    if not isinstance(value, list):
+        return []
+    return [activity for activity in value if isinstance(activity, dict)]
+
+
+def _fill_day(day: Dict[str, Any], index: int, start_date: date) -> Dict[str, Any]:
+    """Default the day number and date from the day's position, in place."""
+    day.setdefault("day", index + 1)
+    if not day.get("date"):
+        day["date"] = start_date + timedelta(days=index)
+    return day
+
+
+def _request(info: ValidationInfo) -> ItineraryRequest:
+    return info.context["request"]
+
+
+def _lenient(native: Any, coerce: Callable[[Any], Any]) -> Any:
+    """
+    ``native`` checked by pydantic-core, ``coerce`` only for what it rejects.
+
+    Most model output is already well typed, so the Python coercion runs for
+    the odd ``"￥200"`` or ``["故宫", "午门"]`` rather than for every field.
+    """
+    return Annotated[
+        Union[native, Annotated[Any, AfterValidator(coerce)]],
+        Field(union_mode="left_to_right"),
+    ]
+
+
+Text = _lenient(str, _required_text)
+OptionalText = Optional[_lenient(str, coerce_text)]
+Amount = Optional[_lenient(float, coerce_currency)]
+# None means "sum the parts"; an unreadable amount counts as zero.
+Total = Optional[_lenient(float, _amount_or_zero)]
+Flag = Optional[_lenient(bool, coerce_bool)]
+
+
+class LLMActivityItem(ActivityItem):
+    """:class:`ActivityItem` that accepts the loose shapes models produce."""
+
+    time: Text
+    activity: Text
+    location: Text
+    location_address: OptionalText = None
+    is_sightseeing: Flag = None
+    estimated_cost: Amount = None
+    notes: OptionalText = None
+
+
+class LLMDayItinerary(DayItinerary):
+    """:class:`DayItinerary` whose missing total is the sum of its activities."""
+
+    activities: Annotated[List[LLMActivityItem], BeforeValidator(_activities)] = Field(
+        default_factory=list
+    )
+    total_estimated_cost: Total = Field(None, validate_default=True)
+
+    @field_validator("total_estimated_cost")
+    @classmethod
+    def _sum_activities(cls, value: Optional[float], info: ValidationInfo) -> float:
+        # Fields validate in order, so the activities are already coerced.
+        if value is not None:
+            return value
+        activities = info.data.get("activities", ())
+        return float(sum(activity.estimated_cost or 0 for activity in activities))
+
+
+class LLMItinerary(ItineraryResponse):
+    """
+    :class:`ItineraryResponse` read from model output.
+
+    Must be validated with ``context={"request": request}``: missing trip
+    fields fall back to the request and days without a number or date get
+    them from their position.
+    """
+
+    destination: str = Field(None, validate_default=True)
+    start_date: date = Field(None, validate_default=True)
+    end_date: date = Field(None, validate_default=True)
+    budget: float = Field(None, validate_default=True)
+    daily_itinerary: List[LLMDayItinerary]
+    total_estimated_cost: Total = Field(None, validate_default=True)
+
+    @field_validator("destination", mode="before")
+    @classmethod
+    def _destination(cls, value: Any, info: ValidationInfo) -> str:
+        return coerce_text(value) or _request(info).destination
+
+    @field_validator("start_date", "end_date", mode="before")
+    @classmethod
+    def _trip_dates(cls, value: Any, info: ValidationInfo) -> Any:
+        return getattr(_request(info), info.field_name) if value is None else value
+
+    @field_validator("budget", mode="before")
+    @classmethod
+    def _budget(cls, value: Any, info: ValidationInfo) -> float:
+        return coerce_currency(value) or _request(info).budget
+
+    @field_validator("daily_itinerary", mode="before")
+    @classmethod
+    def _days(cls, value: Any, info: ValidationInfo) -> List[Dict[str, Any]]:
+        if not isinstance(value, list):
+            raise ValueError("daily_itinerary must be a list")
+        start_date = _request(info).start_date
+        days = [
+            _fill_day(day, index, start_date)
+            for index, day in enumerate(value)
+            if isinstance(day, dict)
+        ]
+        if not days:
+            raise ValueError("daily_itinerary has no days")
+        return days
+
+    @field_validator("total_estimated_cost")
+    @classmethod
+    def _sum_days(cls, value: Optional[float], info: ValidationInfo) -> float:
+        if value:
+            return value
+        days = info.data.get("daily_itinerary", ())
+        return float(sum(day.total_estimated_cost for day in days))
+
+
+_DAY = TypeAdapter(LLMDayItinerary)
+_ITINERARY = TypeAdapter(LLMItinerary)
+
+
+def normalize_day(
+    day: Dict[str, Any], index: int, request: ItineraryRequest
+) -> DayItinerary:
+    """
+    Validate one day of model output; ``index`` is its position in the trip.
+
+    ``day`` is updated in place rather than copied. Raises
+    :class:`pydantic.ValidationError` when it cannot be repaired.
+    """
+    return _DAY.validate_python(_fill_day(day, index, request.start_date))
+
+
+def normalize_itinerary(
+    data: Dict[str, Any], request: ItineraryRequest
+) -> ItineraryResponse:
+    """
+    Validate a whole itinerary of model output against ``request``.
+
+    Raises :class:`pydantic.ValidationError` when it cannot be repaired.
+    """
+    return _ITINERARY.validate_python(data, context={"request": request})
@@ -0,0 +1,235 @@
+"""Route LLM calls to the healthiest provider, hedging slow calls."""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# Calls one provider by name; returns None (or raises) when it failed.
+ProviderCall = Callable[[str], Awaitable[Optional[T]]]
+
+
+class ProviderHealth:
+    """
+    Rolling latency and error samples for one provider.
+
+    Keeps the last ``window`` calls that finished within ``max_age``
+    seconds, so a provider's bad minute ages out instead of pinning it to
+    the bottom of the ranking forever.
+    """
+
+    def __init__(self, window: int = 50, max_age: float = 300.0) -> None:
+        self.max_age = max_age
+        self._samples: Deque[Tuple[float, float, bool]] = deque(maxlen=window)
+        self.calls = 0
+        self.errors = 0
+        self.wins = 0
+
+    def record(self, latency: float, ok: bool) -> None:
+        self._samples.append((time.monotonic(), latency, ok))
+        self.calls += 1
+        if not ok:
+            self.errors += 1
+
+    def _recent(self) -> List[Tuple[float, float, bool]]:
+        cutoff = time.monotonic() - self.max_age
+        while self._samples and self._samples[0][0] < cutoff:
+            self._samples.popleft()
+        return list(self._samples)
+
+    @property
+    def samples(self) -> int:
+        return len(self._recent())
+
+    @property
+    def error_rate(self) -> float:
+        recent = self._recent()
+        if not recent:
+            return 0.0
+        return sum(1 for _, _, ok in recent if not ok) / len(recent)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        latencies = sorted(latency for _, latency, ok in self._recent() if ok)
+        if not latencies:
+            return None
+        rank = max(math.ceil(fraction * len(latencies)) - 1, 0)
+        return latencies[rank]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "samples": self.samples,
+            "error_rate": self.error_rate,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "calls": self.calls,
+            "errors": self.errors,
+            "wins": self.wins,
+        }
+
+
+class LLMRouter:
+    """
+    Send each call to the healthiest provider and fail over or hedge.
+
+    Providers are ranked by recent error rate and p95 latency, with the
+    caller's order breaking ties, so the configured provider is tried first
+    while there is no data. A failed call moves on to the next provider.
+    With ``hedge`` enabled, once the primary has been running longer than
+    its p95 (never less than ``hedge_min_delay``, and only after
+    ``min_samples`` successful calls) the next provider is called too; the
+    first valid response wins and the other call is cancelled.
+    """
+
+    def __init__(
+        self,
+        *,
+        hedge: bool = False,
+        hedge_min_delay: float = 1.0,
+        min_samples: int = 5,
+        window: int = 50,
+        max_age: float = 300.0,
+    ) -> None:
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.min_samples = min_samples
+        self.window = window
+        self.max_age = max_age
+        self._health: Dict[str, ProviderHealth] = {}
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+    def health(self, name: str) -> ProviderHealth:
+        health = self._health.get(name)
+        if health is None:
+            health = self._health[name] = ProviderHealth(self.window, self.max_age)
+        return health
+
+    def rank(self, providers: List[str]) -> List[str]:
+        """Order ``providers`` from healthiest to least healthy."""
+
+        def score(item: Tuple[int, str]) -> Tuple[int, float, int]:
+            index, name = item
+            health = self.health(name)
+            error_rate = health.error_rate
+            p95 = health.percentile(0.95)
+            # Failing most calls ranks below any slow provider, and providers
+            # without data wait behind measured ones until failover or a
+            # hedge gives them samples.
+            if error_rate >= 0.5:
+                return (2, 0.0, index)
+            if p95 is None:
+                return (1, 0.0, index)
+            return (0, p95 / (1.0 - error_rate), index)
+
+        return [name for _, name in sorted(enumerate(providers), key=score)]
+
+    def hedge_delay(self, name: str) -> Optional[float]:
+        """Seconds to wait on ``name`` before hedging, or None to not hedge."""
+        health = self.health(name)
+        p95 = health.percentile(0.95)
+        if p95 is None or health.samples < self.min_samples:
+            return None
+        return max(p95, self.hedge_min_delay)
+
+    async def run(self, providers: List[str], call: ProviderCall) -> Optional[T]:
+        """Return the first valid result from ``providers``, or None."""
+        queue = self.rank(providers)
+        if not queue:
+            return None
+
+        pending: Dict[asyncio.Task, str] = {}
+        started: Dict[asyncio.Task, float] = {}
+        primary = queue[0]
+        hedged = False
+
+        def launch() -> None:
+            name = queue.pop(0)
+            task = asyncio.create_task(self._timed(name, call))
+            pending[task] = name
+            started[task] = time.perf_counter()
+
+        launch()
+        try:
+            while pending:
+                timeout = None
+                if self.hedge and queue and not hedged:
+                    timeout = self.hedge_delay(primary)
+                done, _ = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    hedged = True
+                    self.hedges += 1
+                    logger.info("Hedging slow %s call to %s", primary, queue[0])
+                    launch()
+                    continue
+
+                for task in done:
+                    name = pending.pop(task)
+                    result = task.result()
+                    if result is not None:
+                        self.health(name).wins += 1
+                        if hedged and name != primary:
+                            self.hedge_wins += 1
+                        if hedged:
+                            self._record_outrun(pending, started)
+                        return result
+
+                if not pending and queue:
+                    self.failovers += 1
+                    launch()
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    def _record_outrun(
+        self, losers: Dict[asyncio.Task, str], started: Dict[asyncio.Task, float]
+    ) -> None:
+        """
+        Count calls that lost a hedge race and were already slow as samples.
+
+        Such a call's elapsed time is a lower bound on its latency; leaving
+        it out would keep a slow provider's p95 looking fast. A loser still
+        under its p95 tells nothing new and is dropped, as are calls
+        cancelled because the caller went away.
+        """
+        now = time.perf_counter()
+        for task, name in losers.items():
+            health = self.health(name)
+            elapsed = now - started[task]
+            p95 = health.percentile(0.95)
+            if p95 is not None and elapsed >= p95:
+                health.record(elapsed, True)
+
+    async def _timed(self, name: str, call: ProviderCall) -> Optional[T]:
+        started = time.perf_counter()
+        try:
+            result = await call(name)
+        except Exception as exc:
+            logger.warning("LLM provider %s failed: %s", name, exc)
+            result = None
+        self.health(name).record(time.perf_counter() - started, result is not None)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+            "providers": {
+                name: health.stats() for name, health in self._health.items()
+            },
+        }
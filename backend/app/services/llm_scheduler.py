@@ -0,0 +1,475 @@
+"""Per-provider rate limiting and prioritized scheduling of LLM calls."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import heapq
+import itertools
+import math
+import random
+import time
+from collections import deque
+from contextvars import Context, ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+import httpx
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# Statuses worth retrying; 429 and anything with Retry-After pause the key.
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class Priority(IntEnum):
+    """Scheduling class of an LLM call; lower values are served first."""
+
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+# Calls made while serving a request are interactive; background workers set
+# this for their own task.
+llm_priority: ContextVar[Priority] = ContextVar(
+    "llm_priority", default=Priority.INTERACTIVE
+)
+
+
+class SharedPriority:
+    """
+    Priority of a call shared by several callers; it is only ever raised.
+
+    Kept in :data:`shared_priority` for the whole shared call. Every task the
+    call spawns (router attempts, per-day generations) runs in a copy of its
+    context, but the copies all hold this one object, so raising it reaches
+    calls made afterwards and re-queues the ones already waiting.
+    """
+
+    def __init__(self, priority: Priority) -> None:
+        self.priority = priority
+        self._queued: List[Tuple[RateLimiter, _Waiter]] = []
+
+    def raise_to(self, priority: Priority) -> None:
+        if priority >= self.priority:
+            return
+        self.priority = priority
+        for limiter, waiter in list(self._queued):
+            limiter.reprioritize(waiter, priority)
+
+    def _track(self, limiter: RateLimiter, waiter: _Waiter) -> None:
+        self._queued.append((limiter, waiter))
+
+    def _untrack(self, waiter: _Waiter) -> None:
+        self._queued = [entry for entry in self._queued if entry[1] is not waiter]
+
+
+shared_priority: ContextVar[Optional[SharedPriority]] = ContextVar(
+    "llm_shared_priority", default=None
+)
+
+
+def current_priority() -> Priority:
+    """Priority of calls made now: the caller's, or a shared call's if higher."""
+    priority = llm_priority.get()
+    shared = shared_priority.get()
+    return priority if shared is None else min(priority, shared.priority)
+
+
+def share_priority() -> None:
+    """
+    Give a shared call a priority that later callers can raise.
+
+    Used as the :class:`~app.core.singleflight.SingleFlight` start hook; it
+    runs in the shared call's context before the call starts.
+    """
+    shared_priority.set(SharedPriority(current_priority()))
+
+
+def inherit_priority(shared: Context) -> None:
+    """
+    Raise a shared call's priority to the current caller's.
+
+    Used as the :class:`~app.core.singleflight.SingleFlight` join hook, so an
+    interactive request joining a generation started by a background job is
+    not served at background priority, including the provider calls it has
+    already queued. Requires :func:`share_priority` as the start hook.
+    """
+    holder = shared.run(shared_priority.get)
+    if holder is not None:
+        holder.raise_to(current_priority())
+
+
+class QueueTimeoutError(RuntimeError):
+    """Raised when a call cannot start before its deadline."""
+
+
+class TokenBucket:
+    """
+    Refills at ``rate`` units per second up to ``capacity``.
+
+    The level may go negative: a request larger than the bucket is let
+    through once the bucket is full and leaves a debt, and
+    :meth:`adjust` charges usage reported after the fact.
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` can be taken."""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(missing, 0.0) / self.rate
+
+    def take(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.level -= amount
+
+    def adjust(self, amount: float) -> None:
+        self.level = min(self.capacity, self.level - amount)
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    deadline: float
+    seq: int
+    tokens: float = field(compare=False)
+    wakeup: Optional[asyncio.Future] = field(default=None, compare=False)
+
+
+class RateLimiter:
+    """
+    Queue of calls to one provider API key, released at ``qps`` requests per
+    second and ``tpm`` tokens per minute (0 disables a limit).
+
+    Waiters are served by priority, then earliest deadline. Only the head of
+    the queue watches the buckets, so a burst of callers does not spin, and a
+    call whose turn would come after its deadline fails fast with
+    :class:`QueueTimeoutError` instead of occupying the queue.
+    :meth:`pause` holds every call back, e.g. for a provider's Retry-After.
+    """
+
+    def __init__(self, qps: float = 0, tpm: float = 0, wait_window: int = 200) -> None:
+        self.qps = qps
+        self.tpm = tpm
+        self.requests = TokenBucket(qps, max(qps, 1.0)) if qps > 0 else None
+        self.tokens = TokenBucket(tpm / 60.0, tpm) if tpm > 0 else None
+        self.paused_until = 0.0
+        self._queue: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._waits: Deque[float] = deque(maxlen=wait_window)
+        self.max_queued = 0
+        self.granted = 0
+        self.expired = 0
+        self.throttled = 0
+        self.retries = 0
+        self.wait_total = 0.0
+
+    def _delay(self, tokens: float, now: float) -> float:
+        delay = self.paused_until - now
+        if self.requests is not None:
+            delay = max(delay, self.requests.delay(1, now))
+        if self.tokens is not None:
+            delay = max(delay, self.tokens.delay(tokens, now))
+        return max(delay, 0.0)
+
+    async def acquire(
+        self,
+        tokens: float = 0,
+        priority: int = Priority.INTERACTIVE,
+        deadline: float = math.inf,
+        shared: Optional[SharedPriority] = None,
+    ) -> float:
+        """
+        Wait for capacity for one call using ``tokens``; returns seconds waited.
+
+        While queued the call follows ``shared`` if that priority is raised.
+        """
+        started = time.monotonic()
+        waiter = _Waiter(priority, deadline, next(self._seq), tokens)
+        heapq.heappush(self._queue, waiter)
+        if shared is not None:
+            shared._track(self, waiter)
+        self.max_queued = max(self.max_queued, len(self._queue))
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                now = time.monotonic()
+                if self._queue[0] is waiter:
+                    delay = self._delay(tokens, now)
+                    if delay <= 0:
+                        break
+                    timeout = delay
+                    if now + delay > deadline:
+                        raise QueueTimeoutError(
+                            f"No capacity within the deadline (next slot in {delay:.1f}s)"
+                        )
+                elif deadline <= now:
+                    raise QueueTimeoutError("Deadline passed while queued")
+                else:
+                    timeout = None if math.isinf(deadline) else deadline - now
+                # Woken early when the queue head changes.
+                waiter.wakeup = loop.create_future()
+                await asyncio.wait([waiter.wakeup], timeout=timeout)
+        except BaseException as exc:
+            if isinstance(exc, QueueTimeoutError):
+                self.expired += 1
+            self._leave(waiter, shared)
+            raise
+
+        self._leave(waiter, shared)
+        now = time.monotonic()
+        if self.requests is not None:
+            self.requests.take(1, now)
+        if self.tokens is not None:
+            self.tokens.take(tokens, now)
+        waited = now - started
+        self.granted += 1
+        self.wait_total += waited
+        self._waits.append(waited)
+        return waited
+
+    def _leave(self, waiter: _Waiter, shared: Optional[SharedPriority]) -> None:
+        if shared is not None:
+            shared._untrack(waiter)
+        was_head = self._queue[0] is waiter
+        self._queue.remove(waiter)
+        heapq.heapify(self._queue)
+        if was_head and self._queue:
+            self._wake_head()
+
+    def reprioritize(self, waiter: _Waiter, priority: int) -> None:
+        """Move a queued call to ``priority``, waking it if it is now first."""
+        was_head = self._queue[0] is waiter
+        waiter.priority = priority
+        heapq.heapify(self._queue)
+        if self._queue[0] is waiter and not was_head:
+            self._wake_head()
+
+    def _wake_head(self) -> None:
+        wakeup = self._queue[0].wakeup
+        if wakeup is not None and not wakeup.done():
+            wakeup.set_result(None)
+
+    def settle(self, estimated: float, actual: Optional[float]) -> None:
+        """Charge the difference between estimated and reported token usage."""
+        if self.tokens is not None and actual is not None:
+            self.tokens.adjust(actual - estimated)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every call back for ``seconds``."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        if self._queue:
+            self._wake_head()
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+        p95 = waits[max(math.ceil(0.95 * len(waits)) - 1, 0)] if waits else None
+        return {
+            "qps": self.qps,
+            "tpm": self.tpm,
+            "queued": len(self._queue),
+            "max_queued": self.max_queued,
+            "granted": self.granted,
+            "expired": self.expired,
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "wait_avg": self.wait_total / self.granted if self.granted else 0.0,
+            "wait_p95": p95,
+            "wait_max": waits[-1] if waits else None,
+            "paused_for": max(self.paused_until - time.monotonic(), 0.0),
+        }
+
+
+def retry_after(response: httpx.Response) -> Optional[float]:
+    """Seconds requested by a ``Retry-After`` header (delta or HTTP date)."""
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class LLMScheduler:
+    """
+    Rate-limited, retrying front door for provider calls.
+
+    Each provider and API key gets its own :class:`RateLimiter` using the
+    ``(qps, tpm)`` in ``limits``. :meth:`call` queues the request at the
+    :func:`current_priority` with a deadline ``queue_timeout`` seconds out,
+    then retries throttled, failing or timed-out calls: a provider's
+    Retry-After (or a 429) pauses the whole key, other failures back off
+    exponentially with jitter from ``retry_base_delay``. A retry that
+    could not start before the deadline is not attempted.
+    """
+
+    def __init__(
+        self,
+        limits: Dict[str, Tuple[float, float]],
+        *,
+        queue_timeout: float = 30.0,
+        max_retries: int = 2,
+        retry_base_delay: float = 1.0,
+    ) -> None:
+        self.limits = limits
+        self.queue_timeout = queue_timeout
+        self.max_retries = max(max_retries, 0)
+        self.retry_base_delay = retry_base_delay
+        self._limiters: Dict[Tuple[str, str], RateLimiter] = {}
+
+    def limiter(self, provider: str, api_key: Optional[str]) -> RateLimiter:
+        # Keys are only kept as a short digest, which is also the metrics label.
+        digest = hashlib.sha256((api_key or "").encode()).hexdigest()[:8]
+        limiter = self._limiters.get((provider, digest))
+        if limiter is None:
+            qps, tpm = self.limits.get(provider, (0, 0))
+            limiter = self._limiters[(provider, digest)] = RateLimiter(qps, tpm)
+        return limiter
+
+    def deadline(self) -> float:
+        return time.monotonic() + self.queue_timeout
+
+    async def acquire(
+        self,
+        provider: str,
+        api_key: Optional[str],
+        tokens: float = 0,
+        deadline: Optional[float] = None,
+    ) -> RateLimiter:
+        """Wait for one call's capacity; returns the limiter that granted it."""
+        limiter = self.limiter(provider, api_key)
+        await limiter.acquire(
+            tokens,
+            current_priority(),
+            self.deadline() if deadline is None else deadline,
+            shared_priority.get(),
+        )
+        return limiter
+
+    def back_off(
+        self,
+        provider: str,
+        api_key: Optional[str],
+        response: httpx.Response,
+        default: Optional[float] = None,
+    ) -> Optional[float]:
+        """
+        Pause every call on the key if ``response`` asks for it.
+
+        That is a Retry-After header, or a 429 without one (paused for
+        ``default`` seconds, else ``retry_base_delay``). Returns the pause,
+        or None when the response did not throttle the key.
+        """
+        pause = retry_after(response)
+        if pause is None:
+            if response.status_code != 429:
+                return None
+            pause = self.retry_base_delay if default is None else default
+        limiter = self.limiter(provider, api_key)
+        limiter.throttled += 1
+        limiter.pause(pause)
+        logger.warning(
+            "%s returned %s; pausing calls for %.1fs",
+            provider,
+            response.status_code,
+            pause,
+        )
+        return pause
+
+    async def call(
+        self,
+        provider: str,
+        api_key: Optional[str],
+        request: Callable[[], Awaitable[T]],
+        *,
+        tokens: float = 0,
+        usage: Optional[Callable[[T], Optional[float]]] = None,
+    ) -> T:
+        """
+        Run ``request`` within the key's limits, retrying transient failures.
+
+        ``tokens`` is the estimated usage charged up front; ``usage`` reads
+        the actual usage from the result so the bucket can be corrected.
+        Raises :class:`QueueTimeoutError` or the last ``httpx`` error.
+        """
+        deadline = self.deadline()
+        attempt = 0
+        while True:
+            limiter = await self.acquire(provider, api_key, tokens, deadline)
+            try:
+                result = await request()
+            except httpx.HTTPStatusError as exc:
+                if exc.response.status_code not in RETRY_STATUSES:
+                    raise
+                error: Exception = exc
+                delay = self._backoff(attempt)
+                paused = self.back_off(provider, api_key, exc.response, delay)
+                if paused is not None:
+                    delay = paused
+            except httpx.TimeoutException as exc:
+                error = exc
+                delay = self._backoff(attempt)
+                paused = None
+            else:
+                if usage is not None:
+                    limiter.settle(tokens, usage(result))
+                return result
+
+            if attempt >= self.max_retries or time.monotonic() + delay > deadline:
+                raise error
+            attempt += 1
+            limiter.retries += 1
+            logger.info(
+                "Retrying %s call in %.1fs (attempt %d): %s",
+                provider,
+                delay,
+                attempt + 1,
+                error,
+            )
+            # A pause already holds the key back; otherwise only this call waits.
+            if paused is None:
+                await asyncio.sleep(delay)
+
+    def _backoff(self, attempt: int) -> float:
+        return self.retry_base_delay * 2**attempt * random.uniform(0.5, 1.0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            f"{provider}:{digest}": limiter.stats()
+            for (provider, digest), limiter in self._limiters.items()
+        }
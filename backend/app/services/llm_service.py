@@ -1,6 +1,5 @@
 import json
-import re
-from typing import Optional, List
+from typing import Any, AsyncIterator, Dict, Optional, List, Tuple
 from datetime import timedelta
 
 import httpx
@@ -12,6 +11,32 @@ from app.schemas.itinerary import (
     ActivityItem,
 )
 from app.core.config import settings
+from app.core.http import HTTPClientPool
+from app.core.metrics import register_metrics_source
+from app.core.singleflight import SingleFlight
+from app.services.day_planner import ParallelDayGenerator
+from app.services.llm_json import extract_json_object
+from app.services.llm_normalize import normalize_day, normalize_itinerary
+from app.services.llm_router import LLMRouter
+from app.services.llm_scheduler import (
+    LLMScheduler,
+    QueueTimeoutError,
+    inherit_priority,
+    share_priority,
+)
+from app.services.generation_cache import (
+    GenerationCache,
+    create_generation_store,
+    rebase_itinerary,
+    request_fingerprint,
+)
+from app.services.llm_stream import DayStreamParser
+
+QWEN_ENDPOINT = (
+    "https://dashscope.aliyuncs.com/api/v1/services/aigc/text-generation/generation"
+)
+DOUBAO_ENDPOINT = "https://ark.cn-beijing.volces.com/api/v3/chat/completions"
+SYSTEM_PROMPT = "你是一个旅行规划师，帮助用户制定个性化的旅行行程。"
 
 
 class LLMService:
@@ -19,15 +44,82 @@ class LLMService:
 
     def __init__(self):
         self.provider = settings.LLM_PROVIDER
+        # Shared per-provider clients so generations reuse warm connections.
+        self.http = HTTPClientPool(
+            timeout=settings.LLM_TIMEOUT,
+            max_connections=settings.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY,
+            http2=settings.LLM_HTTP2,
+        )
+        self.generation_cache = GenerationCache(
+            create_generation_store(
+                settings.GENERATION_CACHE_BACKEND,
+                settings.GENERATION_CACHE_DIR,
+                settings.GENERATION_CACHE_MAX_ENTRIES,
+                settings.GENERATION_CACHE_TTL_SECONDS,
+            ),
+            budget_step=settings.GENERATION_CACHE_BUDGET_STEP,
+        )
+        # Concurrent generations with the same fingerprint share one call.
+        # Joining callers pass their LLM priority on to the shared call.
+        self.in_flight = SingleFlight(start=share_priority, join=inherit_priority)
+        self.router = LLMRouter(
+            hedge=settings.LLM_HEDGE_ENABLED,
+            hedge_min_delay=settings.LLM_HEDGE_MIN_DELAY,
+            window=settings.LLM_HEALTH_WINDOW,
+            max_age=settings.LLM_HEALTH_MAX_AGE_SECONDS,
+        )
+        # Provider calls queue for per-key QPS/TPM capacity and retry on 429.
+        self.scheduler = LLMScheduler(
+            {
+                "qwen": (settings.LLM_QWEN_QPS, settings.LLM_QWEN_TPM),
+                "doubao": (settings.LLM_DOUBAO_QPS, settings.LLM_DOUBAO_TPM),
+            },
+            queue_timeout=settings.LLM_QUEUE_TIMEOUT,
+            max_retries=settings.LLM_MAX_RETRIES,
+            retry_base_delay=settings.LLM_RETRY_BASE_DELAY,
+        )
+        self.day_generator = ParallelDayGenerator(
+            self._complete,
+            normalize_day,
+            self._generate_fallback_day,
+            concurrency=settings.LLM_DAY_CONCURRENCY,
+            max_attempts=settings.LLM_DAY_MAX_ATTEMPTS,
+        )
+
+    def start(self) -> None:
+        """Open the HTTP clients for the providers that have API keys."""
+        self.http.start(*self._available_providers())
+
+    def _available_providers(self) -> List[str]:
+        """Providers with an API key, the configured ``LLM_PROVIDER`` first."""
+        keys = {"qwen": settings.QWEN_API_KEY, "doubao": settings.DOUBAO_API_KEY}
+        order = sorted(keys, key=lambda name: name != self.provider)
+        return [name for name in order if keys[name]]
+
+    async def aclose(self) -> None:
+        """Close the shared provider HTTP clients."""
+        await self.http.aclose()
 
     async def generate_itinerary(
-        self, request: ItineraryRequest, prompt: Optional[str] = None
+        self,
+        request: ItineraryRequest,
+        prompt: Optional[str] = None,
+        use_cache: bool = True,
     ) -> ItineraryResponse:
         """
         Generate personalized travel itinerary using LLM.
 
+        Equivalent earlier requests are answered from the generation cache,
+        moved onto this request's dates, and equivalent concurrent requests
+        share a single provider call. Template fallbacks are never cached, nor
+        are responses that were missing days and had them filled in.
+
         Args:
             request: Itinerary generation request with user preferences
+            prompt: Optional prompt overriding the generated one
+            use_cache: False skips the cache lookup (the result is still stored)
 
         Returns:
             Generated itinerary with daily plans
@@ -35,18 +127,154 @@ class LLMService:
         # Calculate number of days
         num_days = (request.end_date - request.start_date).days + 1
 
+        cache_key = self._cache_key(request, prompt)
+        if use_cache:
+            cached = await self.generation_cache.get(cache_key, request)
+            if cached:
+                return cached
+
+        # Long trips without a custom prompt are planned day by day.
+        per_day = prompt is None and self._plan_by_day(num_days)
+
         # Create prompt for LLM if not provided
         prompt = prompt or self.create_itinerary_prompt(request)
 
-        # Call appropriate LLM provider
-        if self.provider == "qwen":
-            itinerary_data = await self._generate_with_qwen(prompt, request)
-        elif self.provider == "doubao":
-            itinerary_data = await self._generate_with_doubao(prompt, request)
+        shared = await self.in_flight.do(
+            cache_key,
+            lambda: self._generate_shared(prompt, request, cache_key, per_day),
+        )
+        if shared is None:
+            return self._generate_fallback_itinerary(request, num_days)
+
+        # Each caller gets its own copy on its own dates.
+        return rebase_itinerary(shared, request)
+
+    async def _generate_shared(
+        self,
+        prompt: str,
+        request: ItineraryRequest,
+        cache_key: str,
+        per_day: bool = False,
+    ) -> Optional[Dict[str, Any]]:
+        """Call the provider once for every caller waiting on ``cache_key``."""
+        if per_day:
+            itinerary_data = await self.day_generator.generate(request)
         else:
-            itinerary_data = self._generate_fallback_itinerary(request, num_days)
+            itinerary_data = await self.router.run(
+                self._available_providers(),
+                lambda provider: self._generate_with(provider, prompt, request),
+            )
+
+        if itinerary_data is None:
+            return None
 
-        return itinerary_data
+        # Template days are not worth serving to later requests.
+        if not self._fill_missing_days(itinerary_data, request):
+            await self.generation_cache.set(cache_key, itinerary_data)
+        return itinerary_data.model_dump(
+            mode="json", exclude={"id", "created_at", "updated_at"}
+        )
+
+    def _plan_by_day(self, num_days: int) -> bool:
+        threshold = settings.LLM_PARALLEL_DAYS_THRESHOLD
+        return (
+            threshold > 0
+            and num_days >= threshold
+            and bool(self._available_providers())
+        )
+
+    def _cache_key(self, request: ItineraryRequest, prompt: Optional[str]) -> str:
+        return request_fingerprint(
+            request, budget_step=self.generation_cache.budget_step, prompt=prompt
+        )
+
+    async def stream_itinerary(
+        self,
+        request: ItineraryRequest,
+        prompt: Optional[str] = None,
+        use_cache: bool = True,
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Generate an itinerary, yielding days as soon as they are complete.
+
+        Yields ``("day", DayItinerary)`` for every day that validates while
+        the provider is still writing, then ``("itinerary", ItineraryResponse)``
+        parsed from the whole response. If the stream fails before any day
+        was yielded, the itinerary is generated without streaming (failing
+        over to the other provider). If it breaks later or the response is
+        unusable, the final itinerary keeps the days already yielded and
+        fills the rest from the template. Providers without an incremental
+        mode produce the full itinerary first and then replay its days.
+
+        Args:
+            request: Itinerary generation request with user preferences
+            prompt: Optional prompt overriding the generated one
+            use_cache: False skips the generation cache lookup
+        """
+        cache_key = self._cache_key(request, prompt)
+        cached = (
+            await self.generation_cache.get(cache_key, request) if use_cache else None
+        )
+
+        if cached or self.provider != "qwen" or not settings.QWEN_API_KEY:
+            itinerary = cached or await self.generate_itinerary(
+                request, prompt=prompt, use_cache=False
+            )
+            for day in itinerary.daily_itinerary:
+                yield "day", day
+            yield "itinerary", itinerary
+            return
+
+        parser = DayStreamParser()
+        streamed: List[DayItinerary] = []
+        failed = False
+        try:
+            async for chunk in self._stream_qwen(
+                prompt or self.create_itinerary_prompt(request)
+            ):
+                for index, day in parser.feed(chunk):
+                    try:
+                        streamed.append(normalize_day(day, index, request))
+                    except ValidationError as exc:
+                        print(f"Skipping invalid streamed day: {exc}")
+                        continue
+                    yield "day", streamed[-1]
+        except (httpx.HTTPError, QueueTimeoutError) as exc:
+            print(f"Error streaming from Qwen API: {exc}")
+            failed = True
+
+        if failed and not streamed:
+            # Nothing was sent yet: generate without streaming, which fails
+            # over to the other provider and the template like any request.
+            itinerary = await self.generate_itinerary(
+                request, prompt=prompt, use_cache=False
+            )
+            for day in itinerary.daily_itinerary:
+                yield "day", day
+            yield "itinerary", itinerary
+            return
+
+        # A broken stream is not salvaged from its text: that could include a
+        # half-written day the client never received.
+        itinerary = (
+            None if failed else self._parse_llm_itinerary_response(parser.text, request)
+        )
+        if itinerary:
+            if not self._fill_missing_days(itinerary, request):
+                await self.generation_cache.set(cache_key, itinerary)
+        else:
+            # Keep the days already sent and plan the rest from the template.
+            itinerary = ItineraryResponse(
+                destination=request.destination,
+                start_date=request.start_date,
+                end_date=request.end_date,
+                budget=request.budget,
+                daily_itinerary=streamed,
+                total_estimated_cost=sum(day.total_estimated_cost for day in streamed),
+                recommendations=self._generate_recommendations(request),
+            )
+            self._fill_missing_days(itinerary, request)
+        yield "itinerary", itinerary
 
     def create_itinerary_prompt(
         self, request: ItineraryRequest, user_description: Optional[str] = None
@@ -94,27 +322,157 @@ class LLMService:
 
     async def _generate_with_qwen(
         self, prompt: str, request: ItineraryRequest
-    ) -> ItineraryResponse:
-        """Generate itinerary using Qwen (Alibaba Cloud) API."""
-        num_days = (request.end_date - request.start_date).days + 1
-
+    ) -> Optional[ItineraryResponse]:
+        """Generate itinerary using Qwen (Alibaba Cloud) API; None on failure."""
         if not settings.QWEN_API_KEY:
             print("Qwen API key not configured, using fallback itinerary.")
-            return self._generate_fallback_itinerary(request, num_days)
+            return None
+
+        raw_content = await self._complete_qwen(prompt)
+        itinerary = self._parse_llm_itinerary_response(raw_content, request)
+        if itinerary:
+            return itinerary
+
+        print("Falling back to template itinerary due to invalid LLM response.")
+        return None
+
+    async def _generate_with(
+        self, provider: str, prompt: str, request: ItineraryRequest
+    ) -> Optional[ItineraryResponse]:
+        if provider == "qwen":
+            return await self._generate_with_qwen(prompt, request)
+        if provider == "doubao":
+            return await self._generate_with_doubao(prompt, request)
+        return None
+
+    async def _complete(self, prompt: str) -> Optional[str]:
+        """Raw completion text from the healthiest provider, or None."""
+        return await self.router.run(
+            self._available_providers(),
+            lambda provider: self._complete_with(provider, prompt),
+        )
+
+    async def _complete_with(self, provider: str, prompt: str) -> Optional[str]:
+        if provider == "qwen":
+            return await self._complete_qwen(prompt)
+        if provider == "doubao":
+            return await self._complete_doubao(prompt)
+        return None
+
+    async def _complete_qwen(self, prompt: str) -> Optional[str]:
+        try:
+            result = await self.scheduler.call(
+                "qwen",
+                settings.QWEN_API_KEY,
+                lambda: self._post(
+                    "qwen",
+                    QWEN_ENDPOINT,
+                    self._qwen_headers(),
+                    self._qwen_payload(prompt),
+                ),
+                tokens=self._estimate_tokens(prompt),
+                usage=self._usage_tokens,
+            )
+            return self._extract_qwen_content(result)
+        except QueueTimeoutError as exc:
+            print(f"Qwen API rate limit not available in time: {exc}")
+        except httpx.HTTPError as exc:
+            print(f"Error calling Qwen API: {exc}")
+        except Exception as exc:  # pragma: no cover - defensive guard
+            print(f"Unexpected error calling Qwen API: {exc}")
+        return None
 
-        endpoint = "https://dashscope.aliyuncs.com/api/v1/services/aigc/text-generation/generation"
+    async def _stream_qwen(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Yield text deltas from Qwen's incremental (SSE) output mode.
+
+        Opening the stream goes through :meth:`LLMScheduler.call`, so a 429 or
+        5xx before the first byte is retried like any other call; the usage
+        reported by the last event settles the estimated token charge.
+        """
         headers = {
+            **self._qwen_headers(),
+            "Accept": "text/event-stream",
+            "X-DashScope-SSE": "enable",
+        }
+        payload = self._qwen_payload(prompt)
+        payload["parameters"]["incremental_output"] = True
+        client = self.http.get("qwen")
+
+        async def open_stream() -> httpx.Response:
+            response = await client.send(
+                client.build_request(
+                    "POST", QWEN_ENDPOINT, headers=headers, json=payload
+                ),
+                stream=True,
+            )
+            if response.is_error:
+                await response.aclose()
+                response.raise_for_status()
+            return response
+
+        tokens = self._estimate_tokens(prompt)
+        response = await self.scheduler.call(
+            "qwen", settings.QWEN_API_KEY, open_stream, tokens=tokens
+        )
+        used: Optional[int] = None
+        try:
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                try:
+                    event = json.loads(line[len("data:") :])
+                except json.JSONDecodeError:
+                    continue
+                # Usage is cumulative; the final event carries the totals.
+                used = self._usage_tokens(event) or used
+                content = self._extract_qwen_content(event)
+                if content:
+                    yield content
+        finally:
+            await response.aclose()
+            self.scheduler.limiter("qwen", settings.QWEN_API_KEY).settle(tokens, used)
+
+    async def _post(
+        self, provider: str, url: str, headers: Dict[str, str], payload: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        client = self.http.get(provider)
+        response = await client.post(url, headers=headers, json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    def _estimate_tokens(self, prompt: str) -> int:
+        """Upper estimate charged against TPM before the call: ~1 token/char."""
+        return (
+            len(SYSTEM_PROMPT) + len(prompt) + settings.LLM_COMPLETION_TOKENS_ESTIMATE
+        )
+
+    @staticmethod
+    def _usage_tokens(result: Dict[str, Any]) -> Optional[int]:
+        """Tokens a Qwen or Doubao response reports having used."""
+        usage = result.get("usage") or {}
+        if usage.get("total_tokens") is not None:
+            return usage["total_tokens"]
+        counts = [
+            usage.get("input_tokens", usage.get("prompt_tokens")),
+            usage.get("output_tokens", usage.get("completion_tokens")),
+        ]
+        if all(count is None for count in counts):
+            return None
+        return sum(count or 0 for count in counts)
+
+    def _qwen_headers(self) -> Dict[str, str]:
+        return {
             "Authorization": f"Bearer {settings.QWEN_API_KEY}",
             "Content-Type": "application/json",
         }
-        payload = {
+
+    def _qwen_payload(self, prompt: str) -> Dict[str, Any]:
+        return {
             "model": settings.QWEN_MODEL or "qwen-turbo",
             "input": {
                 "messages": [
-                    {
-                        "role": "system",
-                        "content": "你是一个旅行规划师，帮助用户制定个性化的旅行行程。",
-                    },
+                    {"role": "system", "content": SYSTEM_PROMPT},
                     {"role": "user", "content": prompt},
                 ]
             },
@@ -123,83 +481,71 @@ class LLMService:
             },
         }
 
-        raw_content: Optional[str] = None
-        try:
-            async with httpx.AsyncClient(timeout=40.0) as client:
-                response = await client.post(endpoint, headers=headers, json=payload)
-                response.raise_for_status()
-                result = response.json()
-
-                raw_content = (
-                    result.get("output", {}).get("text")
-                    or result.get("output", {})
-                    .get("choices", [{}])[0]
-                    .get("message", {})
-                    .get("content")
-                    or result.get("choices", [{}])[0].get("message", {}).get("content")
-                )
-        except httpx.HTTPError as exc:
-            print(f"Error calling Qwen API: {exc}")
-        except Exception as exc:  # pragma: no cover - defensive guard
-            print(f"Unexpected error calling Qwen API: {exc}")
+    def _extract_qwen_content(self, result: Dict[str, Any]) -> Optional[str]:
+        """Pull the generated text out of a Qwen response or stream event."""
+        return (
+            result.get("output", {}).get("text")
+            or result.get("output", {})
+            .get("choices", [{}])[0]
+            .get("message", {})
+            .get("content")
+            or result.get("choices", [{}])[0].get("message", {}).get("content")
+        )
+
+    async def _generate_with_doubao(
+        self, prompt: str, request: ItineraryRequest
+    ) -> Optional[ItineraryResponse]:
+        """Generate itinerary using Doubao (ByteDance) API; None on failure."""
+        if not settings.DOUBAO_API_KEY:
+            print("Doubao API key not configured, using fallback itinerary.")
+            return None
 
+        raw_content = await self._complete_doubao(prompt)
         itinerary = self._parse_llm_itinerary_response(raw_content, request)
         if itinerary:
             return itinerary
 
         print("Falling back to template itinerary due to invalid LLM response.")
-        return self._generate_fallback_itinerary(request, num_days)
-
-    async def _generate_with_doubao(
-        self, prompt: str, request: ItineraryRequest
-    ) -> ItineraryResponse:
-        """Generate itinerary using Doubao (ByteDance) API."""
-        # In a real implementation, this would call the Doubao API
-        # For now, return a structured fallback response
-        import httpx
+        return None
 
-        # Doubao API endpoint (example - adjust based on actual API)
+    async def _complete_doubao(self, prompt: str) -> Optional[str]:
+        """Call Doubao through Volcano Engine Ark's chat completions API."""
+        headers = {
+            "Authorization": f"Bearer {settings.DOUBAO_API_KEY}",
+            "Content-Type": "application/json",
+        }
+        payload = {
+            "model": settings.DOUBAO_MODEL,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+        }
         try:
-            async with httpx.AsyncClient() as client:
-                # Placeholder for Doubao API call
-                # response = await client.post(
-                #     "https://ark.cn-beijing.volces.com/api/v3/chat/completions",
-                #     headers={"Authorization": f"Bearer {settings.DOUBAO_API_KEY}"},
-                #     json={"model": settings.DOUBAO_MODEL, "messages": [{"role": "user", "content": prompt}]}
-                # )
-                pass
-        except Exception as e:
-            print(f"Error calling Doubao API: {e}")
-
-        # Fallback to structured generation
-        num_days = (request.end_date - request.start_date).days + 1
-        return self._generate_fallback_itinerary(request, num_days)
+            result = await self.scheduler.call(
+                "doubao",
+                settings.DOUBAO_API_KEY,
+                lambda: self._post("doubao", DOUBAO_ENDPOINT, headers, payload),
+                tokens=self._estimate_tokens(prompt),
+                usage=self._usage_tokens,
+            )
+            choices = result.get("choices") or [{}]
+            return choices[0].get("message", {}).get("content")
+        except QueueTimeoutError as exc:
+            print(f"Doubao API rate limit not available in time: {exc}")
+        except httpx.HTTPError as exc:
+            print(f"Error calling Doubao API: {exc}")
+        except Exception as exc:  # pragma: no cover - defensive guard
+            print(f"Unexpected error calling Doubao API: {exc}")
+        return None
 
     def _generate_fallback_itinerary(
         self, request: ItineraryRequest, num_days: int
     ) -> ItineraryResponse:
         """Generate a basic structured itinerary as fallback."""
-        daily_itineraries = []
-        daily_budget = request.budget / num_days
-
-        for day in range(num_days):
-            current_date = request.start_date + timedelta(days=day)
-
-            # Create sample activities based on preferences
-            activities = self._generate_day_activities(
-                day + 1, request.destination, request.preferences, daily_budget
-            )
-
-            day_cost = sum(act.estimated_cost or 0 for act in activities)
-
-            daily_itineraries.append(
-                DayItinerary(
-                    day=day + 1,
-                    date=current_date,
-                    activities=activities,
-                    total_estimated_cost=day_cost,
-                )
-            )
+        daily_itineraries = [
+            self._generate_fallback_day(request, day) for day in range(num_days)
+        ]
 
         total_cost = sum(d.total_estimated_cost for d in daily_itineraries)
 
@@ -213,6 +559,59 @@ class LLMService:
             recommendations=self._generate_recommendations(request),
         )
 
+    def _generate_fallback_day(
+        self, request: ItineraryRequest, index: int
+    ) -> DayItinerary:
+        """Template plan for a single day of the trip."""
+        num_days = (request.end_date - request.start_date).days + 1
+        # Create sample activities based on preferences
+        activities = self._generate_day_activities(
+            index + 1,
+            request.destination,
+            request.preferences,
+            request.budget / num_days,
+        )
+        return DayItinerary(
+            day=index + 1,
+            date=request.start_date + timedelta(days=index),
+            activities=activities,
+            total_estimated_cost=sum(act.estimated_cost or 0 for act in activities),
+        )
+
+    def _fill_missing_days(
+        self, itinerary: ItineraryResponse, request: ItineraryRequest
+    ) -> int:
+        """
+        Plan the days a response left out (e.g. it was cut off) from the template.
+
+        The itinerary is updated in place to cover every day of the request.
+        Returns how many days were filled.
+        """
+        num_days = (request.end_date - request.start_date).days + 1
+        # A day cut off before its first activity counts as missing.
+        planned = [day for day in itinerary.daily_itinerary if day.activities]
+        present = {day.day for day in planned}
+        filled = [
+            self._generate_fallback_day(request, index)
+            for index in range(num_days)
+            if index + 1 not in present
+        ]
+        if not filled:
+            return 0
+        dropped = [day for day in itinerary.daily_itinerary if not day.activities]
+
+        print(
+            f"LLM itinerary has {len(present)} of {num_days} days; "
+            "filling the rest from the template."
+        )
+        itinerary.daily_itinerary = sorted(planned + filled, key=lambda day: day.day)
+        itinerary.start_date = request.start_date
+        itinerary.end_date = request.end_date
+        itinerary.total_estimated_cost += sum(
+            day.total_estimated_cost for day in filled
+        ) - sum(day.total_estimated_cost for day in dropped)
+        return len(filled)
+
     def _generate_day_activities(
         self, day: int, destination: str, preferences: List[str], daily_budget: float
     ) -> List[ActivityItem]:
@@ -301,189 +700,21 @@ class LLMService:
         if not isinstance(raw_content, str):
             return None
 
-        try:
-            data = json.loads(raw_content)
-        except json.JSONDecodeError:
-            match = re.search(r"\{.*\}", raw_content, re.S)
-            if not match:
-                return None
-            try:
-                data = json.loads(match.group())
-            except json.JSONDecodeError:
-                return None
-
-        if not isinstance(data, dict):
-            return None
-
-        destination_value = data.get("destination")
-        if isinstance(destination_value, str):
-            destination_value = destination_value.strip()
-        elif isinstance(destination_value, list):
-            joined = " ".join(str(item).strip() for item in destination_value if item)
-            destination_value = joined.strip() if joined else None
-        elif destination_value is not None:
-            destination_value = str(destination_value).strip()
-
-        data["destination"] = destination_value or request.destination
-        data.setdefault("start_date", request.start_date.isoformat())
-        data.setdefault("end_date", request.end_date.isoformat())
-        data["budget"] = (
-            self._coerce_currency_value(data.get("budget", request.budget))
-            or request.budget
-        )
-
-        daily = data.get("daily_itinerary")
-        if not isinstance(daily, list):
-            return None
-
-        normalized_days = []
-        for index, day in enumerate(daily):
-            if not isinstance(day, dict):
-                continue
-            normalized = dict(day)
-            normalized.setdefault("day", day.get("day") or index + 1)
-            if not normalized.get("date"):
-                normalized["date"] = (
-                    request.start_date + timedelta(days=index)
-                ).isoformat()
-
-            activities = normalized.get("activities") or []
-            if isinstance(activities, dict):
-                activities = [activities]
-            normalized_activities = []
-            for activity in activities:
-                if not isinstance(activity, dict):
-                    continue
-
-                normalized_activity = dict(activity)
-
-                for text_field in ("time", "activity", "location", "notes"):
-                    value = normalized_activity.get(text_field)
-                    coerced = self._coerce_text(value)
-                    if coerced is not None:
-                        normalized_activity[text_field] = coerced
-                    elif text_field in normalized_activity:
-                        normalized_activity[text_field] = value
-
-                estimated = normalized_activity.get("estimated_cost")
-                normalized_activity["estimated_cost"] = self._coerce_currency_value(
-                    estimated
-                )
-
-                coerced_address = self._coerce_text(
-                    normalized_activity.get("location_address")
-                )
-                normalized_activity["location_address"] = coerced_address
-
-                sightseeing_value = self._coerce_bool(
-                    normalized_activity.get("is_sightseeing")
-                )
-                normalized_activity["is_sightseeing"] = sightseeing_value
-
-                normalized_activities.append(normalized_activity)
-            normalized["activities"] = normalized_activities
-
-            if (
-                "total_estimated_cost" not in normalized
-                or normalized["total_estimated_cost"] is None
-            ):
-                normalized["total_estimated_cost"] = sum(
-                    (activity.get("estimated_cost") or 0)
-                    for activity in normalized_activities
-                )
-            else:
-                normalized["total_estimated_cost"] = (
-                    self._coerce_currency_value(normalized.get("total_estimated_cost"))
-                    or 0
-                )
-
-            normalized_days.append(normalized)
-
-        if not normalized_days:
+        data = extract_json_object(raw_content)
+        if data is None:
             return None
 
-        data["daily_itinerary"] = normalized_days
-
-        if not data.get("total_estimated_cost"):
-            data["total_estimated_cost"] = sum(
-                (self._coerce_currency_value(day.get("total_estimated_cost")) or 0)
-                for day in normalized_days
-            )
-        else:
-            data["total_estimated_cost"] = (
-                self._coerce_currency_value(data.get("total_estimated_cost")) or 0
-            )
-
         try:
-            return ItineraryResponse(**data)
+            return normalize_itinerary(data, request)
         except ValidationError as exc:
             print(f"LLM response validation error: {exc}")
             return None
 
-    def _coerce_currency_value(self, value) -> Optional[float]:
-        """Convert various currency formats into float."""
-
-        if value is None:
-            return None
-
-        if isinstance(value, (int, float)):
-            return float(value)
-
-        if isinstance(value, str):
-            cleaned = value.strip()
-            cleaned = cleaned.replace("￥", "").replace("¥", "")
-            cleaned = cleaned.replace(",", "")
-            match = re.search(r"(-?\d+(?:\.\d+)?)", cleaned)
-            if match:
-                try:
-                    return float(match.group(1))
-                except ValueError:
-                    return None
-
-        return None
-
-    def _coerce_text(self, value) -> Optional[str]:
-        """Normalize textual fields from LLM output."""
-
-        if value is None:
-            return None
-
-        if isinstance(value, str):
-            stripped = value.strip()
-            return stripped or None
-
-        if isinstance(value, (int, float)):
-            return str(value)
-
-        if isinstance(value, list):
-            joined = " ".join(str(item).strip() for item in value if item)
-            return joined.strip() or None
-
-        if isinstance(value, dict):
-            return json.dumps(value, ensure_ascii=False)
-
-        return str(value).strip() or None
-
-    def _coerce_bool(self, value) -> Optional[bool]:
-        """Attempt to normalize boolean-like values."""
-
-        if value is None:
-            return None
-
-        if isinstance(value, bool):
-            return value
-
-        if isinstance(value, (int, float)):
-            return bool(value)
-
-        if isinstance(value, str):
-            lowered = value.strip().lower()
-            if lowered in {"true", "yes", "y", "1", "是", "ok"}:
-                return True
-            if lowered in {"false", "no", "n", "0", "否"}:
-                return False
-
-        return None
-
 
 llm_service = LLMService()
+register_metrics_source("llm_http", llm_service.http.stats)
+register_metrics_source("generation_cache", llm_service.generation_cache.stats)
+register_metrics_source("llm_single_flight", llm_service.in_flight.stats)
+register_metrics_source("llm_parallel_days", llm_service.day_generator.stats)
+register_metrics_source("llm_router", llm_service.router.stats)
+register_metrics_source("llm_scheduler", llm_service.scheduler.stats)
@@ -0,0 +1,100 @@
+"""Incremental extraction of itinerary days from streamed LLM output."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.llm_json import extract_json_object
+
+
+class DayStreamParser:
+    """
+    Pull each element of the ``daily_itinerary`` array out of a JSON document
+    that arrives in arbitrary chunks.
+
+    The parser scans every character once, tracking string/escape state and
+    nesting depth, and hands back a day object as soon as its closing brace
+    arrives, long before the rest of the document (later days,
+    recommendations) has been generated. The full text is kept in
+    :attr:`text` for a final whole-document parse.
+    """
+
+    def __init__(self, key: str = "daily_itinerary") -> None:
+        self.key = key
+        self.text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._awaiting_array = False
+        self._array_depth: Optional[int] = None
+        self._item_start: Optional[int] = None
+        self._items_seen = 0
+
+    def feed(self, chunk: str) -> List[Tuple[int, Dict[str, Any]]]:
+        """Consume ``chunk``; return ``(index, day)`` for each day it completed."""
+        self.text += chunk
+        completed: List[Tuple[int, Dict[str, Any]]] = []
+        text = self.text
+
+        for index in range(self._pos, len(text)):
+            char = text[index]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    self._last_string = text[self._string_start + 1 : index]
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = index
+            elif char == ":":
+                self._awaiting_array = (
+                    self._depth == 1
+                    and self._array_depth is None
+                    and self._last_string == self.key
+                )
+                self._last_string = None
+            elif char in "[{":
+                self._depth += 1
+                if char == "[" and self._awaiting_array:
+                    self._array_depth = self._depth
+                elif (
+                    char == "{"
+                    and self._array_depth is not None
+                    and self._depth == self._array_depth + 1
+                ):
+                    self._item_start = index
+                self._awaiting_array = False
+                self._last_string = None
+            elif char in "]}":
+                if (
+                    char == "}"
+                    and self._item_start is not None
+                    and self._depth == self._array_depth + 1
+                ):
+                    day = self._load(text[self._item_start : index + 1])
+                    if day is not None:
+                        completed.append((self._items_seen, day))
+                    self._items_seen += 1
+                    self._item_start = None
+                elif char == "]" and self._depth == self._array_depth:
+                    self._array_depth = None
+                self._depth -= 1
+                self._last_string = None
+            elif not char.isspace() and char != ",":
+                self._awaiting_array = False
+                self._last_string = None
+
+        self._pos = len(text)
+        return completed
+
+    @staticmethod
+    def _load(fragment: str) -> Optional[Dict[str, Any]]:
+        return extract_json_object(fragment)
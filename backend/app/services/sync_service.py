@@ -0,0 +1,179 @@
+"""Delta sync for multi-device clients, driven by the ``sync_changes`` log."""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.database import get_repository
+from app.repositories.base import Repository
+from app.schemas.expense import ExpenseResponse
+from app.schemas.itinerary import ItineraryResponse
+from app.schemas.sync import SyncChanges, SyncEntity, SyncTombstone
+
+ENTITY_TABLES = {
+    SyncEntity.EXPENSE: "expenses",
+    SyncEntity.ITINERARY: "itineraries",
+}
+
+
+def encode_sync_token(seq: int) -> str:
+    """Encode a change-log position as an opaque token."""
+    payload = json.dumps({"seq": seq}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_sync_token(token: str) -> int:
+    """Decode a token produced by :func:`encode_sync_token`; raise ValueError if invalid."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        seq = json.loads(base64.urlsafe_b64decode(padded))["seq"]
+    except (binascii.Error, ValueError, TypeError, KeyError) as exc:
+        raise ValueError("Invalid sync token") from exc
+    if not isinstance(seq, int) or seq < 0:
+        raise ValueError("Invalid sync token")
+    return seq
+
+
+class SyncService:
+    """
+    Serve the expenses and itineraries a device has not seen yet.
+
+    Every insert, update and delete on the synced tables appends a row to the
+    ``sync_changes`` log (database triggers, see README.md). A sync token is a
+    position in that log, so a client only downloads records touched after
+    its last sync, plus tombstones for deleted ones.
+
+    ``seq`` is assigned when a change is written, not when it commits, so a
+    slow transaction can make a lower ``seq`` visible after a higher one has
+    been served. The token therefore only moves past changes older than
+    ``SYNC_VISIBILITY_MARGIN_SECONDS``; newer ones are returned but sent
+    again on the next sync, which clients apply idempotently.
+    """
+
+    def __init__(self):
+        self.change_table = "sync_changes"
+
+    @property
+    def db(self) -> Repository:
+        """Repository selected by the application settings."""
+        return get_repository()
+
+    async def get_changes(
+        self, user_id: str, since: Optional[str] = None, limit: int = 500
+    ) -> SyncChanges:
+        """
+        Collect records changed after ``since``.
+
+        Args:
+            user_id: User ID
+            since: Token from the previous sync; omit for a full initial sync
+            limit: Maximum change-log entries consumed by this call
+
+        Returns:
+            Current rows for created/updated records, tombstones for deleted
+            ones and the token to resume from
+
+        Raises:
+            ValueError: If the token is malformed
+        """
+        position = decode_sync_token(since) if since else 0
+
+        result = await (
+            self.db.table(self.change_table)
+            .select("seq, entity, entity_id, op, changed_at")
+            .eq("user_id", user_id)
+            .gt("seq", position)
+            .order("seq")
+            .limit(limit + 1)
+            .execute()
+        )
+        entries = result.data[:limit]
+        has_more = len(result.data) > limit
+        if not entries:
+            return SyncChanges(next_token=encode_sync_token(position))
+
+        # Only the newest entry per record matters for this page.
+        latest: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for entry in entries:
+            latest[(entry["entity"], str(entry["entity_id"]))] = entry
+
+        settled = position
+        cutoff = datetime.now(timezone.utc) - timedelta(
+            seconds=settings.SYNC_VISIBILITY_MARGIN_SECONDS
+        )
+        for entry in entries:
+            if not self._settled(entry, cutoff):
+                break
+            settled = int(entry["seq"])
+
+        changes = SyncChanges(
+            next_token=encode_sync_token(settled),
+            # A page of unsettled changes would be served again immediately.
+            has_more=has_more and settled > position,
+        )
+        upserted: Dict[SyncEntity, List[str]] = {entity: [] for entity in SyncEntity}
+        for (entity, record_id), entry in latest.items():
+            if entity not in ENTITY_TABLES:
+                continue
+            if entry["op"] == "delete":
+                changes.deleted.append(
+                    SyncTombstone(
+                        entity=entity, id=record_id, deleted_at=entry.get("changed_at")
+                    )
+                )
+            else:
+                upserted[SyncEntity(entity)].append(record_id)
+
+        changes.expenses = [
+            ExpenseResponse(**row)
+            for row in await self._fetch(user_id, SyncEntity.EXPENSE, upserted)
+        ]
+        changes.itineraries = [
+            ItineraryResponse(**row)
+            for row in await self._fetch(user_id, SyncEntity.ITINERARY, upserted)
+        ]
+        return changes
+
+    @staticmethod
+    def _settled(entry: Dict[str, Any], cutoff: datetime) -> bool:
+        """Whether a change is old enough that no earlier seq can still appear."""
+        changed_at = entry.get("changed_at")
+        if not changed_at:
+            return True
+        if isinstance(changed_at, str):
+            changed_at = datetime.fromisoformat(changed_at)
+        if changed_at.tzinfo is None:
+            # The change log is stamped in UTC (SQLite 'now', Supabase NOW()).
+            changed_at = changed_at.replace(tzinfo=timezone.utc)
+        return changed_at <= cutoff
+
+    async def _fetch(
+        self,
+        user_id: str,
+        entity: SyncEntity,
+        upserted: Dict[SyncEntity, List[str]],
+    ) -> List[Dict[str, Any]]:
+        """Load the current rows of changed records.
+
+        A record missing here was deleted by a change past this page; its
+        tombstone is returned by the next sync.
+        """
+        ids = upserted[entity]
+        if not ids:
+            return []
+        result = await (
+            self.db.table(ENTITY_TABLES[entity])
+            .select("*")
+            .eq("user_id", user_id)
+            .in_("id", ids)
+            .execute()
+        )
+        return result.data
+
+
+sync_service = SyncService()
@@ -1,15 +1,32 @@
-from typing import Optional, List
+import itertools
+from typing import Any, AsyncIterator, Optional, List, Tuple, Union
 from datetime import datetime, date, timedelta
 from app.schemas.itinerary import (
     ItineraryRequest,
     ItineraryResponse,
     ItineraryTextRequest,
     ItineraryFromTextResponse,
+    ItineraryPage,
+    ItinerarySummary,
+    ItinerarySummaryPage,
+    ItineraryView,
 )
 from app.schemas.expense import ExpenseCreate, ExpenseResponse, ExpenseSummary
 from app.services.llm_service import llm_service
 from app.services.expense_service import expense_service
-from app.core.database import get_supabase_client
+from app.core.concurrency import run_concurrently
+from app.core.database import get_repository
+from app.core.cache import MISSING, TTLCache
+from app.core.config import settings
+from app.core.etag import Representation
+from app.core.metrics import register_metrics_source
+from app.core.pagination import decode_cursor, format_timestamp, next_cursor_for
+from app.repositories.base import Repository
+
+# Columns needed to render itinerary lists; leaves out the daily_itinerary blob.
+ITINERARY_SUMMARY_COLUMNS = (
+    "id, destination, start_date, end_date, budget, total_estimated_cost, created_at"
+)
 
 
 class TravelService:
@@ -23,11 +40,38 @@ class TravelService:
     """
 
     def __init__(self):
-        self.supabase = get_supabase_client()
         self.itinerary_table = "itineraries"
+        # Validated itineraries and their serialized form (with ETag), keyed by
+        # (user_id, itinerary_id). Cached objects are shared between requests
+        # and must be treated as read-only.
+        self.itinerary_cache = TTLCache(
+            maxsize=settings.ITINERARY_CACHE_MAX_ENTRIES,
+            ttl=settings.ITINERARY_CACHE_TTL_SECONDS,
+            max_bytes=settings.ITINERARY_CACHE_MAX_BYTES,
+            sizeof=lambda entry: len(entry[1].body),
+        )
+        # Serialized list pages keyed by (user_id, list generation, limit,
+        # cursor, view). Any itinerary write moves the user to a new
+        # generation, which orphans their cached pages.
+        self.itinerary_list_cache = TTLCache(
+            maxsize=settings.ITINERARY_CACHE_MAX_ENTRIES,
+            ttl=settings.ITINERARY_CACHE_TTL_SECONDS,
+            max_bytes=settings.ITINERARY_CACHE_MAX_BYTES,
+            sizeof=lambda representation: len(representation.body),
+        )
+        self._list_generations = TTLCache(
+            maxsize=settings.ITINERARY_CACHE_MAX_ENTRIES,
+            ttl=settings.ITINERARY_CACHE_TTL_SECONDS,
+        )
+        self._generation_counter = itertools.count()
+
+    @property
+    def db(self) -> Repository:
+        """Repository selected by the application settings."""
+        return get_repository()
 
     async def create_itinerary(
-        self, user_id: str, request: ItineraryRequest
+        self, user_id: str, request: ItineraryRequest, use_cache: bool = True
     ) -> ItineraryResponse:
         """
         Generate and save a personalized travel itinerary.
@@ -35,15 +79,18 @@ class TravelService:
         Args:
             user_id: ID of the user requesting the itinerary
             request: Itinerary generation request with preferences
+            use_cache: False regenerates even if an equivalent trip is cached
 
         Returns:
             Generated itinerary with daily plans
         """
-        itinerary = await self._generate_and_store_itinerary(user_id, request)
+        itinerary = await self._generate_and_store_itinerary(
+            user_id, request, use_cache=use_cache
+        )
         return itinerary
 
     async def create_itinerary_from_text(
-        self, user_id: str, request: ItineraryTextRequest
+        self, user_id: str, request: ItineraryTextRequest, use_cache: bool = True
     ) -> ItineraryFromTextResponse:
         """Create itinerary directly from a natural language description."""
         raw_description = request.text.strip()
@@ -65,7 +112,7 @@ class TravelService:
             placeholder_request, user_description=raw_description
         )
         itinerary = await self._generate_and_store_itinerary(
-            user_id, placeholder_request, prompt=prompt
+            user_id, placeholder_request, prompt=prompt, use_cache=use_cache
         )
 
         structured_request = ItineraryRequest(
@@ -82,12 +129,41 @@ class TravelService:
         )
 
     async def _generate_and_store_itinerary(
-        self, user_id: str, request: ItineraryRequest, prompt: Optional[str] = None
+        self,
+        user_id: str,
+        request: ItineraryRequest,
+        prompt: Optional[str] = None,
+        use_cache: bool = True,
     ) -> ItineraryResponse:
         """Generate an itinerary, persist it, and return the response."""
 
-        itinerary = await llm_service.generate_itinerary(request, prompt=prompt)
+        itinerary = await llm_service.generate_itinerary(
+            request, prompt=prompt, use_cache=use_cache
+        )
+        return await self._store_itinerary(user_id, itinerary)
+
+    async def stream_itinerary(
+        self, user_id: str, request: ItineraryRequest, use_cache: bool = True
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Generate an itinerary incrementally and save it once complete.
 
+        Yields ``("day", DayItinerary)`` as each day is generated, then
+        ``("complete", ItineraryResponse)`` with the saved itinerary.
+        """
+        async for event, payload in llm_service.stream_itinerary(
+            request, use_cache=use_cache
+        ):
+            if event == "itinerary":
+                yield "complete", await self._store_itinerary(user_id, payload)
+            else:
+                yield event, payload
+
+    async def _store_itinerary(
+        self, user_id: str, itinerary: ItineraryResponse
+    ) -> ItineraryResponse:
+        """Persist a generated itinerary and cache it."""
+        now = format_timestamp(datetime.now())
         itinerary_data = {
             "user_id": user_id,
             "destination": itinerary.destination,
@@ -100,20 +176,22 @@ class TravelService:
             ],
             "total_estimated_cost": itinerary.total_estimated_cost,
             "recommendations": itinerary.recommendations,
-            "created_at": datetime.now().isoformat(),
+            "created_at": now,
+            "updated_at": now,
         }
 
         try:
-            result = (
-                self.supabase.table(self.itinerary_table)
-                .insert(itinerary_data)
-                .execute()
+            result = await (
+                self.db.table(self.itinerary_table).insert(itinerary_data).execute()
             )
             if result.data:
                 itinerary.id = result.data[0].get("id")
                 created_at = result.data[0].get("created_at")
                 if created_at:
                     itinerary.created_at = datetime.fromisoformat(created_at)
+                if itinerary.id:
+                    self.invalidate_itinerary(user_id, itinerary.id)
+                    self._cache_itinerary(user_id, itinerary)
         except Exception as e:
             print(f"Error saving itinerary: {e}")
 
@@ -132,9 +210,26 @@ class TravelService:
         Returns:
             Itinerary if found, None otherwise
         """
+        entry = await self._get_cached_itinerary(itinerary_id, user_id)
+        return entry[0] if entry else None
+
+    async def get_itinerary_representation(
+        self, itinerary_id: str, user_id: str
+    ) -> Optional[Representation]:
+        """Serialized itinerary and its ETag, reused until the itinerary changes."""
+        entry = await self._get_cached_itinerary(itinerary_id, user_id)
+        return entry[1] if entry else None
+
+    async def _get_cached_itinerary(
+        self, itinerary_id: str, user_id: str
+    ) -> Optional[Tuple[ItineraryResponse, Representation]]:
+        cached = self.itinerary_cache.get((user_id, itinerary_id))
+        if cached is not MISSING:
+            return cached
+
         try:
-            result = (
-                self.supabase.table(self.itinerary_table)
+            result = await (
+                self.db.table(self.itinerary_table)
                 .select("*")
                 .eq("id", itinerary_id)
                 .eq("user_id", user_id)
@@ -143,7 +238,7 @@ class TravelService:
 
             if result.data:
                 data = result.data[0]
-                return ItineraryResponse(**data)
+                return self._cache_itinerary(user_id, ItineraryResponse(**data))
             return None
         except Exception as e:
             print(f"Error fetching itinerary: {e}")
@@ -162,20 +257,102 @@ class TravelService:
         Returns:
             List of itineraries
         """
+        page = await self.list_itineraries_page(user_id, limit)
+        return page.items
+
+    async def list_itineraries_representation(
+        self,
+        user_id: str,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        view: ItineraryView = ItineraryView.FULL,
+    ) -> Representation:
+        """
+        Serialized list page and its ETag, reused until the user's itineraries change.
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        position = decode_cursor(cursor) if cursor else None
+        cache_key = (user_id, self._list_generation(user_id), limit, position, view)
+        cached = self.itinerary_list_cache.get(cache_key)
+        if cached is not MISSING:
+            return cached
+
         try:
-            result = (
-                self.supabase.table(self.itinerary_table)
-                .select("*")
-                .eq("user_id", user_id)
-                .order("created_at", desc=True)
-                .limit(limit)
-                .execute()
+            page = await self._fetch_itineraries_page(user_id, limit, position, view)
+        except Exception as e:
+            print(f"Error listing itineraries: {e}")
+            page_model = (
+                ItinerarySummaryPage if view == ItineraryView.SUMMARY else ItineraryPage
             )
+            return Representation.of_model(page_model(items=[]))
+
+        representation = Representation.of_model(page)
+        self.itinerary_list_cache.set(cache_key, representation)
+        return representation
+
+    async def list_itineraries_page(
+        self,
+        user_id: str,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        view: ItineraryView = ItineraryView.FULL,
+    ) -> Union[ItineraryPage, ItinerarySummaryPage]:
+        """
+        List one page of itineraries, newest first, using keyset pagination.
+
+        Args:
+            user_id: User ID
+            limit: Maximum number of itineraries to return
+            cursor: Cursor returned with the previous page
+            view: ``summary`` selects only the columns needed for list views
+
+        Returns:
+            Page of itineraries (or itinerary summaries) with the next cursor
 
-            return [ItineraryResponse(**item) for item in result.data]
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        position = decode_cursor(cursor) if cursor else None
+        try:
+            return await self._fetch_itineraries_page(user_id, limit, position, view)
         except Exception as e:
             print(f"Error listing itineraries: {e}")
-            return []
+            if view == ItineraryView.SUMMARY:
+                return ItinerarySummaryPage(items=[])
+            return ItineraryPage(items=[])
+
+    async def _fetch_itineraries_page(
+        self,
+        user_id: str,
+        limit: int,
+        position: Optional[Tuple[str, str]],
+        view: ItineraryView,
+    ) -> Union[ItineraryPage, ItinerarySummaryPage]:
+        summary = view == ItineraryView.SUMMARY
+        page_model = ItinerarySummaryPage if summary else ItineraryPage
+        item_model = ItinerarySummary if summary else ItineraryResponse
+
+        query = (
+            self.db.table(self.itinerary_table)
+            .select(ITINERARY_SUMMARY_COLUMNS if summary else "*")
+            .eq("user_id", user_id)
+        )
+        if position:
+            query = query.after(("created_at", "id"), position)
+
+        result = await (
+            query.order("created_at", desc=True)
+            .order("id", desc=True)
+            .limit(limit + 1)
+            .execute()
+        )
+
+        return page_model(
+            items=[item_model(**item) for item in result.data[:limit]],
+            next_cursor=next_cursor_for(result.data, limit),
+        )
 
     async def delete_itinerary(self, itinerary_id: str, user_id: str) -> bool:
         """
@@ -189,18 +366,44 @@ class TravelService:
             True if deleted successfully, False otherwise
         """
         try:
-            result = (
-                self.supabase.table(self.itinerary_table)
+            result = await (
+                self.db.table(self.itinerary_table)
                 .delete()
                 .eq("id", itinerary_id)
                 .eq("user_id", user_id)
                 .execute()
             )
+            # After the delete, so a concurrent read cannot re-cache the row.
+            self.invalidate_itinerary(user_id, itinerary_id)
             return True
         except Exception as e:
             print(f"Error deleting itinerary: {e}")
             return False
 
+    def invalidate_itinerary(self, user_id: str, itinerary_id: str) -> None:
+        """Drop a cached itinerary and the user's cached list pages.
+
+        Call after any write to that itinerary.
+        """
+        self.itinerary_cache.invalidate((user_id, itinerary_id))
+        self._list_generations.set(user_id, next(self._generation_counter))
+
+    def _cache_itinerary(
+        self, user_id: str, itinerary: ItineraryResponse
+    ) -> Tuple[ItineraryResponse, Representation]:
+        entry = (itinerary, Representation.of_model(itinerary))
+        self.itinerary_cache.set((user_id, itinerary.id), entry)
+        return entry
+
+    def _list_generation(self, user_id: str) -> int:
+        # Generations come from one counter and are never reused, so a user
+        # whose generation was evicted cannot be served pages cached before.
+        generation = self._list_generations.get(user_id)
+        if generation is MISSING:
+            generation = next(self._generation_counter)
+            self._list_generations.set(user_id, generation)
+        return generation
+
     async def track_expense(
         self, user_id: str, expense: ExpenseCreate
     ) -> ExpenseResponse:
@@ -250,6 +453,9 @@ class TravelService:
         """
         Get budget status for a trip (planned vs actual).
 
+        The itinerary and the expense summary are independent lookups, so they
+        are fetched concurrently.
+
         Args:
             user_id: User ID
             itinerary_id: Itinerary ID
@@ -257,12 +463,13 @@ class TravelService:
         Returns:
             Budget status with planned, spent, and remaining amounts
         """
-        itinerary = await self.get_itinerary(itinerary_id, user_id)
+        itinerary, summary = await run_concurrently(
+            self.get_itinerary(itinerary_id, user_id),
+            self.get_expense_summary(user_id, itinerary_id),
+        )
         if not itinerary:
             return {"error": "Itinerary not found"}
 
-        summary = await self.get_expense_summary(user_id, itinerary_id)
-
         planned_budget = itinerary.budget
         spent = summary.total_expenses
         remaining = planned_budget - spent
@@ -281,3 +488,7 @@ class TravelService:
 
 
 travel_service = TravelService()
+register_metrics_source("itinerary_cache", travel_service.itinerary_cache.stats)
+register_metrics_source(
+    "itinerary_list_cache", travel_service.itinerary_list_cache.stats
+)
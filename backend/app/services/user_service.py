@@ -1,7 +1,11 @@
 from typing import Optional
 from fastapi import HTTPException, status
 
-from app.core.database import get_supabase_client
+from app.core.cache import MISSING, TTLCache
+from app.core.config import settings
+from app.core.database import get_repository
+from app.core.metrics import register_metrics_source
+from app.repositories.base import Repository
 from app.schemas.user import UserRegisterRequest, UserLoginRequest, UserResponse
 
 
@@ -9,8 +13,18 @@ class UserService:
     """Service layer handling user storage and authentication."""
 
     def __init__(self) -> None:
-        self.supabase = get_supabase_client()
         self.table = "users"
+        # Principal cache in front of get_user_by_id; missing users are cached
+        # too, but for a shorter time so a fresh registration shows up quickly.
+        self.user_cache = TTLCache(
+            maxsize=settings.USER_CACHE_MAX_SIZE,
+            ttl=settings.USER_CACHE_TTL_SECONDS,
+        )
+
+    @property
+    def db(self) -> Repository:
+        """Repository selected by the application settings."""
+        return get_repository()
 
     async def register_user(self, payload: UserRegisterRequest) -> UserResponse:
         """Create a new user record after validating uniqueness."""
@@ -22,8 +36,8 @@ class UserService:
                 detail="两次输入的密码不一致",
             )
 
-        existing = (
-            self.supabase.table(self.table)
+        existing = await (
+            self.db.table(self.table)
             .select("user_id")
             .eq("user_id", username)
             .limit(1)
@@ -40,13 +54,15 @@ class UserService:
             "password": payload.password,
         }
 
-        result = self.supabase.table(self.table).insert(insert_payload).execute()
+        result = await self.db.table(self.table).insert(insert_payload).execute()
         if not result.data:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="注册用户失败，请稍后再试",
             )
 
+        self.invalidate_user(username)
+
         record = result.data[0]
         return UserResponse(
             id=str(record.get("user_id", username)),
@@ -57,8 +73,8 @@ class UserService:
     async def authenticate_user(self, payload: UserLoginRequest) -> UserResponse:
         """Validate provided credentials and return the user."""
 
-        result = (
-            self.supabase.table(self.table)
+        result = await (
+            self.db.table(self.table)
             .select("user_id, password")
             .eq("user_id", payload.username.strip())
             .eq("password", payload.password)
@@ -82,8 +98,12 @@ class UserService:
     async def get_user_by_id(self, user_id: str) -> Optional[UserResponse]:
         """Fetch a user by identifier, returning None when missing."""
 
-        result = (
-            self.supabase.table(self.table)
+        cached = self.user_cache.get(user_id)
+        if cached is not MISSING:
+            return cached
+
+        result = await (
+            self.db.table(self.table)
             .select("user_id")
             .eq("user_id", user_id)
             .limit(1)
@@ -91,14 +111,25 @@ class UserService:
         )
 
         if not result.data:
+            self.user_cache.set(
+                user_id, None, ttl=settings.USER_CACHE_NEGATIVE_TTL_SECONDS
+            )
             return None
 
         record = result.data[0]
-        return UserResponse(
+        user = UserResponse(
             id=str(record.get("user_id", "")),
             username=record.get("user_id", ""),
             created_at=None,
         )
+        self.user_cache.set(user_id, user)
+        return user
+
+    def invalidate_user(self, user_id: str) -> None:
+        """Drop any cached lookup result for ``user_id``."""
+
+        self.user_cache.invalidate(user_id)
 
 
 user_service = UserService()
+register_metrics_source("user_cache", user_service.user_cache.stats)
@@ -0,0 +1,252 @@
+"""
+Micro-benchmarks for turning raw LLM output into itinerary data.
+
+Run from ``backend/``::
+
+    python -m benchmarks.llm_parsing
+
+``llm_responses.jsonl`` holds model-shaped responses for 3, 7 and 14 day
+trips in the variants seen from the providers: clean JSON, a ```json fence
+with prose, the trailing comma copied from the prompt template, trailing
+commas throughout, a response cut off by the token limit, and prose
+containing braces around the object.
+
+Clean and fenced responses take the same C decoder path in both versions.
+The repair cases are where the trade-off lies: the legacy code gives up
+there (``-`` days, and the service fell back to the template itinerary),
+so its time is the time to fail. The new path first lets the C decoder
+fail, then scans the response once more with the pure-Python
+:class:`~app.services.llm_json.JSONObjectExtractor` to keep the days:
+roughly 0.2-3 ms for 3-14 day responses, 3-100x the legacy failure, and
+negligible next to the seconds the model call takes. A regex pass that
+strips trailing commas before retrying the C decoder measured slower than
+the extractor on these responses, so it is not used.
+
+The normalization benchmark validates
+the decoded 7 and 14 day itineraries with the previous copy-and-coerce code
+and with :func:`app.services.llm_normalize.normalize_itinerary`.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import timeit
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from pydantic import ValidationError  # noqa: E402
+
+from app.schemas.itinerary import ItineraryRequest, ItineraryResponse  # noqa: E402
+from app.services.llm_json import extract_json_object  # noqa: E402
+from app.services.llm_normalize import normalize_itinerary  # noqa: E402
+
+CORPUS = os.path.join(os.path.dirname(__file__), "llm_responses.jsonl")
+NORMALIZATION_CASES = ("clean-7d", "clean-14d")
+
+
+def load_corpus() -> List[Dict[str, str]]:
+    with open(CORPUS, encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+def legacy_extract(raw_content: str) -> Optional[Dict[str, Any]]:
+    """The extraction previously inlined in ``_parse_llm_itinerary_response``."""
+    try:
+        data = json.loads(raw_content)
+    except json.JSONDecodeError:
+        match = re.search(r"\{.*\}", raw_content, re.S)
+        if not match:
+            return None
+        try:
+            data = json.loads(match.group())
+        except json.JSONDecodeError:
+            return None
+    return data if isinstance(data, dict) else None
+
+
+def _legacy_currency(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        cleaned = value.strip().replace("￥", "").replace("¥", "").replace(",", "")
+        match = re.search(r"(-?\d+(?:\.\d+)?)", cleaned)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+def _legacy_text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value.strip() or None
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, list):
+        return " ".join(str(item).strip() for item in value if item).strip() or None
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value).strip() or None
+
+
+def _legacy_bool(value: Any) -> Optional[bool]:
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return bool(value)
+    if isinstance(value, str):
+        lowered = value.strip().lower()
+        if lowered in {"true", "yes", "y", "1", "是", "ok"}:
+            return True
+        if lowered in {"false", "no", "n", "0", "否"}:
+            return False
+    return None
+
+
+def _legacy_day(day: dict, index: int, request: ItineraryRequest) -> dict:
+    normalized = dict(day)
+    normalized.setdefault("day", day.get("day") or index + 1)
+    if not normalized.get("date"):
+        normalized["date"] = (request.start_date + timedelta(days=index)).isoformat()
+    activities = normalized.get("activities") or []
+    if isinstance(activities, dict):
+        activities = [activities]
+    normalized_activities = []
+    for activity in activities:
+        if not isinstance(activity, dict):
+            continue
+        normalized_activity = dict(activity)
+        for text_field in ("time", "activity", "location", "notes"):
+            value = normalized_activity.get(text_field)
+            coerced = _legacy_text(value)
+            if coerced is not None:
+                normalized_activity[text_field] = coerced
+            elif text_field in normalized_activity:
+                normalized_activity[text_field] = value
+        normalized_activity["estimated_cost"] = _legacy_currency(
+            normalized_activity.get("estimated_cost")
+        )
+        normalized_activity["location_address"] = _legacy_text(
+            normalized_activity.get("location_address")
+        )
+        normalized_activity["is_sightseeing"] = _legacy_bool(
+            normalized_activity.get("is_sightseeing")
+        )
+        normalized_activities.append(normalized_activity)
+    normalized["activities"] = normalized_activities
+    if normalized.get("total_estimated_cost") is None:
+        normalized["total_estimated_cost"] = sum(
+            (activity.get("estimated_cost") or 0) for activity in normalized_activities
+        )
+    else:
+        normalized["total_estimated_cost"] = (
+            _legacy_currency(normalized["total_estimated_cost"]) or 0
+        )
+    return normalized
+
+
+def legacy_normalize(
+    data: Dict[str, Any], request: ItineraryRequest
+) -> Optional[ItineraryResponse]:
+    """
+    The normalization previously in ``LLMService``: coerce copies of every
+    day and activity dict, then validate the result with ``ItineraryResponse``.
+    """
+    data = dict(data)
+    destination = _legacy_text(data.get("destination"))
+    data["destination"] = destination or request.destination
+    data.setdefault("start_date", request.start_date.isoformat())
+    data.setdefault("end_date", request.end_date.isoformat())
+    data["budget"] = (
+        _legacy_currency(data.get("budget", request.budget)) or request.budget
+    )
+    daily = data.get("daily_itinerary")
+    if not isinstance(daily, list):
+        return None
+    days = [
+        _legacy_day(day, index, request)
+        for index, day in enumerate(daily)
+        if isinstance(day, dict)
+    ]
+    if not days:
+        return None
+    data["daily_itinerary"] = days
+    if not data.get("total_estimated_cost"):
+        data["total_estimated_cost"] = sum(
+            (_legacy_currency(day.get("total_estimated_cost")) or 0) for day in days
+        )
+    else:
+        data["total_estimated_cost"] = (
+            _legacy_currency(data.get("total_estimated_cost")) or 0
+        )
+    try:
+        return ItineraryResponse(**data)
+    except ValidationError:
+        return None
+
+
+def _days(value: Optional[Dict[str, Any]]) -> str:
+    if value is None:
+        return "-"
+    return str(len(value.get("daily_itinerary") or []))
+
+
+def measure(function: Callable[[str], Any], text: str, number: int) -> float:
+    """Best-of-five microseconds per call."""
+    timings = timeit.repeat(lambda: function(text), number=number, repeat=5)
+    return min(timings) / number * 1e6
+
+
+def bench_extraction(number: int = 200) -> None:
+    print(f"{'response':<28}{'legacy us':>11}{'days':>6}{'new us':>10}{'days':>6}")
+    for case in load_corpus():
+        text = case["text"]
+        print(
+            f"{case['name']:<28}"
+            f"{measure(legacy_extract, text, number):>11.1f}"
+            f"{_days(legacy_extract(text)):>6}"
+            f"{measure(extract_json_object, text, number):>10.1f}"
+            f"{_days(extract_json_object(text)):>6}"
+        )
+    print("(days '-': nothing extracted; the time shown is the time to fail)")
+
+
+def _request(days: int) -> ItineraryRequest:
+    return ItineraryRequest(
+        destination="北京",
+        start_date=date(2025, 3, 1),
+        end_date=date(2025, 3, days),
+        budget=7000,
+        preferences=["cultural", "food"],
+    )
+
+
+def bench_normalization(number: int = 200) -> None:
+    """Legacy copy-and-coerce versus the single validation pass."""
+    print(f"{'itinerary':<28}{'legacy us':>11}{'new us':>10}{'same':>6}")
+    for case in load_corpus():
+        if case["name"] not in NORMALIZATION_CASES:
+            continue
+        data = extract_json_object(case["text"])
+        request = _request(len(data["daily_itinerary"]))
+        same = legacy_normalize(data, request).model_dump() == (
+            normalize_itinerary(data, request).model_dump()
+        )
+        print(
+            f"{case['name']:<28}"
+            f"{measure(lambda _: legacy_normalize(data, request), '', number):>11.1f}"
+            f"{measure(lambda _: normalize_itinerary(data, request), '', number):>10.1f}"
+            f"{'yes' if same else 'no':>6}"
+        )
+
+
+if __name__ == "__main__":
+    bench_extraction()
+    print()
+    bench_normalization()
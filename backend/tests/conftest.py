@@ -0,0 +1,74 @@
+"""Shared test configuration: run the API against the in-process backend."""
+
+import asyncio
+import os
+import tempfile
+from datetime import date, timedelta
+
+import pytest
+
+os.environ.setdefault("DATABASE_BACKEND", "sqlite")
+os.environ.setdefault("SQLITE_PATH", ":memory:")
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault(
+    "EXPENSE_WAL_PATH", os.path.join(tempfile.mkdtemp(), "expense-wal.ndjson")
+)
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.schemas.itinerary import ItineraryRequest  # noqa: E402
+
+
+@pytest.fixture
+def run():
+    """Run a coroutine to completion on a fresh event loop."""
+    return asyncio.run
+
+
+@pytest.fixture
+def itinerary_request():
+    """Build a request for a trip of ``days`` days; fields can be overridden."""
+
+    def build(days: int = 3, **overrides) -> ItineraryRequest:
+        fields = {
+            "destination": "Beijing",
+            "start_date": date(2025, 3, 1),
+            "budget": 5000,
+            "preferences": ["cultural", "food"],
+        }
+        fields.update(overrides)
+        fields.setdefault("end_date", fields["start_date"] + timedelta(days=days - 1))
+        return ItineraryRequest(**fields)
+
+    return build
+
+
+@pytest.fixture
+def register():
+    """Register a user through the API; returns the login response body."""
+    client = TestClient(app)
+
+    def register(username: str) -> dict:
+        response = client.post(
+            "/api/auth/register",
+            json={
+                "username": username,
+                "password": "pass1234",
+                "confirm_password": "pass1234",
+            },
+        )
+        assert response.status_code == 200
+        return response.json()
+
+    return register
+
+
+@pytest.fixture
+def auth_headers(register):
+    """Authorization headers for a newly registered user."""
+
+    def auth_headers(username: str) -> dict:
+        return {"Authorization": f"Bearer {register(username)['access_token']}"}
+
+    return auth_headers
@@ -0,0 +1,34 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_login_issues_bearer_token(register):
+    """Login returns a signed token that authenticates API calls."""
+    register("tokenuser")
+    response = client.post(
+        "/api/auth/login", json={"username": "tokenuser", "password": "pass1234"}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["token_type"] == "bearer"
+    assert data["access_token"]
+
+    headers = {"Authorization": f"Bearer {data['access_token']}"}
+    summary = client.get("/api/expenses/summary", headers=headers)
+    assert summary.status_code == 200
+
+
+def test_invalid_and_revoked_tokens_are_rejected(register):
+    """Tampered tokens and tokens revoked via logout return 401."""
+    token = register("revokeuser")["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    forged = token.rsplit(".", 1)[0] + ".invalid-signature"
+    tampered = {"Authorization": f"Bearer {forged}"}
+    assert client.get("/api/expenses/summary", headers=tampered).status_code == 401
+
+    assert client.post("/api/auth/logout", headers=headers).status_code == 204
+    assert client.get("/api/expenses/summary", headers=headers).status_code == 401
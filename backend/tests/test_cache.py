@@ -0,0 +1,46 @@
+import time
+
+from app.core.cache import MISSING, TTLCache
+
+
+def test_ttl_cache_expiry_and_negative_entries():
+    """Entries expire after their own TTL and None can be cached."""
+    cache = TTLCache(maxsize=4, ttl=60)
+    cache.set("present", "alice")
+    cache.set("absent", None, ttl=0.01)
+
+    assert cache.get("present") == "alice"
+    assert cache.get("absent") is None
+    time.sleep(0.02)
+    assert cache.get("absent") is MISSING
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_ttl_cache_lru_eviction_and_invalidation():
+    """The least recently used entry is evicted once maxsize is reached."""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1
+    assert cache.invalidate("a") is True
+    assert cache.get("a") is MISSING
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_cache_evicts_by_byte_budget():
+    """With max_bytes set, least recently used entries go first to fit."""
+    cache = TTLCache(maxsize=10, ttl=60, max_bytes=10, sizeof=len)
+    cache.set("a", "xxxx")
+    cache.set("b", "yyyy")
+    cache.set("c", "zzzz")
+    cache.set("huge", "x" * 11)
+
+    assert cache.get("a") is MISSING
+    assert cache.get("b") == "yyyy"
+    assert cache.get("huge") is MISSING
+    assert cache.stats()["bytes"] == 8
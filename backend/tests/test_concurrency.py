@@ -0,0 +1,41 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.concurrency import run_concurrently
+
+
+def test_run_concurrently_overlaps_calls():
+    """Latency is the slowest call, not the sum, and order is preserved."""
+
+    async def delayed(value, delay):
+        await asyncio.sleep(delay)
+        return value
+
+    started = time.perf_counter()
+    results = asyncio.run(run_concurrently(delayed("a", 0.1), delayed("b", 0.1)))
+    elapsed = time.perf_counter() - started
+
+    assert results == ["a", "b"]
+    assert elapsed < 0.18
+
+
+def test_run_concurrently_cancels_siblings_and_reraises():
+    """A failing call cancels the others and its own exception propagates."""
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise LookupError("missing")
+
+    with pytest.raises(LookupError):
+        asyncio.run(run_concurrently(slow(), failing()))
+    assert cancelled == [True]
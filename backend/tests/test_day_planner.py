@@ -0,0 +1,99 @@
+import asyncio
+import json
+import re
+from datetime import date
+
+from app.services.day_planner import ParallelDayGenerator, parse_skeleton
+from app.services.llm_normalize import normalize_day
+from app.services.llm_service import llm_service
+
+
+def _day(number, cost):
+    return json.dumps(
+        {
+            "day": number,
+            "activities": [
+                {
+                    "time": "09:00",
+                    "activity": f"Day {number} visit",
+                    "location": "Somewhere",
+                    "location_address": "Address",
+                    "is_sightseeing": True,
+                    "estimated_cost": f"￥{cost}",
+                    "notes": "",
+                }
+            ],
+        }
+    )
+
+
+def test_skeleton_fills_missing_days(itinerary_request):
+    raw = 'Sure! {"days": [{"day": 2, "theme": "Great Wall", "area": "Yanqing"}]}'
+    outline, recommendations = parse_skeleton(raw, itinerary_request(days=3))
+
+    assert [item.day for item in outline] == [1, 2, 3]
+    assert outline[1].theme == "Great Wall"
+    assert outline[1].area == "Yanqing"
+    assert outline[2].date == date(2025, 3, 3)
+    assert outline[0].theme
+    assert recommendations is None
+
+
+def test_days_run_concurrently_and_only_failed_days_are_retried(run, itinerary_request):
+    prompts = []
+    active = 0
+    peak = 0
+    day_two_attempts = 0
+
+    async def complete(prompt):
+        nonlocal active, peak, day_two_attempts
+        prompts.append(prompt)
+        if "行程骨架，每天只给出" in prompt:
+            return json.dumps({"days": [], "recommendations": "Bring cash"})
+        number = int(re.search(r"请只规划第(\d+)天", prompt).group(1))
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        if number == 2:
+            day_two_attempts += 1
+            return "not json" if day_two_attempts == 1 else _day(2, 200)
+        if number == 4:
+            return '{"day": 4, "activities": "broken"'
+        return _day(number, number * 100)
+
+    generator = ParallelDayGenerator(
+        complete,
+        normalize_day,
+        llm_service._generate_fallback_day,
+        concurrency=2,
+        max_attempts=2,
+    )
+    itinerary = run(generator.generate(itinerary_request(days=4)))
+
+    assert peak == 2
+    assert len(prompts) == 1 + 4 + 2
+    assert [day.day for day in itinerary.daily_itinerary] == [1, 2, 3, 4]
+    assert itinerary.daily_itinerary[1].activities[0].activity == "Day 2 visit"
+    assert itinerary.daily_itinerary[3].activities[0].activity.startswith("Morning")
+    assert itinerary.daily_itinerary[3].date == date(2025, 3, 4)
+    assert itinerary.total_estimated_cost == sum(
+        day.total_estimated_cost for day in itinerary.daily_itinerary
+    )
+    assert itinerary.recommendations == "Bring cash"
+    assert generator.stats() == {
+        "itineraries": 1,
+        "day_calls": 6,
+        "day_retries": 2,
+        "days_filled": 1,
+    }
+
+
+def test_no_usable_day_returns_none(run, itinerary_request):
+    async def complete(prompt):
+        return None
+
+    generator = ParallelDayGenerator(
+        complete, normalize_day, llm_service._generate_fallback_day
+    )
+    assert run(generator.generate(itinerary_request(days=2))) is None
@@ -0,0 +1,97 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.database import get_repository
+from app.main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def open_session(register):
+    def open_session(username: str) -> dict:
+        data = register(username)
+        return {"user_id": data["user"]["id"], "token": data["access_token"]}
+
+    return open_session
+
+
+def _get(path: str, session: dict, etag: str = None):
+    headers = {"Authorization": f"Bearer {session['token']}"}
+    if etag:
+        headers["If-None-Match"] = etag
+    return client.get(path, headers=headers)
+
+
+def test_expense_summary_revalidates_until_expenses_change(open_session):
+    session = open_session("etagexpenses")
+    first = _get("/api/expenses/summary", session)
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and etag.startswith('"')
+
+    unchanged = _get("/api/expenses/summary", session, etag)
+    assert unchanged.status_code == 304
+    assert unchanged.content == b""
+
+    created = client.post(
+        "/api/expenses/",
+        json={
+            "itinerary_id": "trip1",
+            "category": "food",
+            "amount": 9,
+            "description": "x",
+        },
+        headers={"Authorization": f"Bearer {session['token']}"},
+    )
+    assert created.status_code == 201
+
+    changed = _get("/api/expenses/summary", session, etag)
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.json()["total_expenses"] == 9
+
+
+def test_itinerary_detail_and_list_revalidate(open_session, run):
+    session = open_session("etagitineraries")
+    inserted = run(
+        get_repository()
+        .table("itineraries")
+        .insert(
+            {
+                "user_id": session["user_id"],
+                "destination": "Hangzhou",
+                "start_date": "2025-04-01",
+                "end_date": "2025-04-02",
+                "budget": 2000,
+                "daily_itinerary": [],
+                "total_estimated_cost": 1500,
+            }
+        )
+        .execute()
+    )
+    itinerary_id = inserted.data[0]["id"]
+
+    detail = _get(f"/api/itineraries/{itinerary_id}", session)
+    assert detail.status_code == 200
+    assert detail.json()["destination"] == "Hangzhou"
+    assert (
+        _get(f"/api/itineraries/{itinerary_id}", session, detail.headers["etag"])
+    ).status_code == 304
+
+    listing = _get("/api/itineraries/?view=summary", session)
+    list_etag = listing.headers["etag"]
+    assert [item["id"] for item in listing.json()["items"]] == [itinerary_id]
+    assert _get("/api/itineraries/?view=summary", session, list_etag).status_code == 304
+    # Weak comparison: a W/ prefixed validator still matches.
+    assert (
+        _get("/api/itineraries/?view=summary", session, f"W/{list_etag}").status_code
+        == 304
+    )
+
+    deleted = client.delete(
+        f"/api/itineraries/{itinerary_id}",
+        headers={"Authorization": f"Bearer {session['token']}"},
+    )
+    assert deleted.status_code == 204
+    after = _get("/api/itineraries/?view=summary", session, list_etag)
+    assert after.status_code == 200 and after.json()["items"] == []
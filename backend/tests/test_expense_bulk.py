@@ -0,0 +1,115 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_bulk_import_csv_reports_row_errors(auth_headers):
+    """Valid CSV rows are inserted and invalid ones reported by row number."""
+    headers = auth_headers("csvimport")
+    body = (
+        "itinerary_id,category,amount,description,date\n"
+        'trip1,food,12.5,"Noodles, spicy",2024-03-10T12:00:00\n'
+        "trip1,unknown,3,Bad category,\n"
+        "trip1,transportation,-1,Negative,\n"
+        'trip1,shopping,40,"Two\nlines",\n'
+    )
+    response = client.post(
+        "/api/expenses/bulk",
+        content=body.encode(),
+        headers={**headers, "Content-Type": "text/csv"},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["inserted"] == 2
+    assert data["failed"] == 2
+    assert [error["row"] for error in data["errors"]] == [2, 3]
+
+    summary = client.get(
+        "/api/expenses/summary", params={"itinerary_id": "trip1"}, headers=headers
+    ).json()
+    assert summary["count"] == 2
+    assert summary["total_expenses"] == 52.5
+
+
+def test_bulk_import_ndjson_and_json_array_in_batches(auth_headers):
+    """NDJSON and JSON array bodies import every valid row across batches."""
+    headers = auth_headers("ndjsonimport")
+    rows = [
+        {"itinerary_id": "trip2", "category": "food", "amount": 1, "description": "x"}
+        for _ in range(25)
+    ]
+    ndjson = "\n".join(json.dumps(row) for row in rows) + "\nnot json\n"
+    response = client.post(
+        "/api/expenses/bulk",
+        params={"batch_size": 10},
+        content=ndjson.encode(),
+        headers={**headers, "Content-Type": "application/x-ndjson"},
+    )
+    assert response.json()["inserted"] == 25
+    assert response.json()["errors"][0]["row"] == 26
+
+    response = client.post("/api/expenses/bulk", json=rows[:3], headers=headers)
+    assert response.json() == {"inserted": 3, "failed": 0, "errors": []}
+
+    response = client.post(
+        "/api/expenses/bulk", json={"not": "a list"}, headers=headers
+    )
+    assert response.status_code == 400
+
+
+def test_bulk_import_counts_rows_past_the_limit_as_failed(monkeypatch, auth_headers):
+    monkeypatch.setattr(settings, "EXPENSE_BULK_MAX_ROWS", 5)
+    headers = auth_headers("limitimport")
+    row = {"itinerary_id": "trip9", "category": "food", "amount": 1, "description": "x"}
+    ndjson = "\n".join(json.dumps(row) for _ in range(8))
+
+    response = client.post(
+        "/api/expenses/bulk",
+        content=ndjson.encode(),
+        headers={**headers, "Content-Type": "application/x-ndjson"},
+    )
+
+    data = response.json()
+    assert (data["inserted"], data["failed"]) == (5, 3)
+    assert [error["row"] for error in data["errors"]] == [6]
+    assert "3 rows skipped" in data["errors"][0]["error"]
+
+
+def test_batch_update_and_delete_are_scoped_to_user(auth_headers):
+    """Batch endpoints report affected counts and never touch other users."""
+    headers = auth_headers("batchowner")
+    other = auth_headers("batchother")
+    rows = [
+        {"itinerary_id": "trip3", "category": "food", "amount": 5, "description": "x"}
+        for _ in range(4)
+    ]
+    client.post("/api/expenses/bulk", json=rows, headers=headers)
+    client.post("/api/expenses/bulk", json=rows[:1], headers=other)
+    ids = [
+        item["id"]
+        for item in client.get("/api/expenses/", headers=headers).json()["items"]
+    ]
+
+    response = client.post(
+        "/api/expenses/batch-update",
+        json={"ids": ids[:2], "changes": {"category": "shopping"}},
+        headers=headers,
+    )
+    assert response.json() == {"affected": 2}
+
+    response = client.post(
+        "/api/expenses/batch-delete", json={"itinerary_id": "trip3"}, headers=headers
+    )
+    assert response.json() == {"affected": 4}
+    assert (
+        client.post("/api/expenses/batch-delete", json={}, headers=headers).status_code
+        == 400
+    )
+
+    remaining = client.get("/api/expenses/summary", headers=other).json()
+    assert remaining["count"] == 1
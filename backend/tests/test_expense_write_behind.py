@@ -0,0 +1,204 @@
+import asyncio
+import json
+
+from app.core.config import settings
+from app.core.database import get_repository
+from app.schemas.expense import ExpenseCreate
+from app.services.expense_service import expense_service
+from app.services.expense_write_behind import BufferFullError, ExpenseWriteBehindBuffer
+
+
+def test_write_behind_batches_and_replays_uncommitted_records(tmp_path, run):
+    """Records flush in size-bounded batches; a restart replays unflushed ones."""
+    wal_path = str(tmp_path / "wal.ndjson")
+    batches = []
+
+    async def writer(records):
+        batches.append([record["id"] for record in records])
+        return records
+
+    async def failing_writer(records):
+        raise ConnectionError("database unavailable")
+
+    async def scenario():
+        crashed = ExpenseWriteBehindBuffer(wal_path, failing_writer, flush_size=10)
+        acked = [await crashed.append({"amount": n}) for n in range(5)]
+        await crashed.flush()
+
+        restarted = ExpenseWriteBehindBuffer(wal_path, writer, flush_size=2)
+        replayed = await restarted.replay()
+        flushed = await restarted.flush()
+
+        again = ExpenseWriteBehindBuffer(wal_path, writer)
+        return acked, replayed, flushed, await again.replay(), crashed.stats()
+
+    acked, replayed, flushed, replayed_again, stats = run(scenario())
+
+    assert replayed == flushed == 5
+    assert [record_id for batch in batches for record_id in batch] == [
+        record["id"] for record in acked
+    ]
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert replayed_again == 0
+    assert stats["failures"] == 1 and stats["pending"] == 5
+
+
+def test_rejected_rows_are_dead_lettered_instead_of_blocking(tmp_path, run):
+    """A row the database rejects is set aside; the rest of its batch lands."""
+    wal_path = str(tmp_path / "wal.ndjson")
+    stored = []
+
+    async def writer(records):
+        if any(record["amount"] < 0 for record in records):
+            raise ValueError("violates check constraint")
+        stored.extend(record["amount"] for record in records)
+        return records
+
+    async def scenario():
+        buffer = ExpenseWriteBehindBuffer(wal_path, writer, flush_size=10)
+        for amount in (1, -1, 2):
+            await buffer.append({"amount": amount})
+        flushed = await buffer.flush()
+        await buffer.append({"amount": 3})
+        await buffer.flush()
+
+        restarted = ExpenseWriteBehindBuffer(wal_path, writer)
+        return flushed, buffer, await restarted.replay()
+
+    flushed, buffer, replayed = run(scenario())
+
+    assert flushed == 2 and stored == [1, 2, 3]
+    stats = buffer.stats()
+    assert stats["pending"] == 0 and stats["dead_lettered"] == 1
+    assert replayed == 0
+    (dead,) = buffer.dead_letters
+    assert dead["record"]["amount"] == -1 and "check constraint" in dead["error"]
+    # Dead letters live in their own file; compaction leaves none in the log.
+    with open(f"{wal_path}.dead", encoding="utf-8") as log:
+        assert [json.loads(line) for line in log] == [dead]
+    with open(wal_path, encoding="utf-8") as log:
+        assert log.read() == ""
+
+
+def test_write_behind_rejects_when_full(tmp_path, run):
+    async def failing_writer(records):
+        raise ConnectionError("database unavailable")
+
+    async def scenario():
+        buffer = ExpenseWriteBehindBuffer(
+            str(tmp_path / "wal.ndjson"), failing_writer, flush_size=2, max_pending=2
+        )
+        await buffer.append({"amount": 1})
+        await buffer.append({"amount": 2})
+        try:
+            await buffer.append({"amount": 3})
+        except BufferFullError:
+            return len(buffer)
+        return None
+
+    assert run(scenario()) == 2
+
+
+def test_compaction_keeps_appends_made_during_the_rewrite(tmp_path, run):
+    """Appends racing a compaction wait for it and are not lost."""
+    wal_path = str(tmp_path / "wal.ndjson")
+    written = []
+
+    async def writer(records):
+        written.extend(record["id"] for record in records)
+        return records
+
+    async def scenario():
+        buffer = ExpenseWriteBehindBuffer(wal_path, writer, flush_size=10)
+        await buffer.append({"amount": 1})
+        flush = asyncio.create_task(buffer.flush())
+        appended = [await buffer.append({"amount": n}) for n in (2, 3)]
+        await flush
+
+        restarted = ExpenseWriteBehindBuffer(wal_path, writer)
+        await restarted.replay()
+        return appended, restarted
+
+    appended, restarted = run(scenario())
+
+    assert all(
+        (record["id"] in written) != (record["id"] in restarted) for record in appended
+    )
+
+
+def test_disabled_write_behind_does_not_touch_the_log(monkeypatch, tmp_path, run):
+    monkeypatch.setattr(settings, "EXPENSE_WRITE_BEHIND_ENABLED", False)
+    monkeypatch.setattr(
+        expense_service.write_buffer, "wal_path", str(tmp_path / "data" / "wal")
+    )
+
+    async def scenario():
+        await expense_service.start_write_behind()
+        await expense_service.stop_write_behind()
+
+    run(scenario())
+    assert not (tmp_path / "data").exists()
+
+
+def test_replayed_expense_already_stored_is_not_counted_twice(
+    monkeypatch, tmp_path, run
+):
+    """A batch that landed without its commit marker does not skew rollups."""
+    wal_path = tmp_path / "wal.ndjson"
+    buffer = ExpenseWriteBehindBuffer(
+        str(wal_path), expense_service._write_expense_batch
+    )
+    monkeypatch.setattr(expense_service, "write_buffer", buffer)
+
+    async def scenario():
+        user = "replayrollupuser"
+        created = await expense_service.create_expense(
+            user,
+            ExpenseCreate(
+                itinerary_id="trip1", category="food", amount=30, description="noodles"
+            ),
+        )
+        row = created.model_dump(mode="json")
+        # The process died after the batch was written, before the commit.
+        wal_path.write_text(json.dumps({"op": "insert", "record": row}) + "\n")
+        before = await expense_service.get_expense_summary(user)
+        await buffer.replay()
+        await buffer.flush()
+        after = await expense_service.get_expense_summary(user)
+        return before, after, buffer.possibly_written(created.id)
+
+    before, after, unsure = run(scenario())
+
+    assert before.total_expenses == after.total_expenses == 30
+    assert after.count == 1
+    assert not unsure
+
+
+def test_create_expense_write_behind_acknowledges_before_insert(monkeypatch, run):
+    """Buffered expenses get their final id and are readable once flushed."""
+    monkeypatch.setattr(settings, "EXPENSE_WRITE_BEHIND_ENABLED", True)
+
+    async def scenario():
+        user = "writebehinduser"
+        created = await expense_service.create_expense(
+            user,
+            ExpenseCreate(
+                itinerary_id="trip1", category="food", amount=12, description="tea"
+            ),
+        )
+        before = (
+            await get_repository()
+            .table("expenses")
+            .select("id")
+            .eq("id", created.id)
+            .execute()
+        )
+        # Reads of a buffered expense flush it first.
+        fetched = await expense_service.get_expense(created.id, user)
+        return created, before.data, fetched
+
+    created, before, fetched = run(scenario())
+
+    assert before == []
+    assert fetched is not None and fetched.id == created.id
+    assert fetched.amount == 12
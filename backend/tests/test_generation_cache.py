@@ -0,0 +1,78 @@
+import os
+from datetime import date
+
+from app.services.generation_cache import (
+    DiskGenerationStore,
+    GenerationCache,
+    MemoryGenerationStore,
+    request_fingerprint,
+)
+from app.services.llm_service import llm_service
+
+
+def _fingerprint(request):
+    return request_fingerprint(request, budget_step=500)
+
+
+def test_fingerprint_ignores_calendar_and_small_budget_changes(itinerary_request):
+    base = _fingerprint(itinerary_request())
+
+    assert base == _fingerprint(
+        itinerary_request(
+            destination="  beijing ",
+            start_date=date(2025, 6, 10),
+            end_date=date(2025, 6, 12),
+            budget=5100,
+            preferences=["food", "cultural"],
+        )
+    )
+    assert base != _fingerprint(itinerary_request(end_date=date(2025, 3, 4)))
+    assert base != _fingerprint(itinerary_request(budget=8000))
+    assert base != _fingerprint(itinerary_request(preferences=["nature"]))
+
+
+def test_cached_itinerary_is_rebased_onto_new_dates(tmp_path, run, itinerary_request):
+    template = llm_service._generate_fallback_itinerary(itinerary_request(), 3)
+    later = itinerary_request(
+        start_date=date(2025, 6, 10), end_date=date(2025, 6, 12), budget=5100
+    )
+
+    async def scenario(store):
+        cache = GenerationCache(store, budget_step=500)
+        key = _fingerprint(itinerary_request())
+        await cache.set(key, template)
+        return await cache.get(key, later), await cache.get("other", later)
+
+    for store in (
+        MemoryGenerationStore(max_entries=8, ttl=60),
+        DiskGenerationStore(str(tmp_path), max_entries=8, ttl=60),
+    ):
+        hit, miss = run(scenario(store))
+        assert miss is None
+        assert hit.start_date == date(2025, 6, 10)
+        assert hit.end_date == date(2025, 6, 12)
+        assert hit.budget == 5100
+        assert [day.date for day in hit.daily_itinerary] == [
+            date(2025, 6, 10),
+            date(2025, 6, 11),
+            date(2025, 6, 12),
+        ]
+        assert (
+            hit.daily_itinerary[0].activities == template.daily_itinerary[0].activities
+        )
+
+
+def test_disk_store_expires_and_evicts(tmp_path, run):
+    async def scenario():
+        expired = DiskGenerationStore(str(tmp_path / "expired"), max_entries=8, ttl=-1)
+        await expired.set("a", {"x": 1})
+        bounded = DiskGenerationStore(str(tmp_path / "bounded"), max_entries=2, ttl=60)
+        for key in ("a", "b", "c"):
+            await bounded.set(key, {"key": key})
+        return await expired.get("a"), bounded
+
+    expired_value, bounded = run(scenario())
+
+    assert expired_value is None
+    assert len(os.listdir(bounded.directory)) == 2
+    assert bounded.evictions == 1
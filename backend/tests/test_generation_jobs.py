@@ -0,0 +1,197 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.main import app
+from app.schemas.itinerary import ItineraryResponse
+from app.schemas.job import JobKind, JobStatus
+from app.services.generation_jobs import (
+    DiskJobStore,
+    GenerationJobQueue,
+    QueueFullError,
+    generation_jobs,
+)
+
+
+def _result(payload):
+    return ItineraryResponse(
+        destination=payload["destination"],
+        start_date="2025-03-01",
+        end_date="2025-03-01",
+        budget=100,
+        daily_itinerary=[],
+        total_estimated_cost=0,
+    )
+
+
+async def _wait_for(queue, job_id, user_id, state):
+    for _ in range(200):
+        job = queue.get(job_id, user_id)
+        if job.status == state:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {job_id} never reached {state}")
+
+
+def test_queue_backpressure_idempotency_and_subscription(run):
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def handler(user_id, payload):
+            await gate.wait()
+            if payload["destination"] == "fail":
+                raise ValueError("no plan")
+            return _result(payload)
+
+        queue = GenerationJobQueue(
+            {JobKind.ITINERARY: handler}, workers=1, max_queued=1
+        )
+        await queue.start()
+        first = await queue.submit("u1", JobKind.ITINERARY, {"destination": "a"})
+        await asyncio.sleep(0.01)
+        second = await queue.submit(
+            "u1", JobKind.ITINERARY, {"destination": "b"}, idempotency_key="k"
+        )
+        retry = await queue.submit(
+            "u1", JobKind.ITINERARY, {"destination": "b"}, idempotency_key="k"
+        )
+        with pytest.raises(QueueFullError):
+            await queue.submit("u1", JobKind.ITINERARY, {"destination": "c"})
+
+        assert retry.id == second.id
+        assert queue.get(first.id, "u1").status == JobStatus.RUNNING
+        assert queue.get(first.id, "someone-else") is None
+
+        states = []
+
+        async def follow():
+            async for state in queue.subscribe(second.id, "u1"):
+                states.append(state.status)
+
+        follower = asyncio.create_task(follow())
+        await asyncio.sleep(0.01)
+        gate.set()
+        await asyncio.wait_for(follower, 1)
+
+        failed = await queue.submit("u1", JobKind.ITINERARY, {"destination": "fail"})
+        failed = await _wait_for(queue, failed.id, "u1", JobStatus.FAILED)
+        done = queue.get(second.id, "u1")
+        stats = queue.stats()
+        await queue.stop()
+        return states, done, failed, stats
+
+    states, done, failed, stats = run(scenario())
+
+    assert states == [JobStatus.QUEUED, JobStatus.RUNNING, JobStatus.SUCCEEDED]
+    assert done.result["destination"] == "b"
+    assert failed.error == "no plan"
+    assert stats["submitted"] == 3
+    assert stats["rejected"] == 1
+    assert stats["succeeded"] == 2 and stats["failed"] == 1
+
+
+def test_unfinished_jobs_survive_restart(tmp_path, run):
+    async def hang(user_id, payload):
+        await asyncio.Event().wait()
+
+    async def finish(user_id, payload):
+        return _result(payload)
+
+    async def scenario():
+        before = GenerationJobQueue(
+            {JobKind.ITINERARY: hang}, store=DiskJobStore(str(tmp_path))
+        )
+        await before.start()
+        job = await before.submit("u1", JobKind.ITINERARY, {"destination": "x"})
+        await asyncio.sleep(0.01)
+        await before.stop()
+
+        after = GenerationJobQueue(
+            {JobKind.ITINERARY: finish}, store=DiskJobStore(str(tmp_path))
+        )
+        await after.start()
+        done = await _wait_for(after, job.id, "u1", JobStatus.SUCCEEDED)
+        recovered = after.stats()["recovered"]
+        await after.stop()
+        return done, recovered
+
+    done, recovered = run(scenario())
+
+    assert recovered == 1
+    assert done.result["destination"] == "x"
+
+
+def test_worker_survives_a_store_that_cannot_save(tmp_path, run):
+    class FailingStore(DiskJobStore):
+        async def save(self, job):
+            if job["payload"]["destination"] == "unsaved" and job["status"] != "queued":
+                raise OSError("disk full")
+            await super().save(job)
+
+    async def finish(user_id, payload):
+        return _result(payload)
+
+    async def scenario():
+        queue = GenerationJobQueue(
+            {JobKind.ITINERARY: finish}, store=FailingStore(str(tmp_path)), workers=1
+        )
+        await queue.start()
+        lost = await queue.submit("u1", JobKind.ITINERARY, {"destination": "unsaved"})
+        kept = await queue.submit("u1", JobKind.ITINERARY, {"destination": "saved"})
+        lost = await _wait_for(queue, lost.id, "u1", JobStatus.FAILED)
+        kept = await _wait_for(queue, kept.id, "u1", JobStatus.SUCCEEDED)
+        stats = queue.stats()
+        await queue.stop()
+        return lost, kept, stats
+
+    lost, kept, stats = run(scenario())
+
+    assert "disk full" in lost.error
+    assert kept.result["destination"] == "saved"
+    assert (stats["workers"], stats["succeeded"], stats["failed"]) == (1, 1, 1)
+
+
+def test_create_itinerary_as_job_returns_202_and_result(run, auth_headers):
+    headers = {**auth_headers("jobrunner"), "Idempotency-Key": "trip-1"}
+
+    async def scenario():
+        await generation_jobs.start()
+        try:
+            async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+                body = {
+                    "destination": "Hangzhou",
+                    "start_date": "2025-04-01",
+                    "end_date": "2025-04-02",
+                    "budget": 2000,
+                    "preferences": ["nature"],
+                }
+                accepted = await client.post(
+                    "/api/itineraries/?job=true", json=body, headers=headers
+                )
+                again = await client.post(
+                    "/api/itineraries/?job=true", json=body, headers=headers
+                )
+                location = accepted.headers["location"]
+                for _ in range(200):
+                    polled = await client.get(location, headers=headers)
+                    if polled.json()["status"] == "succeeded":
+                        break
+                    await asyncio.sleep(0.01)
+                events = await client.get(f"{location}/events", headers=headers)
+                return accepted, again, polled, events
+        finally:
+            await generation_jobs.stop()
+
+    accepted, again, polled, events = run(scenario())
+
+    assert accepted.status_code == 202
+    assert accepted.json()["status"] == "queued"
+    assert again.json()["id"] == accepted.json()["id"]
+    assert polled.status_code == 200
+    result = polled.json()["result"]
+    assert result["destination"] == "Hangzhou"
+    assert len(result["daily_itinerary"]) == 2
+    assert events.headers["content-type"].startswith("text/event-stream")
+    assert events.text.count("event: status") == 1
+    assert '"status":"succeeded"' in events.text
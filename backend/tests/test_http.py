@@ -0,0 +1,48 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.core.http import HTTPClientPool
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"{}"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_shared_client_reuses_keepalive_connections():
+    """Sequential calls through the pool open one connection and reuse it."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    async def scenario():
+        pool = HTTPClientPool(timeout=5.0)
+        for _ in range(3):
+            response = await pool.get("qwen").get(url)
+            assert response.status_code == 200
+        same_client = pool.get("qwen") is pool.get("qwen")
+        await pool.aclose()
+        return same_client, pool.stats()["qwen"]
+
+    try:
+        same_client, stats = asyncio.run(scenario())
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert same_client
+    assert stats["requests"] == 3
+    assert stats["connections_opened"] == 1
+    assert stats["reused"] == 2
@@ -0,0 +1,93 @@
+import asyncio
+from datetime import date
+
+from app.services.llm_json import JSONObjectExtractor, extract_json_object
+from app.services.llm_service import LLMService, llm_service
+
+DOCUMENT = (
+    "好的，以下是行程：\n```json\n"
+    '{"destination": "北京", "daily_itinerary": [\n'
+    '  {"day": 1, "activities": [{"time": "09:00", "activity": "故宫 {午门}", "location": "故宫",'
+    ' "estimated_cost": 60, "notes": "带上\\"身份证\\"",},]},\n'
+    '  {"day": 2, "activities": [{"time": "10:00", "activity": "长城", "location": "八达岭",'
+    ' "estimated_cost": "40元"}]}\n'
+    '], "recommendations": "一些旅行建议",\n}\n```\n祝旅途愉快 {:)}'
+)
+
+
+def test_extracts_object_from_fences_junk_and_trailing_commas():
+    data = extract_json_object(DOCUMENT)
+
+    assert data["destination"] == "北京"
+    assert [day["day"] for day in data["daily_itinerary"]] == [1, 2]
+    assert data["daily_itinerary"][0]["activities"][0]["notes"] == '带上"身份证"'
+    assert data["recommendations"] == "一些旅行建议"
+    assert extract_json_object('预算 {7000} 元 {"a": 1,}') == {"a": 1}
+    assert extract_json_object("no object here") is None
+    # A broken response is not mistaken for one of its nested objects.
+    assert extract_json_object('{"trip": {"day": 1} oops}') is None
+    assert extract_json_object('{"a" 5, "b": {"c": 1}') is None
+    assert extract_json_object(None) is None
+
+
+def test_truncated_tail_keeps_complete_values():
+    cut = DOCUMENT.index('"time": "10:00"') + 12
+
+    data = extract_json_object(DOCUMENT[:cut])
+
+    assert [day["day"] for day in data["daily_itinerary"]] == [1, 2]
+    assert data["daily_itinerary"][1] == {"day": 2}
+    assert "recommendations" not in data
+    assert extract_json_object('{"a": {"b": [1, 2, {"c": "tru') == {"a": {"b": [1, 2]}}
+
+
+def test_chunked_feed_matches_whole_document():
+    extractor = JSONObjectExtractor()
+    completed_at = None
+    for index in range(0, len(DOCUMENT), 7):
+        if extractor.feed(DOCUMENT[index : index + 7]) and completed_at is None:
+            completed_at = index
+
+    assert extractor.complete
+    assert completed_at < len(DOCUMENT) - 7
+    assert extractor.result() == extract_json_object(DOCUMENT)
+
+
+def test_prompt_template_trailing_comma_no_longer_falls_back(itinerary_request):
+    request = itinerary_request(days=2, destination="北京", budget=3000)
+
+    itinerary = llm_service._parse_llm_itinerary_response(DOCUMENT, request)
+
+    assert itinerary is not None
+    assert itinerary.daily_itinerary[1].activities[0].estimated_cost == 40
+    assert itinerary.total_estimated_cost == 100
+
+
+def test_truncated_response_is_completed_from_the_template_and_not_cached(
+    itinerary_request,
+):
+    request = itinerary_request(days=4, destination="北京", budget=4000)
+    cut = DOCUMENT.index('"time": "10:00"') + 12
+    service = LLMService()
+
+    async def route(providers, call):
+        return service._parse_llm_itinerary_response(DOCUMENT[:cut], request)
+
+    service.router.run = route
+
+    async def scenario():
+        try:
+            itinerary = await service.generate_itinerary(request)
+            return itinerary, await service.generation_cache.get(
+                service._cache_key(request, None), request
+            )
+        finally:
+            await service.aclose()
+
+    itinerary, cached = asyncio.run(scenario())
+
+    assert [day.day for day in itinerary.daily_itinerary] == [1, 2, 3, 4]
+    assert itinerary.end_date == date(2025, 3, 4)
+    # Day 2 was cut off before its first activity.
+    assert all(day.activities for day in itinerary.daily_itinerary)
+    assert cached is None
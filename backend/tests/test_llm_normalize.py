@@ -0,0 +1,80 @@
+from datetime import date
+
+import pytest
+from pydantic import ValidationError
+
+from app.services.llm_normalize import (
+    coerce_bool,
+    coerce_currency,
+    normalize_day,
+    normalize_itinerary,
+)
+
+
+def test_loose_values_are_coerced_in_one_pass(itinerary_request):
+    day = {
+        "activities": [
+            {
+                "time": 9,
+                "activity": ["故宫", "午门"],
+                "location": "故宫",
+                "location_address": {"district": "东城区"},
+                "is_sightseeing": "是",
+                "estimated_cost": "￥1,200.5",
+            },
+            {"time": "12:00", "activity": "午餐", "location": "前门", "notes": ""},
+            "stray text",
+        ]
+    }
+
+    result = normalize_day(day, 2, itinerary_request())
+
+    assert (result.day, result.date) == (3, date(2025, 3, 3))
+    first, second = result.activities
+    assert (first.time, first.activity) == ("9", "故宫 午门")
+    assert first.location_address == '{"district": "东城区"}'
+    assert first.is_sightseeing is True
+    assert first.estimated_cost == 1200.5
+    assert second.estimated_cost is None and second.notes == ""
+    assert result.total_estimated_cost == 1200.5
+    # Defaults are written into the parsed dict instead of a copy.
+    assert day["day"] == 3
+
+
+def test_itinerary_defaults_come_from_the_request(itinerary_request):
+    data = {
+        "destination": ["  "],
+        "budget": "约5000元",
+        "daily_itinerary": [
+            {
+                "day": 1,
+                "total_estimated_cost": "80",
+                "activities": {"time": "9:00", "activity": "a", "location": "b"},
+            },
+            None,
+            {"activities": [{"time": "9:00", "activity": "c", "location": "d"}]},
+        ],
+    }
+
+    itinerary = normalize_itinerary(data, itinerary_request(destination="北京"))
+
+    assert itinerary.destination == "北京"
+    assert (itinerary.start_date, itinerary.end_date) == (
+        date(2025, 3, 1),
+        date(2025, 3, 3),
+    )
+    assert itinerary.budget == 5000
+    assert [day.day for day in itinerary.daily_itinerary] == [1, 3]
+    assert itinerary.daily_itinerary[1].date == date(2025, 3, 3)
+    assert itinerary.total_estimated_cost == 80
+
+
+def test_unrepairable_output_raises(itinerary_request):
+    with pytest.raises(ValidationError):
+        normalize_itinerary({"daily_itinerary": "see below"}, itinerary_request())
+    with pytest.raises(ValidationError):
+        normalize_day(
+            {"activities": [{"time": "9:00", "activity": "a"}]}, 0, itinerary_request()
+        )
+    assert coerce_currency("free") is None
+    assert coerce_bool("否") is False and coerce_bool("maybe") is None
@@ -0,0 +1,148 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.core.config import settings
+from app.services import llm_service as llm_module
+from app.services.llm_router import LLMRouter
+from app.services.llm_service import LLMService
+
+
+def test_rank_prefers_healthy_fast_providers_then_configured_order():
+    router = LLMRouter()
+    assert router.rank(["qwen", "doubao"]) == ["qwen", "doubao"]
+
+    for _ in range(4):
+        router.health("qwen").record(2.0, True)
+        router.health("doubao").record(1.0, True)
+    assert router.rank(["qwen", "doubao"]) == ["doubao", "qwen"]
+
+    for _ in range(6):
+        router.health("doubao").record(0.1, False)
+    assert router.rank(["qwen", "doubao"]) == ["qwen", "doubao"]
+
+
+def test_failed_provider_fails_over_to_the_next(run):
+    router = LLMRouter()
+    calls = []
+
+    async def call(provider):
+        calls.append(provider)
+        if provider == "qwen":
+            raise RuntimeError("upstream 500")
+        return f"from {provider}"
+
+    assert run(router.run(["qwen", "doubao"], call)) == "from doubao"
+    assert calls == ["qwen", "doubao"]
+    assert router.failovers == 1
+    assert router.health("qwen").error_rate == 1.0
+
+
+def test_slow_primary_is_hedged_and_cancelled(run):
+    router = LLMRouter(hedge=True, hedge_min_delay=0.02, min_samples=3)
+    for _ in range(3):
+        router.health("qwen").record(0.01, True)
+    cancelled = []
+
+    async def call(provider):
+        if provider == "qwen":
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(provider)
+                raise
+        return f"from {provider}"
+
+    started = time.perf_counter()
+    result = run(router.run(["qwen", "doubao"], call))
+
+    assert result == "from doubao"
+    assert time.perf_counter() - started < 1
+    assert cancelled == ["qwen"]
+    assert router.hedges == 1 and router.hedge_wins == 1
+    # The outrun call was past its p95, so it counts as a lower bound sample.
+    assert router.health("qwen").calls == 4
+    assert router.health("qwen").percentile(1.0) >= 0.02
+
+
+def test_only_slow_hedge_losers_are_recorded(run):
+    router = LLMRouter(hedge=True, hedge_min_delay=0.02, min_samples=3)
+    for _ in range(3):
+        router.health("qwen").record(0.01, True)
+        router.health("doubao").record(1.0, True)
+
+    async def call(provider):
+        await asyncio.sleep(0.05 if provider == "qwen" else 5)
+        return f"from {provider}"
+
+    async def abandoned():
+        task = asyncio.create_task(router.run(["qwen"], call))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    assert run(router.run(["qwen", "doubao"], call)) == "from qwen"
+    run(abandoned())
+
+    assert router.hedges == 1 and router.hedge_wins == 0
+    # The hedge lost well under Doubao's p95; the abandoned call never ended.
+    assert router.health("doubao").calls == 3
+    assert router.health("qwen").calls == 4
+
+
+class _DoubaoHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests = []
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.requests.append((self.headers["Authorization"], payload))
+        body = json.dumps(
+            {"choices": [{"message": {"role": "assistant", "content": "hello"}}]}
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_doubao_completion_uses_ark_chat_api(monkeypatch, run):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _DoubaoHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(
+        llm_module,
+        "DOUBAO_ENDPOINT",
+        f"http://127.0.0.1:{server.server_address[1]}/api/v3/chat/completions",
+    )
+    monkeypatch.setattr(settings, "DOUBAO_API_KEY", "ark-key")
+    monkeypatch.setattr(settings, "QWEN_API_KEY", None)
+
+    async def scenario():
+        service = LLMService()
+        try:
+            return await service._complete("plan a trip"), service.router.stats()
+        finally:
+            await service.aclose()
+
+    try:
+        content, stats = run(scenario())
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    authorization, payload = _DoubaoHandler.requests[-1]
+    assert content == "hello"
+    assert authorization == "Bearer ark-key"
+    assert payload["model"] == settings.DOUBAO_MODEL
+    assert payload["messages"][-1] == {"role": "user", "content": "plan a trip"}
+    assert stats["providers"]["doubao"]["wins"] == 1
@@ -0,0 +1,286 @@
+import asyncio
+import json
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.core.singleflight import SingleFlight
+from app.services import llm_service as llm_module
+from app.services.llm_scheduler import (
+    LLMScheduler,
+    Priority,
+    QueueTimeoutError,
+    RateLimiter,
+    current_priority,
+    inherit_priority,
+    llm_priority,
+    retry_after,
+    share_priority,
+)
+from app.services.llm_service import LLMService
+
+
+def _status_error(status, headers=None):
+    request = httpx.Request("POST", "https://llm.test/v1")
+    response = httpx.Response(status, headers=headers, request=request)
+    return httpx.HTTPStatusError(str(status), request=request, response=response)
+
+
+def test_token_budget_delays_calls_until_refilled(run):
+    async def scenario():
+        limiter = RateLimiter(tpm=6000)
+        assert await limiter.acquire(6000) < 0.01
+        waited = await limiter.acquire(10)
+        return limiter, waited
+
+    limiter, waited = run(scenario())
+
+    assert 0.05 < waited < 0.5
+    assert limiter.stats()["granted"] == 2
+    assert limiter.stats()["wait_max"] == waited
+
+
+def test_interactive_calls_overtake_background_and_deadlines_fail_fast(run):
+    async def scenario():
+        limiter = RateLimiter(qps=20)
+        for _ in range(20):
+            await limiter.acquire()
+        order = []
+
+        async def call(name, priority):
+            await limiter.acquire(priority=priority)
+            order.append(name)
+
+        background = asyncio.create_task(call("background", Priority.BACKGROUND))
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(call("interactive", Priority.INTERACTIVE))
+        await asyncio.sleep(0)
+        depth = limiter.stats()["queued"]
+        with pytest.raises(QueueTimeoutError):
+            await limiter.acquire(deadline=time.monotonic() + 0.01)
+        await asyncio.gather(background, interactive)
+        return limiter, order, depth
+
+    limiter, order, depth = run(scenario())
+
+    assert order == ["interactive", "background"]
+    assert depth == 2
+    assert limiter.expired == 1
+    assert limiter.stats()["queued"] == 0
+
+
+def test_retry_after_pauses_the_key_and_retries(run):
+    scheduler = LLMScheduler({"qwen": (0, 60)}, retry_base_delay=5)
+    attempts = []
+
+    async def request():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise _status_error(429, {"Retry-After": "0.05"})
+        return {"usage": {"total_tokens": 30}}
+
+    result = run(
+        scheduler.call(
+            "qwen", "key", request, tokens=10, usage=LLMService._usage_tokens
+        )
+    )
+
+    limiter = scheduler.limiter("qwen", "key")
+    assert result == {"usage": {"total_tokens": 30}}
+    assert attempts[1] - attempts[0] >= 0.05
+    assert (limiter.throttled, limiter.retries) == (1, 1)
+    # Both attempts were charged the estimate, then corrected to the usage.
+    assert 20 <= limiter.tokens.level < 21
+    (label,) = scheduler.stats()
+    assert label.startswith("qwen:") and "key" not in label
+
+
+def test_non_retryable_and_out_of_time_errors_are_raised(run):
+    scheduler = LLMScheduler({}, queue_timeout=1)
+    calls = []
+
+    async def rejected():
+        calls.append("rejected")
+        raise _status_error(400)
+
+    async def throttled():
+        calls.append("throttled")
+        raise _status_error(503, {"Retry-After": "30"})
+
+    with pytest.raises(httpx.HTTPStatusError):
+        run(scheduler.call("doubao", "key", rejected))
+    with pytest.raises(httpx.HTTPStatusError):
+        run(scheduler.call("doubao", "key", throttled))
+
+    assert calls == ["rejected", "throttled"]
+    assert scheduler.limiter("doubao", "key").stats()["paused_for"] > 25
+    later = formatdate(time.time() + 60, usegmt=True)
+    assert 55 < retry_after(_status_error(429, {"Retry-After": later}).response) <= 60
+
+
+def test_background_priority_comes_from_context(run):
+    seen = []
+
+    async def job():
+        llm_priority.set(Priority.BACKGROUND)
+        seen.append(llm_priority.get())
+
+    async def scenario():
+        await asyncio.create_task(job())
+        seen.append(llm_priority.get())
+
+    run(scenario())
+    assert seen == [Priority.BACKGROUND, Priority.INTERACTIVE]
+
+
+def test_interactive_caller_raises_priority_of_shared_background_call(run):
+    flight = SingleFlight(start=share_priority, join=inherit_priority)
+    seen = []
+
+    async def generate(release):
+        seen.append(current_priority())
+        # Work the call spawns runs in a copy of its context.
+        await asyncio.create_task(release.wait())
+        seen.append(await asyncio.create_task(_priority()))
+        return "itinerary"
+
+    async def background(release):
+        llm_priority.set(Priority.BACKGROUND)
+        return await flight.do("trip", lambda: generate(release))
+
+    async def scenario():
+        release = asyncio.Event()
+        job = asyncio.create_task(background(release))
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(flight.do("trip", lambda: generate(release)))
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(job, interactive)
+
+    assert run(scenario()) == ["itinerary", "itinerary"]
+    assert seen == [Priority.BACKGROUND, Priority.INTERACTIVE]
+
+
+async def _priority():
+    return current_priority()
+
+
+def test_joining_caller_requeues_calls_of_a_shared_generation(
+    monkeypatch, run, itinerary_request
+):
+    monkeypatch.setattr(settings, "QWEN_API_KEY", "qwen-key")
+    monkeypatch.setattr(settings, "DOUBAO_API_KEY", None)
+    service = LLMService()
+    service.provider = "qwen"
+    service.scheduler.limits["qwen"] = (5, 0)
+    limiter = service.scheduler.limiter("qwen", "qwen-key")
+    limiter.requests.level = 0  # next call in 0.2s
+    document = json.dumps(
+        {
+            "destination": "Beijing",
+            "budget": 3000,
+            "daily_itinerary": [
+                {"day": 1, "activities": [{"time": "09:00", "activity": "Museum"}]},
+                {"day": 2, "activities": [{"time": "10:00", "activity": "Wall"}]},
+            ],
+        }
+    )
+    request = itinerary_request(days=2)
+    served = []
+
+    async def post(provider, url, headers, payload):
+        served.append("generation")
+        return {"output": {"text": document}}
+
+    service._post = post
+
+    async def other_background_call():
+        # Queued first and due sooner, so it beats a background generation.
+        await limiter.acquire(0, Priority.BACKGROUND, time.monotonic() + 5)
+        served.append("other")
+
+    async def background_job():
+        llm_priority.set(Priority.BACKGROUND)
+        return await service.generate_itinerary(request)
+
+    async def scenario():
+        other = asyncio.create_task(other_background_call())
+        await asyncio.sleep(0)
+        job = asyncio.create_task(background_job())
+        while len(limiter._queue) < 2:
+            await asyncio.sleep(0.01)
+        try:
+            interactive = await service.generate_itinerary(request)
+            await asyncio.gather(job, other)
+            return interactive
+        finally:
+            await service.aclose()
+
+    itinerary = run(scenario())
+
+    assert [day.day for day in itinerary.daily_itinerary] == [1, 2]
+    assert service.in_flight.stats()["shared"] == 1
+    assert served == ["generation", "other"]
+
+
+class _ThrottlingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    calls = 0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        type(self).calls += 1
+        if self.calls == 1:
+            status, body = 429, {"error": {"code": "RateLimitExceeded"}}
+        else:
+            status = 200
+            body = {
+                "choices": [{"message": {"content": "hello"}}],
+                "usage": {"prompt_tokens": 40, "completion_tokens": 60},
+            }
+        encoded = json.dumps(body).encode()
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_provider_429_is_retried_instead_of_falling_back(monkeypatch, run):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ThrottlingHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(
+        llm_module,
+        "DOUBAO_ENDPOINT",
+        f"http://127.0.0.1:{server.server_address[1]}/api/v3/chat/completions",
+    )
+    monkeypatch.setattr(settings, "DOUBAO_API_KEY", "ark-key")
+
+    async def scenario():
+        service = LLMService()
+        try:
+            return await service._complete_doubao("plan a trip"), service.scheduler
+        finally:
+            await service.aclose()
+
+    try:
+        content, scheduler = run(scenario())
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert content == "hello"
+    stats = scheduler.limiter("doubao", "ark-key").stats()
+    assert (stats["throttled"], stats["retries"], stats["granted"]) == (1, 1, 2)
+    assert LLMService._usage_tokens({"usage": {"input_tokens": 5}}) == 5
@@ -0,0 +1,184 @@
+import asyncio
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.services.llm_service import LLMService
+from app.services.llm_stream import DayStreamParser
+
+DOCUMENT = json.dumps(
+    {
+        "destination": "北京 {not a brace}",
+        "budget": 3000,
+        "daily_itinerary": [
+            {
+                "day": 1,
+                "activities": [
+                    {"time": "09:00", "activity": "故宫", "location": '"东城"'}
+                ],
+            },
+            {"day": 2, "activities": [{"time": "10:00", "activity": "长城"}]},
+        ],
+        "recommendations": "[早出发]",
+    },
+    ensure_ascii=False,
+)
+
+
+def test_day_parser_emits_each_day_as_soon_as_it_closes():
+    parser = DayStreamParser()
+    emitted = []
+    for offset in range(0, len(DOCUMENT), 7):
+        for index, day in parser.feed(DOCUMENT[offset : offset + 7]):
+            emitted.append((index, day["day"], offset))
+
+    assert [(index, day) for index, day, _ in emitted] == [(0, 1), (1, 2)]
+    # Day 1 is available well before the document ends.
+    assert emitted[0][2] < DOCUMENT.index('"day": 2')
+    assert parser.text == DOCUMENT
+
+
+def test_day_parser_tolerates_trailing_commas():
+    parser = DayStreamParser()
+    days = parser.feed('{"daily_itinerary": [{"day": 1, "activities": [],},]}')
+    assert days == [(0, {"day": 1, "activities": []})]
+
+
+def test_stream_endpoint_sends_days_then_saved_itinerary(auth_headers):
+    client = TestClient(app)
+    headers = auth_headers("streamuser")
+
+    response = client.post(
+        "/api/itineraries/stream",
+        json={
+            "destination": "Xi'an",
+            "start_date": "2025-05-01",
+            "end_date": "2025-05-03",
+            "budget": 3000,
+        },
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        name, data = block.split("\n")
+        events.append((name[len("event: ") :], json.loads(data[len("data: ") :])))
+
+    assert [name for name, _ in events] == ["day", "day", "day", "complete"]
+    assert [payload["day"] for _, payload in events[:3]] == [1, 2, 3]
+    saved = events[-1][1]
+    assert saved["id"]
+    fetched = client.get(f"/api/itineraries/{saved['id']}", headers=headers)
+    assert fetched.status_code == 200
+
+
+def test_broken_stream_completes_with_the_days_already_sent(
+    monkeypatch, itinerary_request
+):
+    monkeypatch.setattr(settings, "QWEN_API_KEY", "qwen-key")
+    service = LLMService()
+    service.provider = "qwen"
+    cut = DOCUMENT.index('"day": 2')
+
+    async def broken_stream(prompt):
+        yield DOCUMENT[:cut]
+        raise httpx.ReadError("connection reset")
+
+    service._stream_qwen = broken_stream
+    request = itinerary_request(destination="北京", budget=3000)
+
+    async def scenario():
+        try:
+            return [
+                event
+                async for event in service.stream_itinerary(request, use_cache=False)
+            ]
+        finally:
+            await service.aclose()
+
+    events = asyncio.run(scenario())
+
+    assert [name for name, _ in events] == ["day", "itinerary"]
+    streamed, itinerary = events[0][1], events[1][1]
+    assert itinerary.daily_itinerary[0] == streamed
+    assert [day.day for day in itinerary.daily_itinerary] == [1, 2, 3]
+    assert itinerary.daily_itinerary[1].activities
+
+
+def test_stream_open_is_retried_and_settles_reported_usage(monkeypatch):
+    monkeypatch.setattr(settings, "QWEN_API_KEY", "qwen-key")
+    service = LLMService()
+    attempts = []
+    events = [
+        {"output": {"text": "Hel"}, "usage": {"input_tokens": 10, "output_tokens": 1}},
+        {"output": {"text": "lo"}, "usage": {"input_tokens": 10, "output_tokens": 20}},
+    ]
+
+    def handler(request):
+        attempts.append(request.url.path)
+        if len(attempts) == 1:
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        body = "".join(f"data:{json.dumps(event)}\n\n" for event in events)
+        return httpx.Response(
+            200, headers={"Content-Type": "text/event-stream"}, content=body
+        )
+
+    service.http._clients["qwen"] = httpx.AsyncClient(
+        transport=httpx.MockTransport(handler)
+    )
+    limiter = service.scheduler.limiter("qwen", "qwen-key")
+    settled = []
+    limiter.settle = lambda estimated, actual: settled.append(actual)
+
+    async def scenario():
+        try:
+            return [chunk async for chunk in service._stream_qwen("plan a trip")]
+        finally:
+            await service.aclose()
+
+    assert asyncio.run(scenario()) == ["Hel", "lo"]
+    assert len(attempts) == 2
+    assert (limiter.throttled, limiter.retries) == (1, 1)
+    assert settled == [30]
+
+
+def test_stream_that_cannot_start_falls_back_to_generation(
+    monkeypatch, itinerary_request
+):
+    monkeypatch.setattr(settings, "QWEN_API_KEY", "qwen-key")
+    service = LLMService()
+    service.provider = "qwen"
+    request = itinerary_request(days=2, destination="北京", budget=3000)
+    generated = service._generate_fallback_itinerary(request, 2)
+    calls = []
+
+    async def unavailable(prompt):
+        raise httpx.ConnectError("connection refused")
+        yield  # pragma: no cover - makes this an async generator
+
+    async def generate_itinerary(request, prompt=None, use_cache=True):
+        calls.append(use_cache)
+        return generated
+
+    service._stream_qwen = unavailable
+    service.generate_itinerary = generate_itinerary
+
+    async def scenario():
+        try:
+            return [
+                event
+                async for event in service.stream_itinerary(request, use_cache=False)
+            ]
+        finally:
+            await service.aclose()
+
+    events = asyncio.run(scenario())
+
+    assert calls == [False]
+    assert [name for name, _ in events] == ["day", "day", "itinerary"]
+    assert events[-1][1] is generated
@@ -0,0 +1,147 @@
+import pytest
+
+from app.repositories.sqlite_repository import SQLiteRepository
+
+
+def test_sqlite_insert_select_order_limit(run):
+    """Inserted rows come back filtered, ordered and limited."""
+
+    async def scenario():
+        repo = SQLiteRepository()
+        for index in range(3):
+            await repo.table("expenses").insert(
+                {
+                    "user_id": "alice",
+                    "itinerary_id": "trip1",
+                    "category": "food",
+                    "amount": 10.0 * (index + 1),
+                    "description": f"meal {index}",
+                    "date": f"2024-03-1{index}T12:00:00",
+                    "created_at": f"2024-03-1{index}T12:00:00",
+                }
+            ).execute()
+        await repo.table("expenses").insert(
+            {
+                "user_id": "bob",
+                "category": "food",
+                "amount": 99.0,
+                "description": "other user",
+                "date": "2024-03-10T12:00:00",
+            }
+        ).execute()
+
+        result = (
+            await repo.table("expenses")
+            .select("id, amount")
+            .eq("user_id", "alice")
+            .order("created_at", desc=True)
+            .limit(2)
+            .execute()
+        )
+        await repo.aclose()
+        return result.data
+
+    rows = run(scenario())
+    assert [row["amount"] for row in rows] == [30.0, 20.0]
+    assert set(rows[0]) == {"id", "amount"}
+
+
+def test_sqlite_update_delete_and_json_columns(run):
+    """Updates and deletes are scoped by filters and JSON columns round-trip."""
+
+    async def scenario():
+        repo = SQLiteRepository()
+        inserted = (
+            await repo.table("itineraries")
+            .insert(
+                {
+                    "user_id": "alice",
+                    "destination": "Beijing",
+                    "start_date": "2024-03-15",
+                    "end_date": "2024-03-16",
+                    "budget": 5000.0,
+                    "daily_itinerary": [{"day": 1, "activities": []}],
+                    "total_estimated_cost": 1000.0,
+                }
+            )
+            .execute()
+        )
+        itinerary_id = inserted.data[0]["id"]
+
+        foreign = (
+            await repo.table("itineraries")
+            .update({"destination": "Shanghai"})
+            .eq("id", itinerary_id)
+            .eq("user_id", "mallory")
+            .execute()
+        )
+        updated = (
+            await repo.table("itineraries")
+            .update({"destination": "Shanghai"})
+            .eq("id", itinerary_id)
+            .eq("user_id", "alice")
+            .execute()
+        )
+        deleted = (
+            await repo.table("itineraries")
+            .delete()
+            .eq("id", itinerary_id)
+            .returning("id")
+            .execute()
+        )
+        remaining = await repo.table("itineraries").select("*").execute()
+        await repo.aclose()
+        return inserted.data[0], foreign.data, updated.data, deleted.data, remaining
+
+    inserted, foreign, updated, deleted, remaining = run(scenario())
+    assert inserted["daily_itinerary"] == [{"day": 1, "activities": []}]
+    assert inserted["created_at"]
+    assert foreign == []
+    assert updated[0]["destination"] == "Shanghai"
+    assert deleted == [{"id": inserted["id"]}]
+    assert remaining.data == []
+
+
+def test_sqlite_rejects_unknown_columns(run):
+    """Column names are validated before being interpolated into SQL."""
+    repo = SQLiteRepository()
+    try:
+        with pytest.raises(ValueError):
+            run(repo.table("expenses").select("*").eq("amount; DROP", 1).execute())
+        # Writes reject unknown columns instead of silently dropping them.
+        with pytest.raises(ValueError, match="amout"):
+            run(repo.table("expenses").insert({"user_id": "u", "amout": 5}).execute())
+    finally:
+        run(repo.aclose())
+
+
+def test_sqlite_expense_summary_groups_all_rows(run):
+    """The expense_summary function aggregates every row, not just a page."""
+
+    async def scenario():
+        repo = SQLiteRepository()
+        rows = [
+            {
+                "user_id": "alice",
+                "itinerary_id": "trip1" if index % 2 else "trip2",
+                "category": "food" if index % 3 else "transportation",
+                "amount": 2.0,
+                "description": "item",
+                "date": "2024-03-10T12:00:00",
+            }
+            for index in range(150)
+        ]
+        await repo.table("expenses").insert(rows).execute()
+        everything = await repo.rpc(
+            "expense_summary", {"p_user_id": "alice", "p_itinerary_id": None}
+        )
+        one_trip = await repo.rpc(
+            "expense_summary", {"p_user_id": "alice", "p_itinerary_id": "trip1"}
+        )
+        await repo.aclose()
+        return everything.data, one_trip.data
+
+    everything, one_trip = run(scenario())
+    totals = {row["category"]: (row["total"], row["count"]) for row in everything}
+    assert totals == {"food": (200.0, 100), "transportation": (100.0, 50)}
+    assert sum(row["count"] for row in one_trip) == 75
@@ -0,0 +1,199 @@
+from datetime import datetime
+
+from app.core.database import get_repository
+from app.core.pagination import decode_cursor, encode_cursor
+from app.schemas.expense import ExpenseCategory, ExpenseCreate, ExpenseUpdate
+from app.services import expense_service as expense_service_module
+from app.services.expense_rollup import ExpenseRollup, ExpenseRollupStore
+from app.services.expense_service import expense_service
+
+
+def test_expense_rollup_tracks_writes_and_reconciles(run):
+    """Summaries follow create/update/delete deltas and reconcile repairs drift."""
+
+    async def scenario():
+        user = "rollupuser"
+        first = await expense_service.create_expense(
+            user,
+            ExpenseCreate(
+                itinerary_id="trip1", category="food", amount=50, description="lunch"
+            ),
+        )
+        before = await expense_service.get_expense_summary(user, "trip1")
+
+        second = await expense_service.create_expense(
+            user,
+            ExpenseCreate(
+                itinerary_id="trip1", category="food", amount=30, description="tea"
+            ),
+        )
+        await expense_service.update_expense(
+            first.id, user, ExpenseUpdate(category="shopping", amount=70)
+        )
+        await expense_service.delete_expense(second.id, user)
+        after = await expense_service.get_expense_summary(user, "trip1")
+        clean_drift = await expense_service.reconcile_rollups()
+
+        # A write from another process bypasses the in-process rollup.
+        await get_repository().table("expenses").insert(
+            {
+                "user_id": user,
+                "itinerary_id": "trip1",
+                "category": "food",
+                "amount": 5.0,
+                "description": "external",
+                "date": "2024-03-10T12:00:00",
+            }
+        ).execute()
+        drift = await expense_service.reconcile_rollups()
+        reconciled = await expense_service.get_expense_summary(user, "trip1")
+        return before, after, clean_drift, drift, reconciled
+
+    before, after, clean_drift, drift, reconciled = run(scenario())
+    assert before.total_expenses == 50 and before.count == 1
+    assert after.by_category == {ExpenseCategory.SHOPPING: 70.0}
+    assert after.count == 1
+    assert clean_drift == 0
+    assert drift >= 1
+    assert reconciled.total_expenses == 75 and reconciled.count == 2
+
+
+def test_expense_summary_sums_rows_when_rpc_fails(run, monkeypatch):
+    """A failing ``expense_summary`` function falls back to paging the rows."""
+
+    async def failing_rpc(name, params):
+        raise RuntimeError("function expense_summary does not exist")
+
+    monkeypatch.setattr(expense_service.db, "rpc", failing_rpc)
+    monkeypatch.setattr(expense_service_module, "SUMMARY_PAGE_SIZE", 2)
+
+    async def scenario():
+        user = "rpcfallbackuser"
+        for category, amount in [("food", 10), ("food", 15), ("transportation", 30)]:
+            await expense_service.create_expense(
+                user,
+                ExpenseCreate(
+                    itinerary_id="trip1",
+                    category=category,
+                    amount=amount,
+                    description=category,
+                ),
+            )
+        await expense_service.create_expense(
+            user,
+            ExpenseCreate(
+                itinerary_id="trip2", category="food", amount=99, description="food"
+            ),
+        )
+        return await expense_service.get_expense_summary(user, "trip1")
+
+    summary = run(scenario())
+    assert summary.total_expenses == 55 and summary.count == 3
+    assert summary.by_category == {
+        ExpenseCategory.FOOD: 25.0,
+        ExpenseCategory.TRANSPORTATION: 30.0,
+    }
+
+
+def test_invalidated_user_rollup_is_not_restored_by_inflight_load():
+    store = ExpenseRollupStore(max_entries=8)
+    key = ("rollupuser", "trip1")
+
+    store.begin_load(key)
+    store.invalidate_user("rollupuser")
+
+    assert store.finish_load(key, ExpenseRollup.from_rows([])) is False
+    assert store.get(key) is None
+
+
+def test_expense_keyset_pagination_walks_every_row_once(run):
+    """Cursor pages cover all rows, including created_at ties, without overlap."""
+
+    async def scenario():
+        user = "pageuser"
+        rows = [
+            {
+                "user_id": user,
+                "itinerary_id": "trip1",
+                "category": "food",
+                "amount": 1.0 + index,
+                "description": f"item {index}",
+                "date": "2024-03-10T12:00:00",
+                "created_at": f"2024-03-1{index // 2}T12:00:00",
+            }
+            for index in range(5)
+        ]
+        await get_repository().table("expenses").insert(rows).execute()
+
+        seen, cursor, pages = [], None, 0
+        while True:
+            page = await expense_service.list_expenses_page(
+                user, limit=2, cursor=cursor
+            )
+            pages += 1
+            seen.extend(expense.id for expense in page.items)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        return seen, pages
+
+    seen, pages = run(scenario())
+    assert pages == 3
+    assert len(seen) == len(set(seen)) == 5
+
+
+def test_cursor_keeps_sub_second_created_at(run):
+    """Rows created within one second page in order, none skipped or repeated."""
+
+    async def scenario():
+        user = "microsecondpageuser"
+        created = [
+            await expense_service.create_expense(
+                user,
+                ExpenseCreate(
+                    itinerary_id="trip1", category="food", amount=n, description="x"
+                ),
+            )
+            for n in range(1, 5)
+        ]
+        seen, cursor = [], None
+        while True:
+            page = await expense_service.list_expenses_page(
+                user, limit=1, cursor=cursor
+            )
+            seen.extend(expense.id for expense in page.items)
+            cursor = page.next_cursor
+            if cursor is None:
+                return created, seen
+
+    created, seen = run(scenario())
+    assert seen == [expense.id for expense in reversed(created)]
+    created_at, _ = decode_cursor(encode_cursor(datetime(2024, 3, 10, 12), "x"))
+    assert created_at == "2024-03-10T12:00:00.000000"
+
+
+def test_itinerary_summary_view_skips_daily_itinerary(run):
+    """The summary projection returns list fields without the day plans."""
+    from app.schemas.itinerary import ItinerarySummary, ItineraryView
+    from app.services.travel_service import travel_service
+
+    async def scenario():
+        await get_repository().table("itineraries").insert(
+            {
+                "user_id": "summaryuser",
+                "destination": "Hangzhou",
+                "start_date": "2024-04-01",
+                "end_date": "2024-04-03",
+                "budget": 3000.0,
+                "daily_itinerary": [{"day": 1, "date": "2024-04-01", "activities": []}],
+                "total_estimated_cost": 2000.0,
+            }
+        ).execute()
+        return await travel_service.list_itineraries_page(
+            "summaryuser", view=ItineraryView.SUMMARY
+        )
+
+    page = run(scenario())
+    assert len(page.items) == 1
+    assert isinstance(page.items[0], ItinerarySummary)
+    assert "daily_itinerary" not in page.items[0].model_dump()
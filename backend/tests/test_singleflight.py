@@ -0,0 +1,109 @@
+import asyncio
+from datetime import date
+
+import pytest
+
+from app.core.config import settings
+from app.core.singleflight import SingleFlight
+from app.services.generation_cache import GenerationCache
+from app.services.llm_service import LLMService
+
+
+def test_concurrent_callers_share_one_call_and_its_errors(run):
+    flight = SingleFlight()
+    calls = []
+
+    async def work(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        if value == "boom":
+            raise ValueError(value)
+        return value
+
+    async def scenario():
+        results = await asyncio.gather(
+            *(flight.do("k", lambda: work("ok")) for _ in range(5))
+        )
+        errors = await asyncio.gather(
+            *(flight.do("e", lambda: work("boom")) for _ in range(3)),
+            return_exceptions=True,
+        )
+        return results, errors
+
+    results, errors = run(scenario())
+
+    assert results == ["ok"] * 5
+    assert all(isinstance(error, ValueError) for error in errors)
+    assert calls == ["ok", "boom"]
+    assert flight.stats() == {"in_flight": 0, "calls": 2, "shared": 6, "cancelled": 0}
+
+
+def test_shared_call_survives_until_last_waiter_cancels(run):
+    flight = SingleFlight()
+    started = []
+    finished = []
+
+    async def work():
+        started.append(True)
+        await asyncio.sleep(0.05)
+        finished.append(True)
+        return "done"
+
+    async def scenario():
+        first = asyncio.create_task(flight.do("k", work))
+        second = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        survivor = await second
+
+        third = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        third.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await third
+        await asyncio.sleep(0.06)
+        return survivor
+
+    assert run(scenario()) == "done"
+    assert len(started) == 2
+    assert len(finished) == 1
+    assert flight.stats()["cancelled"] == 1
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_llm_service_coalesces_identical_generations(
+    monkeypatch, run, itinerary_request
+):
+    monkeypatch.setattr(settings, "QWEN_API_KEY", "test-key")
+    service = LLMService()
+    service.provider = "qwen"
+    service.generation_cache = GenerationCache(None, budget_step=500)
+    calls = []
+
+    async def generate(prompt, request):
+        calls.append(prompt)
+        await asyncio.sleep(0.01)
+        return service._generate_fallback_itinerary(request, 3)
+
+    service._generate_with_qwen = generate
+
+    first = itinerary_request()
+    second = first.model_copy(
+        update={"start_date": date(2025, 6, 1), "end_date": date(2025, 6, 3)}
+    )
+
+    async def scenario():
+        return await asyncio.gather(
+            service.generate_itinerary(first, prompt="same"),
+            service.generate_itinerary(second, prompt="same"),
+        )
+
+    a, b = run(scenario())
+
+    assert len(calls) == 1
+    assert a is not b
+    assert a.start_date == date(2025, 3, 1)
+    assert b.start_date == date(2025, 6, 1)
+    assert b.daily_itinerary[-1].date == date(2025, 6, 3)
@@ -0,0 +1,71 @@
+import pytest
+
+from app.core.config import settings
+from app.schemas.expense import ExpenseCreate, ExpenseUpdate
+from app.services.expense_service import expense_service
+from app.services.sync_service import encode_sync_token, sync_service
+
+
+async def _create(user, amount):
+    return await expense_service.create_expense(
+        user,
+        ExpenseCreate(
+            itinerary_id="trip1", category="food", amount=amount, description="x"
+        ),
+    )
+
+
+def test_sync_changes_returns_deltas_and_tombstones(monkeypatch, run):
+    """Only records touched after the token come back; deletes are tombstones."""
+    monkeypatch.setattr(settings, "SYNC_VISIBILITY_MARGIN_SECONDS", 0)
+
+    async def scenario():
+        user = "syncuser"
+        first = await _create(user, 10)
+        second = await _create(user, 20)
+        initial = await sync_service.get_changes(user)
+
+        third = await _create(user, 30)
+        await expense_service.update_expense(first.id, user, ExpenseUpdate(amount=15))
+        await expense_service.delete_expense(second.id, user)
+        delta = await sync_service.get_changes(user, since=initial.next_token)
+        idle = await sync_service.get_changes(user, since=delta.next_token)
+
+        paged = await sync_service.get_changes(user, limit=1)
+        other = await sync_service.get_changes("someone-else")
+        return first, second, third, initial, delta, idle, paged, other
+
+    first, second, third, initial, delta, idle, paged, other = run(scenario())
+
+    assert {e.id for e in initial.expenses} == {first.id, second.id}
+    assert sorted((e.id, e.amount) for e in delta.expenses) == sorted(
+        [(first.id, 15), (third.id, 30)]
+    )
+    assert [(t.entity.value, t.id) for t in delta.deleted] == [("expense", second.id)]
+    assert idle.expenses == [] and idle.deleted == []
+    assert idle.next_token == delta.next_token
+    assert paged.has_more and len(paged.expenses) == 1
+    assert other.expenses == []
+
+
+def test_recent_changes_are_resent_until_settled(monkeypatch, run):
+    """The token does not pass changes that a slower commit could precede."""
+    monkeypatch.setattr(settings, "SYNC_VISIBILITY_MARGIN_SECONDS", 60)
+
+    async def scenario():
+        user = "syncmarginuser"
+        created = await _create(user, 10)
+        first = await sync_service.get_changes(user, limit=1)
+        second = await sync_service.get_changes(user, since=first.next_token)
+        return created, first, second
+
+    created, first, second = run(scenario())
+
+    assert [e.id for e in first.expenses] == [created.id]
+    assert first.next_token == encode_sync_token(0) and not first.has_more
+    assert [e.id for e in second.expenses] == [created.id]
+
+
+def test_sync_rejects_malformed_token(run):
+    with pytest.raises(ValueError):
+        run(sync_service.get_changes("syncuser", since="not-a-token"))
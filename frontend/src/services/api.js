@@ -1,6 +1,6 @@
 import axios from 'axios';
 
-const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000/api';
+export const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000/api';
 
 const apiClient = axios.create({
   baseURL: API_BASE_URL,
@@ -9,13 +9,23 @@ const apiClient = axios.create({
   },
 });
 
+// Auth headers for the current session (also used by fetch-based streaming calls)
+export const getAuthHeaders = () => {
+  const accessToken = localStorage.getItem('accessToken');
+  const userId = localStorage.getItem('userId');
+  if (accessToken) {
+    return { Authorization: `Bearer ${accessToken}` };
+  }
+  if (userId) {
+    return { 'X-User-ID': userId };
+  }
+  return {};
+};
+
 // Request interceptor for adding auth token
 apiClient.interceptors.request.use(
   (config) => {
-    const userId = localStorage.getItem('userId');
-    if (userId) {
-      config.headers['X-User-ID'] = userId;
-    }
+    Object.assign(config.headers, getAuthHeaders());
     return config;
   },
   (error) => {
@@ -26,6 +36,7 @@ apiClient.interceptors.request.use(
 export default apiClient;
 
 export const clearAuthHeader = () => {
+  localStorage.removeItem('accessToken');
   localStorage.removeItem('userId');
   localStorage.removeItem('username');
 };
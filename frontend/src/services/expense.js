@@ -7,7 +7,7 @@ export const expenseService = {
     return response.data;
   },
 
-  // Get all expenses
+  // Get a page of expenses ({ items, next_cursor })
   async getExpenses(params = {}) {
     const response = await apiClient.get('/expenses/', { params });
     return response.data;
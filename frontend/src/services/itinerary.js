@@ -1,4 +1,19 @@
-import apiClient from './api';
+import apiClient, { API_BASE_URL, getAuthHeaders } from './api';
+
+// Split a Server-Sent Events buffer into complete { event, data } messages.
+const takeEvents = (buffer) => {
+  const blocks = buffer.split('\n\n');
+  const rest = blocks.pop();
+  const events = blocks.map((block) => {
+    const message = { event: 'message', data: '' };
+    for (const line of block.split('\n')) {
+      if (line.startsWith('event:')) message.event = line.slice(6).trim();
+      else if (line.startsWith('data:')) message.data += line.slice(5).trim();
+    }
+    return message;
+  });
+  return { events, rest };
+};
 
 export const itineraryService = {
   // Create a new itinerary
@@ -7,15 +22,47 @@ export const itineraryService = {
     return response.data;
   },
 
+  // Create an itinerary over SSE; onDay is called as each day is generated.
+  // Resolves with the saved itinerary.
+  async streamItinerary(data, onDay) {
+    const response = await fetch(`${API_BASE_URL}/itineraries/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', ...getAuthHeaders() },
+      body: JSON.stringify(data),
+    });
+    if (!response.ok || !response.body) {
+      throw new Error(`行程生成失败（${response.status}）`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const { events, rest } = takeEvents(buffer);
+      buffer = rest;
+      for (const { event, data: payload } of events) {
+        const body = JSON.parse(payload);
+        if (event === 'day') onDay?.(body);
+        else if (event === 'complete') return body;
+        else if (event === 'error') throw new Error(body.detail);
+      }
+    }
+    throw new Error('行程生成中断，请稍后重试');
+  },
+
   // Create itinerary from natural language text
   async createItineraryFromText(data) {
     const response = await apiClient.post('/itineraries/from-text', data);
     return response.data;
   },
 
-  // Get all itineraries
-  async getItineraries(limit = 20) {
-    const response = await apiClient.get('/itineraries/', { params: { limit } });
+  // Get a page of itinerary summaries ({ items, next_cursor })
+  async getItineraries(limit = 20, cursor = null) {
+    const params = cursor ? { limit, cursor, view: 'summary' } : { limit, view: 'summary' };
+    const response = await apiClient.get('/itineraries/', { params });
     return response.data;
   },
 
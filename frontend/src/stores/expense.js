@@ -4,6 +4,9 @@ import { expenseService } from '../services/expense';
 export const useExpenseStore = defineStore('expense', {
   state: () => ({
     expenses: [],
+    nextCursor: null,
+    loadingMore: false,
+    lastParams: {},
     summary: null,
     loading: false,
     error: null,
@@ -14,7 +17,10 @@ export const useExpenseStore = defineStore('expense', {
       this.loading = true;
       this.error = null;
       try {
-        this.expenses = await expenseService.getExpenses(params);
+        const page = await expenseService.getExpenses(params);
+        this.expenses = page.items;
+        this.nextCursor = page.next_cursor;
+        this.lastParams = params;
       } catch (error) {
         this.error = error.message;
         console.error('Error fetching expenses:', error);
@@ -23,6 +29,25 @@ export const useExpenseStore = defineStore('expense', {
       }
     },
 
+    async fetchMoreExpenses() {
+      if (!this.nextCursor || this.loadingMore) return;
+      this.loadingMore = true;
+      this.error = null;
+      try {
+        const page = await expenseService.getExpenses({
+          ...this.lastParams,
+          cursor: this.nextCursor,
+        });
+        this.expenses.push(...page.items);
+        this.nextCursor = page.next_cursor;
+      } catch (error) {
+        this.error = error.message;
+        console.error('Error fetching expenses:', error);
+      } finally {
+        this.loadingMore = false;
+      }
+    },
+
     async createExpense(data) {
       this.loading = true;
       this.error = null;
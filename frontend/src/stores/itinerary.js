@@ -4,6 +4,8 @@ import { itineraryService } from '../services/itinerary';
 export const useItineraryStore = defineStore('itinerary', {
   state: () => ({
     itineraries: [],
+    nextCursor: null,
+    loadingMore: false,
     currentItinerary: null,
     loading: false,
     error: null,
@@ -14,7 +16,9 @@ export const useItineraryStore = defineStore('itinerary', {
       this.loading = true;
       this.error = null;
       try {
-        this.itineraries = await itineraryService.getItineraries();
+        const page = await itineraryService.getItineraries();
+        this.itineraries = page.items;
+        this.nextCursor = page.next_cursor;
       } catch (error) {
         this.error = error.message;
         console.error('Error fetching itineraries:', error);
@@ -23,6 +27,22 @@ export const useItineraryStore = defineStore('itinerary', {
       }
     },
 
+    async fetchMoreItineraries() {
+      if (!this.nextCursor || this.loadingMore) return;
+      this.loadingMore = true;
+      this.error = null;
+      try {
+        const page = await itineraryService.getItineraries(20, this.nextCursor);
+        this.itineraries.push(...page.items);
+        this.nextCursor = page.next_cursor;
+      } catch (error) {
+        this.error = error.message;
+        console.error('Error fetching itineraries:', error);
+      } finally {
+        this.loadingMore = false;
+      }
+    },
+
     async createItinerary(data) {
       this.loading = true;
       this.error = null;
@@ -39,6 +59,22 @@ export const useItineraryStore = defineStore('itinerary', {
       }
     },
 
+    async streamItinerary(data, onDay) {
+      this.loading = true;
+      this.error = null;
+      try {
+        const newItinerary = await itineraryService.streamItinerary(data, onDay);
+        this.itineraries.unshift(newItinerary);
+        return newItinerary;
+      } catch (error) {
+        this.error = error.message;
+        console.error('Error streaming itinerary:', error);
+        throw error;
+      } finally {
+        this.loading = false;
+      }
+    },
+
     async createItineraryFromText(data) {
       this.loading = true;
       this.error = null;
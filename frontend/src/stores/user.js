@@ -18,7 +18,7 @@ export const useUserStore = defineStore('user', {
             const username = localStorage.getItem('username');
             if (userId && username) {
                 this.profile = { id: userId, username };
-                this.token = userId;
+                this.token = localStorage.getItem('accessToken') || userId;
             }
         },
         clearSession() {